@@ -1,15 +1,26 @@
+import time
+from utils.startup import startup_timer
+
+_imports_started = time.perf_counter()
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from routes.predict import predict_bp
 from routes.health import health_bp
 from routes.auth import auth_bp
 from db import db  # import the SQLAlchemy instance
 from models.user import User
 from routes.device import device_bp
+from utils.profiling import init_profiling
+from utils.json_provider import init_json_provider
+from utils.uploads import init_uploads
 import config
 import logging
 import os
+import threading
+
+startup_timer.record('imports', time.perf_counter() - _imports_started)
 
 # Ensure logs folder exists
 os.makedirs("logs", exist_ok=True)
@@ -25,6 +36,7 @@ logging.basicConfig(
 )
 
 def create_app():
+    created = time.perf_counter()
     app = Flask(__name__)
     
     # --- CORS Configuration ---
@@ -37,6 +49,11 @@ def create_app():
 
     # --- Configuration from config.py ---
     app.config['DEBUG'] = config.DEBUG
+    if config.PROXY_FIX_HOPS > 0:
+        # Trust X-Forwarded-For/-Proto from that many proxies (see config.PROXY_FIX_HOPS)
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.PROXY_FIX_HOPS, x_proto=config.PROXY_FIX_HOPS)
+    init_json_provider(app)
+    init_uploads(app)
     
     # --- 1. Configure database path ---
     db_path = os.path.join(config.BASE_DIR, 'db', 'database.db')
@@ -54,10 +71,16 @@ def create_app():
     db.init_app(app)
 
     # --- 4. Create tables if they don't exist ---
-    with app.app_context():
-        # Ensure db directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        db.create_all()
+    def init_database():
+        with startup_timer.phase('create_tables'), app.app_context():
+            # Ensure db directory exists
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            db.create_all()
+
+    if config.FAST_START:
+        threading.Thread(target=init_database, name='db-init', daemon=True).start()
+    else:
+        init_database()
 
     # Register blueprints
     app.register_blueprint(health_bp, url_prefix="/health")
@@ -65,6 +88,9 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(device_bp, url_prefix="/device")
 
+    # Opt-in request profiling (admin header or sampling); absent when disabled
+    init_profiling(app)
+
     # Health check endpoint
     @app.route("/")
     def health_check():
@@ -80,9 +106,11 @@ def create_app():
         logging.error("Unhandled Exception: %s", str(e))
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
+    startup_timer.record('create_app', time.perf_counter() - created)
     return app
 
 if __name__ == "__main__":
     app = create_app()
     # Run on all interfaces to work with Docker
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Development server only; production runs gunicorn -c gunicorn.conf.py wsgi:app
+    app.run(host='0.0.0.0', port=5000, debug=config.DEBUG)
\ No newline at end of file
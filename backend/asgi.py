@@ -0,0 +1,155 @@
+"""
+Optional ASGI entrypoint.
+
+    pip install uvicorn
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+The same Flask app as wsgi.py, behind utils.asgi.AsgiApp. Connections live
+on the event loop, and the I/O-bound routes run there as coroutines:
+/auth/login and /auth/register await the password hasher and run their
+queries with asyncio.to_thread, /predict/history stats and scans the
+prediction log the same way, and prediction log lines are appended by a
+drain task on the loop. Inference routes run on a pool of
+ASGI_CPU_THREADS and the remaining Flask routes on ASGI_IO_THREADS.
+
+The native routes skip the predict blueprint's request hooks, so
+/predict/history carries no Server-Timing header and writes no request log
+line here. Unlike gunicorn with preload_app, each uvicorn worker imports
+this module itself, so every worker loads its own copy of the model.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from werkzeug.http import parse_date, parse_etags
+
+import config
+from app import create_app
+from routes import predict
+from services.auth_service import login_user_async, register_user_async
+from utils.asgi import AsgiApp, AsyncFileHandler, request_headers, send_empty, send_json
+from utils.http_cache import conditions_match, file_validator, validator_headers
+
+# POST routes that run model inference; everything else is I/O-bound
+CPU_BOUND_PATHS = ('/predict/', '/predict/batch', '/predict/explain')
+
+# Must match the CORS() setup in app.create_app; OPTIONS preflights still go to Flask
+CORS_ORIGINS = ('http://localhost:3000',)
+
+flask_app = create_app()
+predict.model_store.wait()
+if not predict.model_store.warmed_up:
+    predict.model_store.warm_up()
+
+app = AsgiApp(
+    flask_app,
+    cpu_paths=CPU_BOUND_PATHS,
+    cpu_threads=config.ASGI_CPU_THREADS,
+    cpu_queue=config.ASGI_CPU_QUEUE,
+    io_threads=config.ASGI_IO_THREADS,
+    max_body=config.MAX_CONTENT_LENGTH
+)
+
+# Prediction log lines are handed to the loop instead of written by the inference thread
+prediction_log = AsyncFileHandler(predict.PREDICTION_LOG_FILE)
+prediction_log.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+for handler in list(predict.prediction_logger.handlers):
+    predict.prediction_logger.removeHandler(handler)
+    handler.close()
+predict.prediction_logger.addHandler(prediction_log)
+app.on_startup.append(prediction_log.start)
+app.on_shutdown.append(prediction_log.stop)
+
+
+def cors_headers(headers):
+    """What flask_cors adds to a simple request from an allowed origin"""
+    origin = headers.get('origin')
+    if origin not in CORS_ORIGINS:
+        return []
+    return [('Access-Control-Allow-Origin', origin), ('Access-Control-Allow-Credentials', 'true'), ('Vary', 'Origin')]
+
+
+def query_int(query, name):
+    """request.args.get(name, type=int): None when absent or not an integer"""
+    try:
+        return int(query[name][0])
+    except (KeyError, ValueError):
+        return None
+
+
+@app.route('/health/live')
+async def liveness_check(scope, receive, send):
+    """Liveness probe answered on the event loop, so it passes even with every thread busy"""
+    await send_json(send, 200, {'alive': True, 'timestamp': datetime.utcnow().isoformat(), 'uptime': 'running'})
+
+
+@app.route('/health/asgi')
+async def asgi_report(scope, receive, send):
+    """Thread pools and queue of the ASGI front end"""
+    await send_json(send, 200, {'asgi': app.describe(), 'timestamp': datetime.utcnow().isoformat()})
+
+
+async def auth_route(scope, receive, send, service):
+    """Run an auth_service coroutine on a JSON body and send its (payload, status, headers)"""
+    cors = cors_headers(request_headers(scope))
+    data = await app.receive_json(receive)
+    if not isinstance(data, dict):
+        await send_json(send, 400, {'success': False, 'error': 'request body must be a JSON object'}, cors)
+        return
+    try:
+        payload, status, headers = await service(flask_app, data)
+    except Exception as e:
+        logging.error("Unhandled Exception: %s", str(e))
+        await send_json(send, 500, {'error': 'An unexpected error occurred', 'details': str(e)}, cors)
+        return
+    await send_json(send, status, payload, [*headers, *cors])
+
+
+@app.route('/auth/register', methods=('POST',))
+async def register(scope, receive, send):
+    await auth_route(scope, receive, send, register_user_async)
+
+
+@app.route('/auth/login', methods=('POST',))
+async def login(scope, receive, send):
+    await auth_route(scope, receive, send, login_user_async)
+
+
+@app.route('/predict/history')
+async def prediction_history(scope, receive, send):
+    """/predict/history on the loop; the log's stat() and scan run in asyncio.to_thread"""
+    headers = request_headers(scope)
+    cors = cors_headers(headers)
+    try:
+        user_id = "anonymous_user"
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        page = query_int(query, 'page')
+        page_size = query_int(query, 'page_size')
+        if (page is not None and page < 1) or (page_size is not None and page_size < 1):
+            await send_json(send, 400, {'error': 'page and page_size must be positive integers'}, cors)
+            return
+        if page is not None and page_size is None:
+            page_size = 50
+
+        log_size, log_mtime_ns, last_modified = await asyncio.to_thread(file_validator, predict.PREDICTION_LOG_FILE)
+        etag = predict.history_etag(user_id, log_size, log_mtime_ns, page, page_size)
+        validators = validator_headers(etag, last_modified)
+        if conditions_match(etag, last_modified, parse_etags(headers.get('if-none-match')),
+                            parse_date(headers.get('if-modified-since'))):
+            await send_empty(send, 304, [*validators, *cors])
+            return
+
+        response_data = await asyncio.to_thread(
+            predict.history_page, user_id, page, page_size, log_size, log_mtime_ns, last_modified
+        )
+        await send_json(send, 200, response_data, [*validators, *cors])
+
+    except Exception as e:
+        logging.error(f"Error retrieving prediction history: {str(e)}")
+        await send_json(send, 500, {
+            'error': 'Failed to retrieve history',
+            'details': str(e),
+            'predictions': [],
+            'total_count': 0
+        }, cors)
@@ -0,0 +1,80 @@
+"""
+Scaling benchmark for sharded batch inference.
+
+Scores the same synthetic upload with an increasing number of pool workers
+and reports wall time, rows/s, speedup and parallel efficiency against the
+single-process path as JSON.
+
+    cd backend
+    python -m benchmarks.batch_scaling --rows 500000 --workers 1,2,4,8,16
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+
+from benchmarks import synthetic
+from config import MODEL_PATH
+from ml import batch_engine
+
+
+def time_run(model, df, workers, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        batch_engine.run_batch(model, df, workers=workers, min_parallel_rows=0)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', default='1,2,4,8,16', help='comma separated worker counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        sys.exit(f"Model not found at {args.model}")
+    model = joblib.load(args.model)
+    df = synthetic.generate_frame(args.rows)
+
+    # Warm the pools so process start-up is not part of the measurement
+    worker_counts = [int(w) for w in args.workers.split(',')]
+    for workers in worker_counts:
+        if workers > 1:
+            batch_engine.run_batch(model, df.head(workers * 10), workers=workers, min_parallel_rows=0)
+
+    baseline = time_run(model, df, 1, args.repeat)
+    results = []
+    for workers in worker_counts:
+        seconds = baseline if workers == 1 else time_run(model, df, workers, args.repeat)
+        speedup = baseline / seconds
+        results.append({
+            'workers': workers,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(args.rows / seconds),
+            'speedup': round(speedup, 2),
+            'efficiency': round(speedup / workers, 2)
+        })
+
+    report = {
+        'benchmark': 'batch_scaling',
+        'rows': args.rows,
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Shared helpers for the benchmark scripts: timing, environment, model and JSON output."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize_latencies(seconds):
+    """p50/p95/p99/mean in milliseconds for a list of durations in seconds"""
+    ordered = sorted(seconds)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3) if ordered else None,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3) if ordered else None,
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3) if ordered else None,
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3) if ordered else None
+    }
+
+
+def parse_server_timing(header):
+    """{'predict': 1.2, ...} in milliseconds from a Server-Timing header value"""
+    stages = {}
+    for metric in (header or '').split(','):
+        name, _, params = metric.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if name and key == 'dur':
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def summarize_server_timing(headers):
+    """Mean and p95 per Server-Timing stage over a list of header values"""
+    samples = {}
+    for header in headers:
+        for name, ms in parse_server_timing(header).items():
+            samples.setdefault(name, []).append(ms)
+    summary = {}
+    for name, values in samples.items():
+        ordered = sorted(values)
+        summary[name] = {
+            'count': len(ordered),
+            'mean_ms': round(statistics.fmean(ordered), 3),
+            'p95_ms': round(percentile(ordered, 0.95), 3)
+        }
+    return summary
+
+
+def time_call(fn, number=1, repeat=5):
+    """Best-of-repeat timing of `number` back-to-back calls, as per-call seconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    return {
+        'best_us': round(min(runs) * 1e6, 2),
+        'median_us': round(statistics.median(runs) * 1e6, 2),
+        'ops_per_second': round(1 / min(runs)) if min(runs) > 0 else None,
+        'number': number,
+        'repeat': repeat
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info():
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def load_benchmark_model(path=None):
+    """
+    Load the model at path (default config.MODEL_PATH) into the prediction
+    routes' model store. Returns the model, or None when no model file exists.
+    """
+    import joblib
+    from config import MODEL_PATH
+    from ml.executor import inference_executor
+    from routes.predict import model_store
+
+    path = path or MODEL_PATH
+    if not os.path.exists(path):
+        return None
+    model = inference_executor.configure_model(joblib.load(path))
+    model_store.replace(model, f"benchmark:{os.path.basename(path)}")
+    return model
+
+
+def write_report(report, output=None):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    print(text)
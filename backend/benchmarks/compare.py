@@ -0,0 +1,70 @@
+"""
+Compare two benchmark reports (from benchmarks.run, .micro or .load) and
+flag metrics that regressed by more than a threshold.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 when any metric regressed, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+# Metrics where a larger value is worse; everything else compared is a rate
+LOWER_IS_BETTER = ('_us', '_ms', 'elapsed_s')
+HIGHER_IS_BETTER = ('ops_per_second', 'requests_per_second', 'rows_per_second')
+
+
+def flatten(node, prefix=''):
+    """Flatten nested dicts/lists into {'a.b.0.c': number}"""
+    items = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            items.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(node, list):
+        for i, value in enumerate(node):
+            items.update(flatten(value, f"{prefix}{i}."))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        items[prefix[:-1]] = node
+    return items
+
+
+def direction(metric):
+    name = metric.rsplit('.', 1)[-1]
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = flatten(json.load(file))
+    with open(args.candidate, encoding='utf-8') as file:
+        candidate = flatten(json.load(file))
+
+    regressions = 0
+    for metric in sorted(baseline.keys() & candidate.keys()):
+        sign = direction(metric)
+        old, new = baseline[metric], candidate[metric]
+        if sign == 0 or not old:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change * sign > args.threshold
+        regressions += worse
+        marker = 'REGRESSION' if worse else ''
+        print(f"{metric:70s} {old:>14.3f} -> {new:>14.3f} {change:+8.1%} {marker}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+End-to-end load driver for the prediction API.
+
+Drives /predict/ (single devices), /predict/batch (1k/10k/100k-row CSVs)
+and /predict/history (against synthetic logs of several sizes) either
+in-process through the Flask test client (default) or against a running
+server with --url. In-process runs execute inside a scratch directory so
+the synthetic prediction logs never touch the real logs/ folder, and the
+batch result cache is disabled so every upload is really scored. Each
+scenario also reports the server's own per-stage breakdown from the
+Server-Timing response header.
+
+    cd backend
+    python -m benchmarks.load --output load.json
+    python -m benchmarks.load --url http://localhost:5000 --batch-rows 1000
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import (
+    environment_info, load_benchmark_model, summarize_latencies, summarize_server_timing, write_report
+)
+
+
+class TestClientTransport:
+    """Requests through Flask's test client; one client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    @staticmethod
+    def _result(response):
+        return response.status_code, response.headers.get('Server-Timing')
+
+    def post_json(self, path, payload):
+        return self._result(self.client.post(path, json=payload))
+
+    def post_csv(self, path, data, filename):
+        return self._result(self.client.post(
+            path, data={'file': (io.BytesIO(data), filename)}, content_type='multipart/form-data'))
+
+    def get(self, path):
+        return self._result(self.client.get(path))
+
+
+class HttpTransport:
+    """Requests against a live server with urllib"""
+
+    def __init__(self, base_url, timeout=600):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing')
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('Server-Timing')
+
+    def post_json(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST')
+        return self._send(request)
+
+    def post_csv(self, path, data, filename):
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n'
+        ).encode('utf-8') + data + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method='POST',
+            headers={
+                'Content-Type': f'multipart/form-data; boundary={boundary}',
+                # A fresh key per upload so the server's result cache never short-circuits
+                'Idempotency-Key': uuid.uuid4().hex
+            })
+        return self._send(request)
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.base_url + path))
+
+
+def drive(calls, concurrency):
+    """
+    Run the zero-argument callables with `concurrency` threads; time each one.
+    Each callable returns (status code, Server-Timing header or None).
+    """
+    def timed(call):
+        start = time.perf_counter()
+        status, server_timing = call()
+        return time.perf_counter() - start, status, server_timing
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, calls))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for _, status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(outcomes),
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 4),
+        'requests_per_second': round(len(outcomes) / elapsed, 2) if elapsed else None,
+        'latency': summarize_latencies([seconds for seconds, _, _ in outcomes]),
+        'server_timing': summarize_server_timing([timing for _, _, timing in outcomes if timing]),
+        'status_codes': statuses
+    }
+
+
+def scenario_single(transport, ranges, requests, concurrency):
+    from benchmarks import synthetic
+    devices = synthetic.generate_devices(min(requests, 1000), ranges, seed=3)
+    calls = [
+        (lambda device=devices[i % len(devices)]: transport.post_json('/predict/', dict(device)))
+        for i in range(requests)
+    ]
+    return drive(calls, concurrency)
+
+
+def scenario_batch(transport, ranges, rows, requests):
+    from benchmarks import synthetic
+    data = synthetic.generate_csv(rows, ranges, seed=4)
+    result = drive([lambda: transport.post_csv('/predict/batch', data, f'bench_{rows}.csv')] * requests, 1)
+    result['rows'] = rows
+    result['upload_bytes'] = len(data)
+    result['rows_per_second'] = round(rows * requests / result['elapsed_s']) if result['elapsed_s'] else None
+    return result
+
+
+def scenario_history(transport, log_entries, requests, concurrency, log_path=None):
+    if log_path is not None:
+        from benchmarks import synthetic
+        synthetic.write_prediction_log(log_path, log_entries)
+    result = drive([lambda: transport.get('/predict/history')] * requests, concurrency)
+    result['log_entries'] = log_entries
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--model', help='model file for in-process runs (default: config.MODEL_PATH)')
+    parser.add_argument('--single-requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-rows', default='1000,10000,100000')
+    parser.add_argument('--batch-requests', type=int, default=3)
+    parser.add_argument('--history-sizes', default='100,10000,100000')
+    parser.add_argument('--history-requests', type=int, default=20)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    batch_sizes = [int(n) for n in args.batch_rows.split(',') if n]
+    history_sizes = [int(n) for n in args.history_sizes.split(',') if n]
+    results = {'single': None, 'batch': [], 'history': []}
+
+    if args.url:
+        from config import FEATURE_RANGES
+        transport = HttpTransport(args.url)
+        mode = 'http'
+        results['single'] = scenario_single(transport, FEATURE_RANGES, args.single_requests, args.concurrency)
+        for rows in batch_sizes:
+            results['batch'].append(scenario_batch(transport, FEATURE_RANGES, rows, args.batch_requests))
+        # The server's log cannot be resized from here; measure it as it is
+        results['history'].append(scenario_history(transport, None, args.history_requests, args.concurrency))
+    else:
+        mode = 'test_client'
+        os.environ['BATCH_CACHE_ENABLED'] = '0'
+        os.environ['RATE_LIMIT_ENABLED'] = '0'
+        os.chdir(tempfile.mkdtemp(prefix='devicepricepro-bench-'))
+        import app as app_module
+        from benchmarks import synthetic
+        from routes import predict
+
+        if load_benchmark_model(args.model) is None and predict.model_store.model is None:
+            raise SystemExit('No model available; pass --model or place it at config.MODEL_PATH')
+        transport = TestClientTransport(app_module.create_app())
+        ranges = synthetic.fetch_feature_ranges(transport.client)
+
+        results['single'] = scenario_single(transport, ranges, args.single_requests, args.concurrency)
+        for rows in batch_sizes:
+            results['batch'].append(scenario_batch(transport, ranges, rows, args.batch_requests))
+        for entries in history_sizes:
+            results['history'].append(scenario_history(
+                transport, entries, args.history_requests, args.concurrency,
+                log_path=predict.PREDICTION_LOG_FILE))
+
+    write_report({
+        'benchmark': 'load',
+        'mode': mode,
+        'environment': environment_info(),
+        'results': results
+    }, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmarks for the prediction hot path.
+
+Times validate_device_data, feature_engineering, prepare_features and
+single-row model inference as used by /predict/, plus the columnar batch
+engine stages used by /predict/batch.
+
+    cd backend
+    python -m benchmarks.micro --output micro.json
+"""
+import argparse
+
+from benchmarks.common import environment_info, load_benchmark_model, time_call, write_report
+from benchmarks import synthetic
+
+
+def run(model=None, batch_rows=10000, number=200, repeat=5):
+    from ml import batch_engine
+    from routes import predict
+
+    device = synthetic.generate_devices(1, seed=1)[0]
+    validated = dict(device)
+    predict.validate_device_data(validated)
+    engineered = predict.feature_engineering(dict(validated))
+
+    results = {
+        'validate_device_data': time_call(
+            lambda: predict.validate_device_data(dict(device)), number, repeat),
+        'feature_engineering': time_call(
+            lambda: predict.feature_engineering(dict(validated)), number, repeat),
+    }
+
+    frame = synthetic.generate_frame(batch_rows, seed=2)
+    values, error_codes = batch_engine.coerce_columns(frame)
+    batch_number = max(1, number // 50)
+    results['batch_coerce_columns'] = time_call(
+        lambda: batch_engine.coerce_columns(frame), batch_number, repeat)
+    results['batch_coerce_columns']['rows'] = batch_rows
+
+    if model is None:
+        skipped = {'skipped': 'model not available'}
+        results.update({
+            'prepare_features': skipped,
+            'model_predict_single': skipped,
+            'model_predict_proba_single': skipped,
+            'batch_build_feature_frame': skipped,
+            'batch_score_block': skipped
+        })
+        return results
+
+    features = predict.prepare_features(engineered)
+    results['prepare_features'] = time_call(
+        lambda: predict.prepare_features(engineered), number, repeat)
+    results['model_predict_single'] = time_call(
+        lambda: model.predict(features), number, repeat)
+    if hasattr(model, 'predict_proba'):
+        results['model_predict_proba_single'] = time_call(
+            lambda: model.predict_proba(features), number, repeat)
+
+    feature_order = batch_engine.get_feature_order(model)
+    results['batch_build_feature_frame'] = time_call(
+        lambda: batch_engine.build_feature_frame(values, feature_order), batch_number, repeat)
+    results['batch_score_block'] = time_call(
+        lambda: batch_engine.score_block(model, values, error_codes), batch_number, repeat)
+    for name in ('batch_build_feature_frame', 'batch_score_block'):
+        results[name]['rows'] = batch_rows
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='model file (default: config.MODEL_PATH)')
+    parser.add_argument('--batch-rows', type=int, default=10000)
+    parser.add_argument('--number', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    model = load_benchmark_model(args.model)
+    write_report({
+        'benchmark': 'micro',
+        'environment': environment_info(),
+        'results': run(model, args.batch_rows, args.number, args.repeat)
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Run the micro-benchmarks and the in-process load driver and write one JSON
+report, so results can be diffed across commits with benchmarks.compare.
+
+    cd backend
+    python -m benchmarks.run --output bench-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import BACKEND_DIR, environment_info, write_report
+
+
+def run_module(module, extra_args):
+    """Run a benchmark module in a fresh interpreter and return its JSON report"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as handle:
+        path = handle.name
+    # Run from a scratch directory so logs/ written on import stay out of the tree
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get('PYTHONPATH')]))
+    try:
+        subprocess.run(
+            [sys.executable, '-m', module, '--output', path, *extra_args],
+            cwd=tempfile.mkdtemp(prefix='devicepricepro-bench-'), env=env,
+            check=True, stdout=subprocess.DEVNULL
+        )
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='model file (default: config.MODEL_PATH)')
+    parser.add_argument('--quick', action='store_true', help='smaller inputs for a fast smoke run')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    model_args = ['--model', args.model] if args.model else []
+    micro_args = model_args + (['--number', '20', '--batch-rows', '1000'] if args.quick else [])
+    load_args = model_args + ([
+        '--single-requests', '50', '--batch-rows', '1000,10000',
+        '--batch-requests', '1', '--history-sizes', '100,10000', '--history-requests', '5'
+    ] if args.quick else [])
+
+    write_report({
+        'benchmark': 'suite',
+        'environment': environment_info(),
+        'micro': run_module('benchmarks.micro', micro_args)['results'],
+        'load': run_module('benchmarks.load', load_args)['results']
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
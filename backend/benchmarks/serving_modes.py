@@ -0,0 +1,133 @@
+"""
+Sync (gunicorn gthread, wsgi.py) vs async (uvicorn, asgi.py) serving under
+many concurrent connections.
+
+Starts each server in turn with the same worker count, optionally opens
+--slow-clients connections that send a request head and then trickle
+their body, and drives a mix of history, health and single-prediction
+requests at each concurrency level. Under gthread a trickling upload holds
+one of the worker's threads; under ASGI it only holds a socket on the event
+loop, where history is also served as a coroutine (see asgi.py). The async
+run needs `pip install uvicorn`.
+
+    cd backend
+    python -m benchmarks.serving_modes --workers 2 --concurrency 8,32,128 --slow-clients 16
+"""
+import argparse
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import BACKEND_DIR, environment_info, write_report
+from benchmarks.load import HttpTransport, drive
+from benchmarks.worker_memory import free_port, wait_until_serving
+
+
+def attempt(scenario, transport, device):
+    """Run one scenario request; timeouts and refused connections count as 'error'"""
+    try:
+        return scenario(transport, device)
+    except OSError:
+        return 'error', None
+
+
+SCENARIOS = {
+    'history': lambda transport, device: transport.get('/predict/history?page=1&page_size=50'),
+    'health': lambda transport, device: transport.get('/health/'),
+    'single': lambda transport, device: transport.post_json('/predict/', dict(device)),
+}
+
+
+def start_server(mode, workers, port):
+    env = dict(os.environ, WEB_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}", RATE_LIMIT_ENABLED='0')
+    if mode == 'sync':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def hold_slow_clients(port, count, stop):
+    """Open `count` uploads that send one body byte a second until `stop` is set"""
+    sockets = []
+    for _ in range(count):
+        try:
+            sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+            sock.sendall(b'POST /predict/ HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                         b'Content-Type: application/json\r\nContent-Length: 100000\r\n\r\n{')
+            sockets.append(sock)
+        except OSError:
+            break
+    while not stop.wait(1.0):
+        for sock in list(sockets):
+            try:
+                sock.sendall(b' ')
+            except OSError:
+                sockets.remove(sock)
+    for sock in sockets:
+        sock.close()
+
+
+def measure(mode, args, device):
+    port = free_port()
+    server = start_server(mode, args.workers, port)
+    stop = threading.Event()
+    try:
+        if not wait_until_serving(server, port, args.workers, args.timeout):
+            raise RuntimeError(f'{mode} server exited or did not become ready in time')
+        slow = threading.Thread(target=hold_slow_clients, args=(port, args.slow_clients, stop), daemon=True)
+        slow.start()
+        time.sleep(1.0)
+        transport = HttpTransport(f"http://127.0.0.1:{port}", timeout=args.request_timeout)
+        mix = [SCENARIOS[name] for name in args.mix.split(',') if name]
+        levels = []
+        for concurrency in [int(n) for n in args.concurrency.split(',') if n]:
+            calls = [
+                (lambda scenario=mix[i % len(mix)]: attempt(scenario, transport, device))
+                for i in range(args.requests)
+            ]
+            levels.append(drive(calls, concurrency))
+        return {'mode': mode, 'workers': args.workers, 'slow_clients': args.slow_clients, 'levels': levels}
+    finally:
+        stop.set()
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', default='8,32,128')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per concurrency level')
+    parser.add_argument('--mix', default='history,health,single', help=f"comma-separated from {', '.join(SCENARIOS)}")
+    parser.add_argument('--slow-clients', type=int, default=16, help='trickling uploads held open during each run')
+    parser.add_argument('--request-timeout', type=float, default=10.0, help='seconds before a request counts as an error')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for a server to start')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    from benchmarks import synthetic
+    from config import FEATURE_RANGES
+    device = synthetic.generate_devices(1, FEATURE_RANGES, seed=5)[0]
+
+    results = {'sync': measure('sync', args, device)}
+    if importlib.util.find_spec('uvicorn') is None:
+        results['async'] = {'mode': 'async', 'error': 'uvicorn is not installed (pip install uvicorn)'}
+    else:
+        results['async'] = measure('async', args, device)
+
+    write_report({'benchmark': 'serving_modes', 'environment': environment_info(), 'results': results}, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Start-up time report.
+
+Runs the app in fresh interpreters and breaks cold-start time down into:
+  * per-package import cost (python -X importtime, cumulative, top level),
+  * application phases recorded by utils.startup (imports, create_app,
+    create_tables, model_load, model_warmup),
+  * time until /health/live answers and until /health/ready turns 200.
+
+    cd backend
+    python -m benchmarks.startup_report            # current settings
+    python -m benchmarks.startup_report --fast-start
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t_import = time.perf_counter()
+app = app_module.create_app()
+t_create = time.perf_counter()
+client = app.test_client()
+client.get('/health/live')
+t_live = time.perf_counter()
+ready_ms = None
+deadline = time.perf_counter() + TIMEOUT
+from routes.predict import model_store
+while time.perf_counter() < deadline and model_store.state != 'failed':
+    if client.get('/health/ready').status_code == 200:
+        ready_ms = round((time.perf_counter() - t0) * 1000, 1)
+        break
+    time.sleep(0.05)
+from utils.startup import startup_timer
+print(json.dumps({
+    'import_app_ms': round((t_import - t0) * 1000, 1),
+    'create_app_ms': round((t_create - t_import) * 1000, 1),
+    'live_ms': round((t_live - t0) * 1000, 1),
+    'ready_ms': ready_ms,
+    'phases': startup_timer.report()['phases']
+}))
+"""
+
+
+def import_breakdown(env, top):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    # Summing each module's self time under its top-level package attributes
+    # every microsecond exactly once, however deeply it was imported
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        try:
+            self_us, _, name = line[len('import time:'):].split('|')
+            self_us = int(self_us)
+        except ValueError:
+            continue
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'package': name, 'self_ms': round(us / 1000, 1)} for name, us in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fast-start', action='store_true', help='run with FAST_START=1')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--ready-timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    env = dict(os.environ, FAST_START='1' if args.fast_start else '0')
+    probe = subprocess.run(
+        [sys.executable, '-c', PROBE.replace('TIMEOUT', str(args.ready_timeout))],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if probe.returncode != 0:
+        sys.exit(probe.stderr)
+
+    report = {
+        'benchmark': 'startup',
+        'fast_start': args.fast_start,
+        'timeline': json.loads(probe.stdout.strip().splitlines()[-1]),
+        'imports': import_breakdown(env, args.top)
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Synthetic device generator that stays inside the training feature ranges
+published by GET /predict/features (falls back to config.FEATURE_RANGES).
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import FEATURES, FEATURE_RANGES, BOOLEAN_FIELDS
+
+# Features that only take whole values in the training data
+INTEGER_FIELDS = {
+    'battery_power', 'fc', 'int_memory', 'mobile_wt', 'n_cores', 'pc',
+    'px_height', 'px_width', 'ram', 'sc_h', 'sc_w', 'talk_time'
+}
+
+
+def fetch_feature_ranges(client=None):
+    """Feature ranges from /predict/features via a Flask test client, else config"""
+    if client is not None:
+        response = client.get('/predict/features')
+        if response.status_code == 200 and response.get_json().get('feature_ranges'):
+            return response.get_json()['feature_ranges']
+    return FEATURE_RANGES
+
+
+def generate_frame(rows, ranges=None, seed=0):
+    """DataFrame of `rows` devices with every feature drawn uniformly in range"""
+    ranges = ranges or FEATURE_RANGES
+    rng = np.random.default_rng(seed)
+    data = {}
+    for field in FEATURES:
+        low, high = ranges[field]
+        if field in BOOLEAN_FIELDS:
+            data[field] = rng.integers(0, 2, rows)
+        elif field in INTEGER_FIELDS:
+            data[field] = rng.integers(int(low), int(high) + 1, rows)
+        else:
+            data[field] = rng.uniform(low, high, rows).round(1)
+    return pd.DataFrame(data, columns=FEATURES)
+
+
+def generate_devices(count, ranges=None, seed=0):
+    """List of JSON-ready device dicts, as the frontend would post them"""
+    frame = generate_frame(count, ranges, seed)
+    return [
+        {field: (value.item() if hasattr(value, 'item') else value) for field, value in row.items()}
+        for row in frame.to_dict(orient='records')
+    ]
+
+
+def generate_csv(rows, ranges=None, seed=0):
+    return generate_frame(rows, ranges, seed).to_csv(index=False).encode('utf-8')
+
+
+def write_prediction_log(path, entries, user_id='anonymous_user', ranges=None, seed=0):
+    """Write `entries` lines in the logs/predict.log format read by /predict/history"""
+    rnd = random.Random(seed)
+    devices = generate_devices(min(entries, 1000), ranges, seed)
+    start = datetime(2024, 1, 1)
+    with open(path, 'w', encoding='utf-8') as file:
+        for i in range(entries):
+            timestamp = start + timedelta(seconds=i)
+            if i % 10 == 9:
+                entry = {
+                    'timestamp': timestamp.isoformat() + 'Z', 'user_id': user_id,
+                    'id': i, 'type': 'batch', 'fileName': f'upload_{i}.csv',
+                    'totalDevices': 100, 'predicted_price_range': rnd.randint(0, 3),
+                    'confidence': 85.0,
+                    'summary': {'total_processed': 100, 'successful_predictions': 100, 'errors_count': 0}
+                }
+            else:
+                entry = {
+                    'timestamp': timestamp.isoformat() + 'Z', 'user_id': user_id,
+                    'id': i, 'type': 'single', 'brand': 'Synthetic', 'model': f'Device {i}',
+                    'predicted_price_range': rnd.randint(0, 3), 'confidence': 90.0,
+                    'features': devices[i % len(devices)]
+                }
+            file.write(f"{timestamp:%Y-%m-%d %H:%M:%S},000 - {json.dumps(entry)}\n")
@@ -0,0 +1,111 @@
+"""
+Per-worker memory with and without a preloaded, fork-shared model.
+
+Starts gunicorn twice (GUNICORN_PRELOAD=1 and 0) with the same worker
+count, waits until every worker answers, then samples RSS, USS and PSS of
+each worker process. USS (memory unique to the process) is what preloading
+saves: with preload the model pages stay shared with the master.
+
+    cd backend
+    python -m benchmarks.worker_memory --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import psutil
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_serving(master, port, workers, timeout):
+    deadline = time.time() + timeout
+    answered = 0
+    while time.time() < deadline and master.poll() is None:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/live", timeout=2):
+                answered += 1
+                # Several hits so more than one worker has imported everything
+                if answered >= workers * 2:
+                    return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def measure(preload, workers, settle, timeout):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0',
+               WEB_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}")
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_serving(master, port, workers, timeout):
+            raise RuntimeError('gunicorn exited or did not become ready in time')
+        time.sleep(settle)
+        samples = []
+        for child in psutil.Process(master.pid).children():
+            info = child.memory_full_info()
+            samples.append({
+                'pid': child.pid,
+                'rss_mb': info.rss / 2**20,
+                'uss_mb': info.uss / 2**20,
+                'pss_mb': getattr(info, 'pss', 0) / 2**20
+            })
+        master_rss = psutil.Process(master.pid).memory_info().rss / 2**20
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+    count = max(1, len(samples))
+    return {
+        'preload': preload,
+        'workers': len(samples),
+        'master_rss_mb': round(master_rss, 1),
+        'avg_rss_mb': round(sum(s['rss_mb'] for s in samples) / count, 1),
+        'avg_uss_mb': round(sum(s['uss_mb'] for s in samples) / count, 1),
+        'avg_pss_mb': round(sum(s['pss_mb'] for s in samples) / count, 1),
+        'total_pss_mb': round(sum(s['pss_mb'] for s in samples), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--settle', type=float, default=2.0, help='seconds to wait before sampling')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    shared = measure(True, args.workers, args.settle, args.timeout)
+    separate = measure(False, args.workers, args.settle, args.timeout)
+    report = {
+        'benchmark': 'worker_memory',
+        'preload': shared,
+        'no_preload': separate,
+        'uss_saved_per_worker_mb': round(separate['avg_uss_mb'] - shared['avg_uss_mb'], 1),
+        'pss_saved_total_mb': round(separate['total_pss_mb'] - shared['total_pss_mb'], 1)
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,9 +8,229 @@ DEBUG = True  # Set False in production
 # Path to the trained Pickle model
 MODEL_PATH = os.path.join(BASE_DIR, "models-ai", "lgb_pipeline.pkl")
 
+# Fast start: load/warm up the model and create DB tables on background
+# threads so the process answers /health/live immediately. Keep this off
+# under gunicorn preload, where the master must finish loading before fork.
+FAST_START = os.environ.get("FAST_START", "0") == "1"
+
 # Raw features expected from frontend
 FEATURES = [
     "battery_power","blue","clock_speed","dual_sim","fc","four_g","int_memory",
     "m_dep","mobile_wt","n_cores","pc","px_height","px_width","ram",
     "sc_h","sc_w","talk_time","three_g","touch_screen","wifi"
 ]
+
+# Observed [min, max] of each raw feature in the training data
+FEATURE_RANGES = {
+    "battery_power": [501, 1998], "blue": [0, 1], "clock_speed": [0.5, 3.0],
+    "dual_sim": [0, 1], "fc": [0, 19], "four_g": [0, 1], "int_memory": [2, 64],
+    "m_dep": [0.1, 1.0], "mobile_wt": [80, 200], "n_cores": [1, 8], "pc": [0, 20],
+    "px_height": [0, 1960], "px_width": [500, 1998], "ram": [256, 3998],
+    "sc_h": [5, 19], "sc_w": [0, 18], "talk_time": [2, 20], "three_g": [0, 1],
+    "touch_screen": [0, 1], "wifi": [0, 1]
+}
+
+# Validation groups, in the order validate_device_data checks them
+NUMERIC_FIELDS = [
+    "battery_power","clock_speed","fc","int_memory","m_dep",
+    "mobile_wt","n_cores","pc","px_height","px_width","ram",
+    "sc_h","sc_w","talk_time"
+]
+BOOLEAN_FIELDS = ["blue","dual_sim","four_g","three_g","touch_screen","wifi"]
+
+# On-disk cache of /predict/batch results, keyed on upload content (or an
+# Idempotency-Key header) plus the model version
+BATCH_CACHE_ENABLED = os.environ.get("BATCH_CACHE_ENABLED", "1") == "1"
+BATCH_CACHE_DIR = os.environ.get("BATCH_CACHE_DIR", os.path.join(BASE_DIR, "cache", "batch"))
+BATCH_CACHE_MAX_AGE = int(os.environ.get("BATCH_CACHE_MAX_AGE", 24 * 60 * 60))  # seconds after the write, hits included
+BATCH_CACHE_MAX_BYTES = int(os.environ.get("BATCH_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Sharded multi-process scoring for large /predict/batch uploads. Workers
+# are started from a forkserver with a pickled copy of the model, so the
+# first parallel batch of each process pays their start-up. Each worker also
+# re-imports the launching script, which under `python app.py` is the whole
+# app; use it with gunicorn or uvicorn only.
+# BATCH_WORKERS=0 keeps all scoring in the request process.
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 0))
+BATCH_PARALLEL_MIN_ROWS = int(os.environ.get("BATCH_PARALLEL_MIN_ROWS", 50000))
+BATCH_SHARD_ROWS = int(os.environ.get("BATCH_SHARD_ROWS", 25000))
+
+# Deadline-aware /predict/batch. A caller's X-Deadline-Ms (or ?deadline_ms=)
+# budget is scored in chunks of BATCH_DEADLINE_CHUNK_ROWS (per worker), keeping
+# BATCH_DEADLINE_RESERVE_MS back for building the response; rows left over are
+# resumed with the continuation token returned alongside the partial result.
+BATCH_DEADLINE_CHUNK_ROWS = int(os.environ.get("BATCH_DEADLINE_CHUNK_ROWS", 10000))
+BATCH_DEADLINE_RESERVE_MS = float(os.environ.get("BATCH_DEADLINE_RESERVE_MS", 250))
+
+# CPU budget for inference. Each box runs WEB_WORKERS processes, each with an
+# INFERENCE_THREADS pool, and each model.predict may use MODEL_THREADS OpenMP
+# threads. MODEL_THREADS=0 derives it so workers x threads x model threads
+# stays within CPU_BUDGET.
+CPU_BUDGET = int(os.environ.get("CPU_BUDGET", os.cpu_count() or 1))
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", max(1, CPU_BUDGET // 2)))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 4))  # gunicorn gthread threads per worker
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 2))
+MODEL_THREADS = int(os.environ.get("MODEL_THREADS", 0))
+
+# On-demand request profiling. Nothing is installed unless PROFILING_ENABLED;
+# then a request is profiled when it carries X-Profile-Token matching
+# PROFILING_ADMIN_TOKEN or is picked by PROFILING_SAMPLE_RATE (0.0-1.0).
+# PROFILING_MODE is "stack" (collapsed stacks, .folded, for flamegraph.pl /
+# speedscope), which samples the request thread and the inference threads
+# it hands model calls to, or "cprofile" (.prof, open with pstats/snakeviz),
+# which only traces the request thread and so misses the model calls.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILING_ADMIN_TOKEN = os.environ.get("PROFILING_ADMIN_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0.0))
+PROFILING_MODE = os.environ.get("PROFILING_MODE", "stack")
+PROFILING_DIR = os.environ.get("PROFILING_DIR", os.path.join("logs", "profiles"))
+PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", 50))
+
+# Per-stage Server-Timing header on prediction responses, and one JSON line
+# per prediction request (method, path, status, stage timings) in
+# REQUEST_LOG_FILE. Browsers only expose Server-Timing to scripts from
+# origins listed in SERVER_TIMING_ALLOW_ORIGIN.
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "1") == "1"
+SERVER_TIMING_ALLOW_ORIGIN = os.environ.get("SERVER_TIMING_ALLOW_ORIGIN", "http://localhost:3000")
+REQUEST_LOG_ENABLED = os.environ.get("REQUEST_LOG_ENABLED", "1") == "1"
+REQUEST_LOG_FILE = os.environ.get("REQUEST_LOG_FILE", os.path.join("logs", "requests.log"))
+
+# JSON encoder for API responses: "orjson" (falls back to the default when
+# the package is missing) or "default" for Flask's stdlib-based provider.
+# orjson writes non-finite floats as null; the default provider writes NaN.
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson")
+
+# Ceiling on the inflated size of a gzip/zstd compressed batch upload
+BATCH_MAX_DECOMPRESSED_BYTES = int(os.environ.get("BATCH_MAX_DECOMPRESSED_BYTES", 2 * 1024 ** 3))
+
+# Request body ceiling in bytes; bigger uploads are rejected with 413 before
+# the body is read. File parts larger than UPLOAD_SPOOL_THRESHOLD are
+# spooled to a named temp file in UPLOAD_SPOOL_DIR (system temp dir when
+# empty) so batch parsing can memory-map them instead of copying to RAM.
+MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 1024 ** 3))
+UPLOAD_SPOOL_THRESHOLD = int(os.environ.get("UPLOAD_SPOOL_THRESHOLD", 1024 * 1024))
+UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR", "")
+
+# Candidate model for staged roll-outs. MODEL_CANDIDATE_TRAFFIC percent of
+# /predict/ and /predict/batch requests are served by the candidate; for
+# MODEL_SHADOW_RATE (0.0-1.0) of requests, and MODEL_SHADOW_BATCH_RATE of
+# batch uploads, the other version is also scored in the background, one job
+# at a time on the inference executor, and compared. At most
+# MODEL_SHADOW_QUEUE shadow jobs wait at once; extra ones are dropped. See
+# /predict/models/report.
+MODEL_CANDIDATE_PATH = os.environ.get("MODEL_CANDIDATE_PATH", "")
+MODEL_CANDIDATE_TRAFFIC = float(os.environ.get("MODEL_CANDIDATE_TRAFFIC", 0.0))
+MODEL_SHADOW_RATE = float(os.environ.get("MODEL_SHADOW_RATE", 1.0))
+MODEL_SHADOW_BATCH_RATE = float(os.environ.get("MODEL_SHADOW_BATCH_RATE", 0.05))
+MODEL_SHADOW_QUEUE = int(os.environ.get("MODEL_SHADOW_QUEUE", 8))
+
+# Most devices /predict/ accepts in one JSON array; they are validated and
+# scored together in a single model call
+PREDICT_MAX_DEVICES = int(os.environ.get("PREDICT_MAX_DEVICES", 1000))
+
+# Admission control for the inference routes (/predict/, /predict/explain and
+# /predict/batch). Each class has its own concurrency limit per process that
+# adapts AIMD-style: it grows by about one per limit's worth of requests
+# that finish under the class's latency target, and is multiplied by
+# ADMISSION_BACKOFF when a request is slower or fails. Requests over the
+# limit are rejected at once with 503 and Retry-After; the defaults start
+# from the gunicorn thread count. Batch has the lower
+# priority: it is also shed for ADMISSION_YIELD_SECONDS after a single
+# prediction was rejected. Counters are at /health/admission.
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_SINGLE_LIMIT = int(os.environ.get("ADMISSION_SINGLE_LIMIT", WEB_THREADS))
+ADMISSION_SINGLE_MAX = int(os.environ.get("ADMISSION_SINGLE_MAX", WEB_THREADS * 4))
+ADMISSION_SINGLE_TARGET_MS = float(os.environ.get("ADMISSION_SINGLE_TARGET_MS", 500))
+ADMISSION_BATCH_LIMIT = int(os.environ.get("ADMISSION_BATCH_LIMIT", max(1, WEB_THREADS // 4)))
+ADMISSION_BATCH_MAX = int(os.environ.get("ADMISSION_BATCH_MAX", max(1, WEB_THREADS // 2)))
+ADMISSION_BATCH_TARGET_MS = float(os.environ.get("ADMISSION_BATCH_TARGET_MS", 30000))
+ADMISSION_BACKOFF = float(os.environ.get("ADMISSION_BACKOFF", 0.7))
+ADMISSION_YIELD_SECONDS = float(os.environ.get("ADMISSION_YIELD_SECONDS", 1.0))
+
+# Per-identity row quota for prediction work: a token bucket per JWT user_id
+# (client IP for anonymous calls) that refills at RATE_LIMIT_ROWS_PER_SECOND
+# up to RATE_LIMIT_BURST_ROWS and is charged one token per predicted row.
+# Requests are refused with 429 while the bucket is empty or in debt.
+# RATE_LIMIT_BACKEND "memory" keeps up to RATE_LIMIT_MAX_KEYS buckets per
+# worker; "sqlite" shares them between workers through RATE_LIMIT_DB_PATH.
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_ROWS_PER_SECOND = float(os.environ.get("RATE_LIMIT_ROWS_PER_SECOND", 5000))
+RATE_LIMIT_BURST_ROWS = float(os.environ.get("RATE_LIMIT_BURST_ROWS", 1000000))
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", 10000))
+RATE_LIMIT_DB_PATH = os.environ.get("RATE_LIMIT_DB_PATH", os.path.join(BASE_DIR, "db", "rate_limits.db"))
+
+# Reverse proxies in front of the app. With PROXY_FIX_HOPS=N the client
+# address and scheme are taken from the last N X-Forwarded-For /
+# X-Forwarded-Proto entries, so anonymous callers get their own row quota
+# instead of sharing the proxy's IP. Set it to 1 behind the frontend's nginx
+# (frontend/nginx.conf sets both headers); leave it at 0 when clients reach
+# the app directly, or they could pick their own address.
+PROXY_FIX_HOPS = int(os.environ.get("PROXY_FIX_HOPS", 0))
+
+# Auth hot paths. Verified JWTs are cached (up to JWT_CACHE_SIZE tokens,
+# never past their exp). Password hashing and checking run on a pool of
+# AUTH_HASH_THREADS threads so login/register bursts use a bounded share of
+# the CPU. Once AUTH_HASH_QUEUE hashes are running or waiting they are
+# answered with 503; the default leaves one of the WEB_THREADS request
+# threads free for other routes (a bound at or above WEB_THREADS is never hit).
+JWT_CACHE_SIZE = int(os.environ.get("JWT_CACHE_SIZE", 4096))
+AUTH_HASH_THREADS = int(os.environ.get("AUTH_HASH_THREADS", 2))
+AUTH_HASH_QUEUE = int(os.environ.get("AUTH_HASH_QUEUE", max(1, WEB_THREADS - 1)))
+
+# Input drift monitor: per-feature histograms (DRIFT_BINS equal-width bins
+# over FEATURE_RANGES) of served devices and predictions, kept in
+# DRIFT_BUCKETS time buckets of DRIFT_BUCKET_SECONDS each (24 h by default,
+# about 1 MB per worker). /predict/drift compares them with the reference
+# profile at DRIFT_REFERENCE_PATH (default: next to the model) once a window
+# holds DRIFT_MIN_ROWS rows.
+DRIFT_ENABLED = os.environ.get("DRIFT_ENABLED", "1") == "1"
+DRIFT_BINS = int(os.environ.get("DRIFT_BINS", 20))
+DRIFT_BUCKETS = int(os.environ.get("DRIFT_BUCKETS", 288))
+DRIFT_BUCKET_SECONDS = int(os.environ.get("DRIFT_BUCKET_SECONDS", 300))
+DRIFT_MIN_ROWS = int(os.environ.get("DRIFT_MIN_ROWS", 100))
+DRIFT_REFERENCE_PATH = os.environ.get("DRIFT_REFERENCE_PATH", "")
+
+# Shared result cache for single predictions, history pages and analytics
+# rollups. RESULT_CACHE_BACKEND is "memory" (per worker), "sqlite" (one WAL
+# file shared by all workers, on /dev/shm where available), "redis"
+# (RESULT_CACHE_URL, needs the redis package) or "none". Each namespace has
+# its own TTL in seconds and size limit in bytes; a TTL of 0 disables it.
+RESULT_CACHE_BACKEND = os.environ.get("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else os.path.join(BASE_DIR, "cache"), "devicepricepro-results.db"
+))
+RESULT_CACHE_URL = os.environ.get("RESULT_CACHE_URL", "redis://localhost:6379/0")
+RESULT_CACHE_PREDICTIONS_TTL = int(os.environ.get("RESULT_CACHE_PREDICTIONS_TTL", 3600))
+RESULT_CACHE_PREDICTIONS_MAX_BYTES = int(os.environ.get("RESULT_CACHE_PREDICTIONS_MAX_BYTES", 16 * 1024 * 1024))
+RESULT_CACHE_HISTORY_TTL = int(os.environ.get("RESULT_CACHE_HISTORY_TTL", 600))
+RESULT_CACHE_HISTORY_MAX_BYTES = int(os.environ.get("RESULT_CACHE_HISTORY_MAX_BYTES", 64 * 1024 * 1024))
+RESULT_CACHE_ANALYTICS_TTL = int(os.environ.get("RESULT_CACHE_ANALYTICS_TTL", 600))
+RESULT_CACHE_ANALYTICS_MAX_BYTES = int(os.environ.get("RESULT_CACHE_ANALYTICS_MAX_BYTES", 4 * 1024 * 1024))
+
+# Optional ASGI serving mode (asgi.py, e.g. uvicorn asgi:app). Connections
+# are handled on the event loop; complete requests run on ASGI_CPU_THREADS
+# threads for the inference routes (beyond ASGI_CPU_QUEUE waiting they get
+# 503) and ASGI_IO_THREADS threads for everything else.
+ASGI_CPU_THREADS = int(os.environ.get("ASGI_CPU_THREADS", WEB_THREADS))
+ASGI_CPU_QUEUE = int(os.environ.get("ASGI_CPU_QUEUE", WEB_THREADS * 4))
+ASGI_IO_THREADS = int(os.environ.get("ASGI_IO_THREADS", 32))
+
+# Server-Sent Events progress for /predict/batch (?progress_id=...). States
+# are kept for BATCH_PROGRESS_TTL seconds, written and polled every
+# BATCH_PROGRESS_INTERVAL seconds; a stream gives up after BATCH_PROGRESS_WAIT
+# seconds without any state. BATCH_PROGRESS_BACKEND is "sqlite" (a WAL file
+# at BATCH_PROGRESS_PATH, on /dev/shm where available, shared by all
+# workers), "redis" (RESULT_CACHE_URL) or "memory". A memory store is per
+# worker, so with WEB_WORKERS > 1 the progress stream is turned off (501).
+# Each open stream holds a worker thread; beyond BATCH_PROGRESS_MAX_STREAMS
+# per worker, new streams get 503 with Retry-After.
+BATCH_PROGRESS_MAX_STREAMS = int(os.environ.get("BATCH_PROGRESS_MAX_STREAMS", max(1, WEB_THREADS // 4)))
+BATCH_PROGRESS_BACKEND = os.environ.get("BATCH_PROGRESS_BACKEND", "sqlite")
+BATCH_PROGRESS_PATH = os.environ.get("BATCH_PROGRESS_PATH", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else os.path.join(BASE_DIR, "cache"), "devicepricepro-progress.db"
+))
+BATCH_PROGRESS_TTL = int(os.environ.get("BATCH_PROGRESS_TTL", 600))
+BATCH_PROGRESS_MAX_BYTES = int(os.environ.get("BATCH_PROGRESS_MAX_BYTES", 1024 * 1024))
+BATCH_PROGRESS_INTERVAL = float(os.environ.get("BATCH_PROGRESS_INTERVAL", 0.25))
+BATCH_PROGRESS_WAIT = float(os.environ.get("BATCH_PROGRESS_WAIT", 30))
@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for DevicePricePro.
+
+Worker and thread counts default to the same CPU budget the inference
+executor uses (config.WEB_WORKERS / config.WEB_THREADS), so gunicorn
+processes x inference threads x model threads stay within the core count.
+"""
+import gc
+import os
+
+import config as app_config
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = app_config.WEB_WORKERS
+threads = app_config.WEB_THREADS
+worker_class = "gthread"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Import wsgi.py (create the app, load and warm up the model) in the master
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent generation
+    # so the cyclic GC in workers does not touch (and un-share) those pages
+    if preload_app:
+        gc.freeze()
+    server.log.info(
+        f"Serving with {workers} workers x {threads} threads "
+        f"(preload={'on' if preload_app else 'off'}, CPU budget {app_config.CPU_BUDGET})"
+    )
@@ -0,0 +1,383 @@
+"""
+Columnar scoring engine for /predict/batch.
+
+The upload is parsed once into a float64 matrix in FEATURES order plus a
+per-row validation code that mirrors validate_device_data. Feature
+engineering and inference then run on whole blocks of rows. Large inputs
+can be split into shards and scored in a process pool; the parsed matrix is
+placed in shared memory so workers attach to it instead of unpickling
+DataFrames, and only the per-shard results travel back. Workers start from
+a forkserver (spawn where that is unavailable), never by forking the
+serving process: by the time the pool is needed LightGBM has run, and a
+fork of a process whose OpenMP runtime has started can deadlock in the
+child. Each worker receives the pickled model once, when it starts.
+
+Like any spawned process, a worker re-imports the parent's __main__ script
+(as __mp_main__) before it runs. Under gunicorn or uvicorn that is their
+launcher and costs nothing; under `python app.py` it is the whole app, so
+each worker would import Flask and every route and load the model again.
+Keep BATCH_WORKERS at 0 for the development server.
+"""
+import logging
+import math
+import numbers
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, get_all_start_methods, resource_tracker, shared_memory
+
+from config import (
+    FEATURES, NUMERIC_FIELDS, BOOLEAN_FIELDS,
+    BATCH_WORKERS, BATCH_PARALLEL_MIN_ROWS, BATCH_SHARD_ROWS, BATCH_DEADLINE_CHUNK_ROWS
+)
+from ml.executor import set_model_threads
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+# Same order validate_device_data checks fields in, so the first failing
+# field of a row produces the same message as the per-row path
+VALIDATION_ORDER = NUMERIC_FIELDS + BOOLEAN_FIELDS
+ERROR_MESSAGES = [None] + [
+    f"Invalid numeric value for field {field}" for field in NUMERIC_FIELDS
+] + [
+    f"Invalid boolean value for field {field}" for field in BOOLEAN_FIELDS
+]
+
+TRUE_STRINGS = ('true', '1', 'yes')
+
+
+class BatchResult:
+    """
+    Scored rows of a batch as parallel arrays, plus (row, message) errors.
+    next_row is the 0-based index of the first row left unprocessed when a
+    deadline cut the batch short, else None.
+    """
+
+    def __init__(self, rows, predictions, battery_power, ram, int_memory, errors, next_row=None):
+        self.rows = rows
+        self.predictions = predictions
+        self.battery_power = battery_power
+        self.ram = ram
+        self.int_memory = int_memory
+        self.errors = errors
+        self.next_row = next_row
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                   np.empty(0), np.empty(0), np.empty(0), [])
+
+    @classmethod
+    def concat(cls, parts):
+        if not parts:
+            return cls.empty()
+        return cls(
+            np.concatenate([p.rows for p in parts]),
+            np.concatenate([p.predictions for p in parts]),
+            np.concatenate([p.battery_power for p in parts]),
+            np.concatenate([p.ram for p in parts]),
+            np.concatenate([p.int_memory for p in parts]),
+            [error for p in parts for error in p.errors]
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_columns(self):
+        """One list per field; utils.batch_io turns these into the response format"""
+        return {
+            'row': self.rows.tolist(),
+            'predicted_price_range': self.predictions.tolist(),
+            'battery_power': self.battery_power.tolist(),
+            'ram': self.ram.tolist(),
+            'int_memory': self.int_memory.tolist()
+        }
+
+    def error_messages(self):
+        return [f"Row {row}: {message}" for row, message in self.errors]
+
+
+def _coerce_numeric(column):
+    """float() every value like validate_device_data; returns (values, invalid mask)"""
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        return column.to_numpy(dtype=np.float64, na_value=np.nan), np.zeros(len(column), dtype=bool)
+
+    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    invalid = np.zeros(len(column), dtype=bool)
+    # Only the cells pandas could not convert need the exact per-value check
+    raw = column.to_numpy()
+    for i in np.flatnonzero(np.isnan(values)):
+        try:
+            value = float(raw[i])
+        except (ValueError, TypeError):
+            invalid[i] = True
+            continue
+        values[i] = value
+    return values, invalid
+
+
+def _coerce_boolean_value(value):
+    if isinstance(value, (bool, np.bool_)):
+        return float(value)
+    if isinstance(value, numbers.Number):
+        return float(bool(value))
+    if isinstance(value, str):
+        return 1.0 if value.lower() in TRUE_STRINGS else 0.0
+    return None
+
+
+def _coerce_boolean(column):
+    """Map values to 0/1 like validate_device_data; returns (values, invalid mask)"""
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        raw = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        # int(bool(nan)) is 1 in the per-row path, keep that behaviour
+        values = np.where(np.isnan(raw) | (raw != 0), 1.0, 0.0)
+        return values, np.zeros(len(column), dtype=bool)
+
+    converted = [_coerce_boolean_value(v) for v in column.to_numpy()]
+    invalid = np.fromiter((v is None for v in converted), dtype=bool, count=len(converted))
+    values = np.fromiter((0.0 if v is None else v for v in converted), dtype=np.float64, count=len(converted))
+    return values, invalid
+
+
+def coerce_columns(df):
+    """
+    Parse the FEATURES columns of df into a (rows, len(FEATURES)) float64
+    matrix and an int16 array holding 0 for valid rows or the index into
+    ERROR_MESSAGES of the first failing field.
+    """
+    n_rows = len(df)
+    values = np.empty((n_rows, len(FEATURES)), dtype=np.float64)
+    error_codes = np.zeros(n_rows, dtype=np.int16)
+
+    for code, field in enumerate(VALIDATION_ORDER, 1):
+        if field in NUMERIC_FIELDS:
+            column_values, invalid = _coerce_numeric(df[field])
+        else:
+            column_values, invalid = _coerce_boolean(df[field])
+        values[:, FEATURE_INDEX[field]] = column_values
+        error_codes[invalid & (error_codes == 0)] = code
+
+    return values, error_codes
+
+
+def get_feature_order(model):
+    if hasattr(model, "feature_names_in_"):
+        return list(model.feature_names_in_)
+    return FEATURES
+
+
+def build_feature_frame(values, feature_order):
+    """Vectorised feature_engineering + prepare_features over a block of rows"""
+    col = {name: values[:, i] for i, name in enumerate(FEATURES)}
+    with np.errstate(all='ignore'):
+        px_area = col['px_width'] * col['px_height']
+        col['camera_total'] = col['fc'] + col['pc']
+        col['px_area'] = px_area
+        col['log_px_width'] = np.log1p(col['px_width'])
+        col['log_px_height'] = np.log1p(col['px_height'])
+        col['log_px_area'] = np.log1p(px_area)
+        col['battery_per_wt'] = col['battery_power'] / (col['mobile_wt'] + 1e-5)
+        col['mem_ratio'] = col['ram'] / (col['int_memory'] + 1e-5)
+        col['log_battery_power'] = np.log1p(col['battery_power'])
+        col['log_ram'] = np.log1p(col['ram'])
+        col['log_int_memory'] = np.log1p(col['int_memory'])
+        col['ppi_proxy'] = np.sqrt(px_area) / (np.sqrt(col['sc_h'] ** 2 + col['sc_w'] ** 2) + 1e-5)
+        col['connectivity_score'] = (
+            col['blue'] + col['wifi'] + col['four_g'] +
+            col['three_g'] + col['dual_sim'] + col['touch_screen']
+        )
+
+    zeros = None
+    frame = {}
+    for name in feature_order:
+        if name in col:
+            frame[name] = col[name]
+        else:
+            if zeros is None:
+                zeros = np.zeros(len(values))
+            frame[name] = zeros
+    return pd.DataFrame(frame, columns=list(feature_order))
+
+
+def score_block(model, values, error_codes, offset=0):
+    """Validate, engineer and score one contiguous block of parsed rows."""
+    errors = [(offset + int(i) + 1, ERROR_MESSAGES[error_codes[i]])
+              for i in np.flatnonzero(error_codes)]
+    valid_idx = np.flatnonzero(error_codes == 0)
+    valid_values = values[valid_idx]
+
+    predictions = np.empty(0, dtype=np.int64)
+    if len(valid_idx):
+        try:
+            features = build_feature_frame(valid_values, get_feature_order(model))
+            predictions = np.asarray(model.predict(features)).astype(np.int64)
+        except Exception as e:
+            errors.extend((offset + int(i) + 1, str(e)) for i in valid_idx)
+            errors.sort()
+            valid_idx = valid_idx[:0]
+            valid_values = valid_values[:0]
+
+    # Copy out of the (possibly shared) input buffer
+    return BatchResult(
+        valid_idx.astype(np.int64) + offset + 1,
+        predictions,
+        valid_values[:, FEATURE_INDEX['battery_power']].copy(),
+        valid_values[:, FEATURE_INDEX['ram']].copy(),
+        valid_values[:, FEATURE_INDEX['int_memory']].copy(),
+        errors
+    )
+
+
+# --- Process pool -----------------------------------------------------------
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+_worker_model = None
+
+
+def _init_worker(model):
+    # Runs in each fresh worker with its own unpickled copy of the model
+    global _worker_model
+    # Parallelism comes from the pool itself; one OpenMP thread per process
+    set_model_threads(model, 1)
+    _worker_model = model
+
+
+def _get_pool(model, workers):
+    """Process pool bound to this model; rebuilt in a new process or after a model change"""
+    global _pool, _pool_key
+    key = (os.getpid(), id(model), workers)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None and _pool_key[0] == os.getpid():
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # Workers must share the parent's tracker so segments it unlinks
+            # are not reported (and unlinked again) by the children
+            resource_tracker.ensure_running()
+            if 'forkserver' in get_all_start_methods():
+                context = get_context('forkserver')
+                # Import this module (with config and ml.executor) once in
+                # the server rather than in every worker; workers still
+                # re-import __main__, see the module docstring
+                context.set_forkserver_preload(['ml.batch_engine'])
+            else:
+                context = get_context('spawn')
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=_init_worker, initargs=(model,)
+            )
+            _pool_key = key
+            logging.info(f"Started batch process pool with {workers} workers")
+        return _pool
+
+
+def _score_shard(values_name, codes_name, n_rows, start, stop, offset=0):
+    values_shm = shared_memory.SharedMemory(name=values_name)
+    codes_shm = shared_memory.SharedMemory(name=codes_name)
+    try:
+        values = np.ndarray((n_rows, len(FEATURES)), dtype=np.float64, buffer=values_shm.buf)
+        codes = np.ndarray((n_rows,), dtype=np.int16, buffer=codes_shm.buf)
+        result = score_block(_worker_model, values[start:stop], codes[start:stop], offset=offset + start)
+        del values, codes
+        return result
+    finally:
+        values_shm.close()
+        codes_shm.close()
+
+
+def _to_shared(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm
+
+
+def score_parallel(model, values, error_codes, workers, shard_rows=BATCH_SHARD_ROWS, offset=0):
+    """Score parsed rows in shards across a process pool, in original row order"""
+    n_rows = len(values)
+    shard_rows = max(1, min(shard_rows, math.ceil(n_rows / workers)))
+    pool = _get_pool(model, workers)
+
+    values_shm = _to_shared(values)
+    codes_shm = _to_shared(error_codes)
+    try:
+        futures = [
+            pool.submit(_score_shard, values_shm.name, codes_shm.name, n_rows,
+                        start, min(start + shard_rows, n_rows), offset)
+            for start in range(0, n_rows, shard_rows)
+        ]
+        return BatchResult.concat([future.result() for future in futures])
+    finally:
+        values_shm.close()
+        values_shm.unlink()
+        codes_shm.close()
+        codes_shm.unlink()
+
+
+def score_until(model, values, error_codes, deadline=math.inf, offset=0, workers=1, on_parsed=None,
+                chunk_rows=BATCH_DEADLINE_CHUNK_ROWS, on_progress=None):
+    """
+    Score parsed rows chunk by chunk until they run out or the next chunk
+    would likely finish after `deadline` (a time.perf_counter() value),
+    judged by the slowest chunk so far. At least one chunk is always
+    scored so every call makes progress. on_progress('predicted', rows),
+    if given, is called after each chunk with the rows scored so far.
+    """
+    chunk_rows = max(1, chunk_rows) * max(1, workers)
+    n_rows = len(values)
+    parts = []
+    position = 0
+    slowest = 0.0
+    while position < n_rows:
+        if parts and time.perf_counter() + slowest > deadline:
+            break
+        started = time.perf_counter()
+        stop = min(position + chunk_rows, n_rows)
+        block_values, block_codes = values[position:stop], error_codes[position:stop]
+        if on_parsed is not None:
+            on_parsed(block_values, block_codes)
+        if workers > 1:
+            part = score_parallel(model, block_values, block_codes, workers, offset=offset + position)
+        else:
+            part = score_block(model, block_values, block_codes, offset=offset + position)
+        parts.append(part)
+        position = stop
+        slowest = max(slowest, time.perf_counter() - started)
+        if on_progress is not None:
+            on_progress('predicted', position)
+    result = BatchResult.concat(parts)
+    result.next_row = offset + position if position < n_rows else None
+    return result
+
+
+def run_batch(model, df, workers=None, min_parallel_rows=None, on_parsed=None, deadline=None, start_row=0,
+              on_progress=None):
+    """
+    Score every row of df from start_row on. Uses the process pool when more
+    than one worker is configured and the input is large enough to amortise
+    the hand-off. With a deadline (time.perf_counter() value) rows are scored
+    in chunks and the result may stop early; see BatchResult.next_row.
+    on_parsed(values, error_codes), if given, sees every parsed block before
+    it is scored. on_progress(stage, rows), if given, is told when the rows
+    are validated and, chunk by chunk, how many have been scored.
+    """
+    workers = BATCH_WORKERS if workers is None else workers
+    min_parallel_rows = BATCH_PARALLEL_MIN_ROWS if min_parallel_rows is None else min_parallel_rows
+    values, error_codes = coerce_columns(df.iloc[start_row:] if start_row else df)
+    parallel = workers > 1 and len(values) >= min_parallel_rows
+    if on_progress is not None:
+        on_progress('validated', len(values))
+    if deadline is not None or on_progress is not None:
+        return score_until(model, values, error_codes, math.inf if deadline is None else deadline, start_row,
+                           workers if parallel else 1, on_parsed, on_progress=on_progress)
+    if on_parsed is not None:
+        on_parsed(values, error_codes)
+    if parallel:
+        return score_parallel(model, values, error_codes, workers, offset=start_row)
+    return score_block(model, values, error_codes, offset=start_row)
@@ -0,0 +1,393 @@
+"""
+Streaming input-drift monitor.
+
+Every scored device is folded into fixed-bin histograms, one per raw
+feature plus the predicted price range. Bins are equal-width over the
+feature's FEATURE_RANGES span with an underflow and an overflow bin, so an
+observation is a bin index and a histogram is a small array of counts that
+merges by addition. Counts are kept in a ring of time buckets
+(DRIFT_BUCKETS x DRIFT_BUCKET_SECONDS); a bucket is reset when its slot is
+reused, so memory is fixed regardless of traffic.
+
+/predict/drift sums the buckets of the requested window and compares each
+histogram with a reference profile saved next to the model (PSI and
+Jensen-Shannon divergence). Build the reference from the training data:
+
+    cd backend
+    python -m ml.drift --data train.csv
+    python -m ml.drift --data train.parquet --model models-ai/lgb_pipeline.pkl --output ref.json
+
+State is per worker process; with load-balanced workers each one sees a
+representative sample of the traffic.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import (
+    FEATURES, FEATURE_RANGES, BOOLEAN_FIELDS, MODEL_PATH,
+    DRIFT_BINS, DRIFT_BUCKETS, DRIFT_BUCKET_SECONDS, DRIFT_MIN_ROWS
+)
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+PREDICTION_FIELD = 'predicted_price_range'
+PRICE_RANGES = (0, 3)
+
+# Population stability index bands commonly used for drift alerts
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+OBSERVE_CHUNK_ROWS = 4096  # rows binned at a time; keeps scratch buffers cache-sized
+
+
+def default_reference_path(model_path=MODEL_PATH):
+    return os.path.splitext(model_path)[0] + '.drift.json'
+
+
+def bin_spec(bins=DRIFT_BINS):
+    """{field: (low, high, bins)} for the raw features and the predicted price range"""
+    spec = {}
+    for field in FEATURES:
+        low, high = FEATURE_RANGES[field]
+        spec[field] = (float(low), float(high), 2 if field in BOOLEAN_FIELDS else bins)
+    spec[PREDICTION_FIELD] = (float(PRICE_RANGES[0]), float(PRICE_RANGES[1]), PRICE_RANGES[1] - PRICE_RANGES[0] + 1)
+    return spec
+
+
+class Histograms:
+    """Vectorised binning for one bin spec; every field gets bins + 2 slots (under, ..., over)."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.fields = list(spec)
+        self.width = max(s[2] for s in spec.values()) + 2
+        self.lows = np.array([s[0] for s in spec.values()])
+        self.highs = np.array([s[1] for s in spec.values()])
+        self.bins = np.array([s[2] for s in spec.values()])
+        self.steps = (self.highs - self.lows) / self.bins
+        self._row_spec = [(s[0], s[1], s[2], 1 / ((s[1] - s[0]) / s[2])) for s in spec.values()]
+
+    def slot(self, column, value):
+        """Slot of one value in plain Python; far cheaper than numpy for a single row"""
+        low, high, bins, scale = self._row_spec[column]
+        if value != value or value > high:  # NaN or above the range
+            return bins + 1
+        if value < low:
+            return 0
+        return min(int((value - low) * scale), bins - 1) + 1  # same arithmetic as counts()
+
+    def counts(self, values, columns, valid=None):
+        """
+        ((len(columns), width) counts, per-column sums) for a block of rows,
+        optionally only the rows where `valid` is True. Works through small
+        chunks with reused scratch buffers, so a large batch is never copied
+        and the temporaries stay in cache.
+        """
+        lows, highs = self.lows[columns], self.highs[columns]
+        bins = self.bins[columns].astype(np.float64)
+        scale = 1 / self.steps[columns]
+        offsets = np.arange(len(columns)) * self.width + 1  # +1: slot 0 is the underflow bin
+        counts = np.zeros(len(columns) * self.width, dtype=np.int64)
+        sums = np.zeros(len(columns))
+        rows = min(OBSERVE_CHUNK_ROWS, len(values))
+        scaled = np.empty((rows, len(columns)))
+        index = np.empty((rows, len(columns)), dtype=np.int64)
+        mask = np.empty((rows, len(columns)), dtype=bool)
+        for start in range(0, len(values), OBSERVE_CHUNK_ROWS):
+            chunk = values[start:start + OBSERVE_CHUNK_ROWS]
+            if valid is not None:
+                chunk = chunk[valid[start:start + OBSERVE_CHUNK_ROWS]]
+            n = len(chunk)
+            b, i, m = scaled[:n], index[:n], mask[:n]
+            np.subtract(chunk, lows, out=b)
+            np.multiply(b, scale, out=b)
+            np.floor(b, out=b)
+            np.minimum(b, bins - 1, out=b)  # the top edge belongs to the last bin
+            np.less(chunk, lows, out=m)
+            np.copyto(b, -1, where=m)       # underflow bin
+            np.greater(chunk, highs, out=m)
+            m |= np.isnan(chunk)
+            np.copyto(b, bins, where=m)     # overflow bin, NaN included
+            np.copyto(i, b, casting='unsafe')
+            i += offsets
+            counts += np.bincount(i.ravel(), minlength=counts.size)
+            sums += np.nansum(chunk, axis=0)
+        return counts.reshape(len(columns), self.width), sums
+
+
+def psi(expected, actual, eps=1e-4):
+    p = expected / max(expected.sum(), 1) + eps
+    q = actual / max(actual.sum(), 1) + eps
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def js_divergence(expected, actual):
+    """Jensen-Shannon divergence in bits, 0 (same) to 1 (disjoint)"""
+    p = expected / max(expected.sum(), 1)
+    q = actual / max(actual.sum(), 1)
+    m = (p + q) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kl_pm = np.where(p > 0, p * np.log2(p / m), 0.0).sum()
+        kl_qm = np.where(q > 0, q * np.log2(q / m), 0.0).sum()
+    return float((kl_pm + kl_qm) / 2)
+
+
+def drift_status(value):
+    if value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+class DriftMonitor:
+    """Time-bucketed histograms of served inputs and predictions."""
+
+    def __init__(self, spec=None, buckets=DRIFT_BUCKETS, bucket_seconds=DRIFT_BUCKET_SECONDS,
+                 reference_path=None, min_rows=DRIFT_MIN_ROWS):
+        self.spec = spec or bin_spec()
+        self.buckets = max(1, buckets)
+        self.bucket_seconds = max(1, bucket_seconds)
+        self.reference_path = reference_path or default_reference_path()
+        self.min_rows = min_rows
+        self._histograms = None
+        self._counts = None  # (buckets, fields, width)
+        self._sums = None    # (buckets, fields) for means
+        self._stamps = None  # absolute bucket number held by each slot
+        self._reference = None
+        self._reference_mtime = None
+        self._lock = threading.Lock()
+
+    def _ensure_state(self):
+        # Allocated on first use so importing the module stays free
+        if self._counts is not None:
+            return
+        with self._lock:
+            if self._counts is not None:
+                return
+            self._histograms = Histograms(self.spec)
+            fields = len(self._histograms.fields)
+            self._counts = np.zeros((self.buckets, fields, self._histograms.width), dtype=np.int64)
+            self._sums = np.zeros((self.buckets, fields))
+            self._stamps = np.full(self.buckets, -1, dtype=np.int64)
+
+    def _slot(self, now):
+        number = int(now // self.bucket_seconds)
+        slot = number % self.buckets
+        if self._stamps[slot] != number:
+            self._counts[slot] = 0
+            self._sums[slot] = 0
+            self._stamps[slot] = number
+        return slot
+
+    def observe(self, values, predictions=None, valid=None):
+        """
+        Fold a block of scored rows in. values is (rows, len(FEATURES)) in
+        FEATURES order; `valid` optionally masks the rows that passed
+        validation. predictions may be given separately (same or other rows).
+        """
+        try:
+            self._ensure_state()
+            feature_counts = feature_sums = None
+            if values is not None and len(values):
+                feature_counts, feature_sums = self._histograms.counts(
+                    np.asarray(values, dtype=np.float64), np.arange(len(FEATURES)), valid)
+            prediction_counts = prediction_sum = None
+            if predictions is not None and len(predictions):
+                prediction_counts, prediction_sum = self._histograms.counts(
+                    np.asarray(predictions, dtype=np.float64).reshape(-1, 1), np.array([len(FEATURES)]))
+            with self._lock:
+                slot = self._slot(time.time())
+                if feature_counts is not None:
+                    self._counts[slot, :len(FEATURES)] += feature_counts
+                    self._sums[slot, :len(FEATURES)] += feature_sums
+                if prediction_counts is not None:
+                    self._counts[slot, len(FEATURES)] += prediction_counts[0]
+                    self._sums[slot, len(FEATURES)] += prediction_sum[0]
+        except Exception as e:
+            logging.error(f"Drift monitor update failed: {str(e)}")
+
+    def observe_record(self, features, prediction):
+        """One logged prediction: a {field: value} dict and its price range"""
+        try:
+            self._ensure_state()
+            row = [float(features.get(field, math.nan)) for field in FEATURES]
+            if prediction is not None:
+                row.append(float(prediction))
+            slots = [self._histograms.slot(column, value) for column, value in enumerate(row)]
+            with self._lock:
+                slot = self._slot(time.time())
+                counts, sums = self._counts[slot], self._sums[slot]
+                for column, (bin_slot, value) in enumerate(zip(slots, row)):
+                    counts[column, bin_slot] += 1
+                    if value == value:
+                        sums[column] += value
+        except (TypeError, ValueError):
+            pass
+        except Exception as e:
+            logging.error(f"Drift monitor update failed: {str(e)}")
+
+    def window(self, seconds=None):
+        """(counts, sums) summed over the buckets that cover the last `seconds`"""
+        self._ensure_state()
+        span = self.buckets if seconds is None else max(1, math.ceil(seconds / self.bucket_seconds))
+        with self._lock:
+            current = int(time.time() // self.bucket_seconds)
+            live = (self._stamps > current - min(span, self.buckets)) & (self._stamps <= current)
+            return self._counts[live].sum(axis=0), self._sums[live].sum(axis=0)
+
+    def reference(self):
+        """The reference profile, reloaded when its file changes; None if absent"""
+        try:
+            mtime = os.stat(self.reference_path).st_mtime_ns
+        except OSError:
+            self._reference = self._reference_mtime = None
+            return None
+        if mtime != self._reference_mtime:
+            with open(self.reference_path, 'r', encoding='utf-8') as file:
+                self._reference = json.load(file)
+            self._reference_mtime = mtime
+        return self._reference
+
+    def memory_bytes(self):
+        self._ensure_state()
+        return int(self._counts.nbytes + self._sums.nbytes + self._stamps.nbytes)
+
+    def report(self, seconds=None, include_histograms=False):
+        counts, sums = self.window(seconds)
+        fields = self._histograms.fields
+        try:
+            reference = self.reference()
+            reference_error = None
+        except (OSError, ValueError) as e:
+            reference, reference_error = None, f"Unreadable reference profile: {str(e)}"
+
+        spec_matches = reference is not None and all(
+            tuple(reference.get('bins', {}).get(field, ())) == tuple(self.spec[field]) for field in fields
+        )
+        if reference is not None and not spec_matches:
+            reference_error = 'Reference profile was built with different bins; rebuild it with python -m ml.drift'
+
+        report_fields = {}
+        drifting = []
+        for i, field in enumerate(fields):
+            width = self.spec[field][2] + 2
+            current = counts[i, :width]
+            rows = int(current.sum())
+            entry = {
+                'rows': rows,
+                'mean': round(float(sums[i] / rows), 4) if rows else None,
+                'out_of_range_rate': round(float((current[0] + current[-1]) / rows), 4) if rows else None
+            }
+            if spec_matches and field in reference.get('features', {}):
+                ref = reference['features'][field]
+                expected = np.asarray(ref['counts'], dtype=np.float64)
+                entry['reference_mean'] = ref.get('mean')
+                if rows >= self.min_rows:
+                    entry['psi'] = round(psi(expected, current), 4)
+                    entry['js_divergence'] = round(js_divergence(expected, current), 4)
+                    entry['status'] = drift_status(entry['psi'])
+                    if entry['status'] != 'stable':
+                        drifting.append(field)
+                else:
+                    entry['status'] = 'insufficient_data'
+            if include_histograms:
+                entry['counts'] = current.tolist()
+            report_fields[field] = entry
+
+        return {
+            'window_seconds': (self.buckets if seconds is None else
+                               min(self.buckets, math.ceil(seconds / self.bucket_seconds))) * self.bucket_seconds,
+            'bucket_seconds': self.bucket_seconds,
+            'rows': report_fields[FEATURES[0]]['rows'],
+            'predictions': report_fields[PREDICTION_FIELD]['rows'],
+            'min_rows': self.min_rows,
+            'reference': {
+                'path': self.reference_path,
+                'available': reference is not None and reference_error is None,
+                'error': reference_error,
+                'created': reference.get('created') if reference else None,
+                'rows': reference.get('rows') if reference else None,
+                'source': reference.get('source') if reference else None
+            },
+            'thresholds': {'psi_moderate': PSI_MODERATE, 'psi_significant': PSI_SIGNIFICANT},
+            'drifting': drifting,
+            'features': {field: report_fields[field] for field in FEATURES},
+            PREDICTION_FIELD: report_fields[PREDICTION_FIELD],
+            'memory_bytes': self.memory_bytes()
+        }
+
+
+def build_reference(values, predictions, source, spec=None):
+    """Reference profile (JSON-serialisable) from validated training rows"""
+    spec = spec or bin_spec()
+    histograms = Histograms(spec)
+    feature_counts, _ = histograms.counts(values, np.arange(len(FEATURES)))
+    profile = {
+        'created': datetime.utcnow().isoformat() + 'Z',
+        'source': source,
+        'rows': int(len(values)),
+        'bins': {field: list(s) for field, s in spec.items()},
+        'features': {
+            field: {
+                'counts': feature_counts[i, :spec[field][2] + 2].tolist(),
+                'mean': round(float(np.nanmean(values[:, i])), 4) if len(values) else None
+            }
+            for i, field in enumerate(FEATURES)
+        }
+    }
+    if predictions is not None and len(predictions):
+        column = np.array([len(FEATURES)])
+        prediction_counts, _ = histograms.counts(np.asarray(predictions, dtype=np.float64).reshape(-1, 1), column)
+        profile['features'][PREDICTION_FIELD] = {
+            'counts': prediction_counts[0, :spec[PREDICTION_FIELD][2] + 2].tolist(),
+            'mean': round(float(np.mean(predictions)), 4)
+        }
+    return profile
+
+
+def main():
+    import joblib
+    import pandas as pd
+    from ml import batch_engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='training data as CSV or Parquet, with the FEATURES columns')
+    parser.add_argument('--model', default=MODEL_PATH, help='model used for the predicted price range profile')
+    parser.add_argument('--output', help='where to write the profile (default: next to the model)')
+    parser.add_argument('--no-predictions', action='store_true', help='skip profiling the predicted price range')
+    args = parser.parse_args()
+
+    if args.data.lower().endswith(('.parquet', '.pq')):
+        df = pd.read_parquet(args.data)
+    else:
+        df = pd.read_csv(args.data)
+    missing = [field for field in FEATURES if field not in df.columns]
+    if missing:
+        raise SystemExit(f"Missing columns in {args.data}: {', '.join(missing)}")
+
+    values, error_codes = batch_engine.coerce_columns(df)
+    values = values[error_codes == 0]
+    predictions = None
+    if not args.no_predictions:
+        if not os.path.exists(args.model):
+            raise SystemExit(f"Model not found: {args.model} (pass --no-predictions to skip)")
+        result = batch_engine.score_block(joblib.load(args.model), values, np.zeros(len(values), dtype=np.int16))
+        predictions = result.predictions
+
+    profile = build_reference(values, predictions, os.path.basename(args.data))
+    output = args.output or default_reference_path(args.model)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(profile, file, indent=2)
+    print(f"Wrote reference profile of {len(values)} rows to {output}")
+
+
+if __name__ == '__main__':
+    main()
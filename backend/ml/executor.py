@@ -0,0 +1,96 @@
+"""
+Fixed-size inference executor.
+
+All model calls from the prediction routes go through one small thread pool
+per process, and the model's own OpenMP thread count is pinned so that
+WEB_WORKERS x INFERENCE_THREADS x MODEL_THREADS never exceeds CPU_BUDGET.
+"""
+import logging
+import threading
+
+from config import CPU_BUDGET, WEB_WORKERS, INFERENCE_THREADS, MODEL_THREADS
+from utils.pools import ProcessLocalPool
+
+THREAD_PARAMS = ('n_jobs', 'num_threads')
+
+
+def derive_model_threads(cpu_budget=CPU_BUDGET, web_workers=WEB_WORKERS,
+                         inference_threads=INFERENCE_THREADS, model_threads=MODEL_THREADS):
+    """Intra-op threads per model call that fit the global CPU budget"""
+    if model_threads > 0:
+        return model_threads
+    return max(1, cpu_budget // max(1, web_workers * inference_threads))
+
+
+def set_model_threads(model, threads):
+    """
+    Pin the thread count of every estimator in the model (a bare estimator or
+    a sklearn Pipeline) that exposes n_jobs/num_threads. Returns the number
+    of estimators updated.
+    """
+    estimators = [model]
+    if hasattr(model, 'steps'):
+        estimators.extend(step for _, step in model.steps)
+
+    updated = 0
+    for estimator in estimators:
+        if not hasattr(estimator, 'get_params') or not hasattr(estimator, 'set_params'):
+            continue
+        try:
+            params = estimator.get_params(deep=False)
+        except Exception:
+            continue
+        changes = {name: threads for name in THREAD_PARAMS if name in params}
+        if changes:
+            estimator.set_params(**changes)
+            updated += 1
+    return updated
+
+
+class InferenceExecutor:
+    """Bounded thread pool that owns every model call in this process."""
+
+    def __init__(self, threads=INFERENCE_THREADS, model_threads=None):
+        self.threads = max(1, threads)
+        self.model_threads = derive_model_threads() if model_threads is None else model_threads
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._pool = ProcessLocalPool(self.threads, 'inference', self._lock, self._reset)
+
+    def _reset(self):
+        self._in_flight = 0
+
+    def configure_model(self, model):
+        """Apply the budgeted intra-op thread count to a freshly loaded model"""
+        if model is not None:
+            updated = set_model_threads(model, self.model_threads)
+            logging.info(f"Model threads set to {self.model_threads} on {updated} estimator(s)")
+        return model
+
+    def _track(self, fn, args, kwargs):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        return self._pool.get().submit(self._track, fn, args, kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn on an inference thread and wait for its result"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def describe(self):
+        return {
+            'cpu_budget': CPU_BUDGET,
+            'web_workers': WEB_WORKERS,
+            'inference_threads': self.threads,
+            'model_threads': self.model_threads,
+            'in_flight': self._in_flight
+        }
+
+
+inference_executor = InferenceExecutor()
@@ -0,0 +1,240 @@
+"""
+Side-by-side model versions for safe roll-outs.
+
+The registry holds the primary model and, optionally, a candidate loaded
+from MODEL_CANDIDATE_PATH. MODEL_CANDIDATE_TRAFFIC percent of prediction
+requests are served by the candidate. For MODEL_SHADOW_RATE of requests
+(MODEL_SHADOW_BATCH_RATE of batch uploads) the version that did not serve
+is also scored off the request path, and its predictions are compared
+with the served ones. Shadow jobs run one at a time on the inference
+executor, so they share the CPU budget with live predictions instead of
+adding to it. Every model call is timed per version so
+/predict/models/report can compare latency, memory footprint and agreement.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+LATENCY_WINDOW = 2048  # most recent calls kept per version and kind for percentiles
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LatencyStats:
+    """Call count, row count and a sliding window of call latencies."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.calls = 0
+        self.rows = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, ms, rows):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += ms
+        self.recent.append(ms)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+        summary = {
+            'calls': self.calls,
+            'rows': self.rows,
+            'errors': self.errors,
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else None,
+            'ms_per_row': round(self.total_ms / self.rows, 4) if self.rows else None
+        }
+        for name, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            summary[name] = round(_percentile(ordered, fraction), 3) if ordered else None
+        return summary
+
+
+class ModelVersion:
+    """A ModelStore plus the call statistics recorded against it."""
+
+    def __init__(self, name, store):
+        self.name = name
+        self.store = store
+        self.served = 0
+        self.shadowed = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self.store.model
+
+    @property
+    def version(self):
+        return self.store.version
+
+    def is_ready(self):
+        return self.store.is_ready()
+
+    def call(self, kind, rows, fn, *args, **kwargs):
+        """Run fn (a model call) and record its latency under `kind`"""
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._stats.setdefault(kind, LatencyStats()).errors += 1
+            raise
+        ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats.setdefault(kind, LatencyStats()).record(ms, rows)
+        return result
+
+    def describe(self):
+        with self._lock:
+            latency = {kind: stats.summary() for kind, stats in self._stats.items()}
+        return {
+            **self.store.describe(),
+            'served_requests': self.served,
+            'shadow_requests': self.shadowed,
+            'latency': latency
+        }
+
+
+class ModelRegistry:
+    """Chooses the serving version per request and runs shadow comparisons."""
+
+    def __init__(self, primary, candidate=None, traffic_percent=0.0, shadow_rate=0.0, shadow_queue=8,
+                 shadow_batch_rate=None, executor=None):
+        self.primary = primary
+        self.candidate = candidate
+        self.traffic_percent = min(100.0, max(0.0, traffic_percent))
+        self.shadow_rate = min(1.0, max(0.0, shadow_rate))
+        self.shadow_batch_rate = self.shadow_rate if shadow_batch_rate is None else min(1.0, max(0.0, shadow_batch_rate))
+        self.shadow_queue = shadow_queue
+        self.executor = executor
+        self.compared_requests = 0
+        self.compared_rows = 0
+        self.agreeing_rows = 0
+        self.shadow_dropped = 0
+        self.shadow_errors = 0
+        self._pending = 0
+        self._waiting = deque()
+        self._running = False
+        self._lock = threading.Lock()
+
+    @property
+    def versions(self):
+        return [v for v in (self.primary, self.candidate) if v is not None]
+
+    def choose(self, kind='single'):
+        """(serving version, other version or None) for one request of `kind`"""
+        candidate = self.candidate
+        if candidate is None or not candidate.is_ready():
+            serving, other = self.primary, None
+        elif self.traffic_percent and random.random() * 100 < self.traffic_percent:
+            serving, other = candidate, self.primary
+        else:
+            serving, other = self.primary, candidate
+        shadow_rate = self.shadow_batch_rate if kind == 'batch' else self.shadow_rate
+        if other is not None and (not other.is_ready() or random.random() >= shadow_rate):
+            other = None
+        with self._lock:
+            serving.served += 1
+        return serving, other
+
+    def find(self, version):
+        """The ready ModelVersion whose model version string is `version`, or None"""
+        for candidate in self.versions:
+            if candidate.version == version and candidate.is_ready():
+                return candidate
+        return None
+
+    def shadow(self, version, kind, served_predictions, score, *args, **kwargs):
+        """
+        Score the same input with `version` in the background via
+        score(version.model, *args, **kwargs) and compare its predictions
+        with the served ones. Dropped when the shadow queue is full.
+        """
+        if version is None:
+            return False
+        job = (version, kind, served_predictions, score, args, kwargs)
+        with self._lock:
+            if self._pending >= self.shadow_queue:
+                self.shadow_dropped += 1
+                return False
+            self._pending += 1
+            if self._running:
+                self._waiting.append(job)
+                return True
+            self._running = True
+        self._submit(job)
+        return True
+
+    def _submit(self, job):
+        try:
+            self.executor.submit(self._run_shadow, *job)
+        except Exception as e:
+            # e.g. the executor is shutting down; the job is lost, not the queue
+            logging.error(f"Shadow scoring could not be scheduled: {str(e)}")
+            self._next_shadow(failed=True)
+
+    def _next_shadow(self, failed=False):
+        # One shadow job at a time: the next is queued behind any live
+        # predictions submitted meanwhile
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self.shadow_errors += 1
+            job = self._waiting.popleft() if self._waiting else None
+            self._running = job is not None
+        if job is not None:
+            self._submit(job)
+
+    def _run_shadow(self, version, kind, served_predictions, score, args, kwargs):
+        failed = False
+        try:
+            served = np.asarray(served_predictions).ravel()
+            shadowed = np.asarray(
+                version.call(kind, len(served), score, version.model, *args, **kwargs)
+            ).ravel()
+            agreeing = int((shadowed == served).sum()) if len(shadowed) == len(served) else 0
+            with self._lock:
+                version.shadowed += 1
+                self.compared_requests += 1
+                self.compared_rows += len(served)
+                self.agreeing_rows += agreeing
+        except Exception as e:
+            logging.error(f"Shadow scoring with {version.name} model failed: {str(e)}")
+            failed = True
+        finally:
+            self._next_shadow(failed)
+
+    def report(self):
+        comparison = {
+            'compared_requests': self.compared_requests,
+            'compared_rows': self.compared_rows,
+            'agreeing_rows': self.agreeing_rows,
+            'agreement_rate': round(self.agreeing_rows / self.compared_rows, 4) if self.compared_rows else None,
+            'shadow_pending': self._pending,
+            'shadow_dropped': self.shadow_dropped,
+            'shadow_errors': self.shadow_errors
+        }
+        if self.candidate is not None:
+            primary_latency = self.primary.describe()['latency'].get('single', {})
+            candidate_latency = self.candidate.describe()['latency'].get('single', {})
+            if primary_latency.get('p50_ms') and candidate_latency.get('p50_ms'):
+                comparison['single_p50_ratio'] = round(candidate_latency['p50_ms'] / primary_latency['p50_ms'], 3)
+        return {
+            'candidate_configured': self.candidate is not None,
+            'candidate_traffic_percent': self.traffic_percent,
+            'shadow_rate': self.shadow_rate,
+            'shadow_batch_rate': self.shadow_batch_rate,
+            'versions': {version.name: version.describe() for version in self.versions},
+            'comparison': comparison
+        }
@@ -0,0 +1,139 @@
+"""
+Holder for the served model and its load/warm-up lifecycle.
+
+The model can be loaded synchronously (the default, and what the gunicorn
+preload path relies on) or on a background thread in fast-start mode, in
+which case the readiness probe reports not-ready until warm-up finishes.
+"""
+import logging
+import os
+import threading
+import time
+
+from utils.http_cache import file_validator
+from utils.lazy import lazy_import
+from utils.startup import startup_timer
+
+psutil = lazy_import('psutil')
+
+NOT_LOADED = 'not_loaded'
+LOADING = 'loading'
+WARMING_UP = 'warming_up'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ModelStore:
+
+    def __init__(self, path, loader, warm_up=None):
+        self.path = path
+        self._loader = loader
+        self._warm_up = warm_up
+        self.model = None
+        self.version = 'none'
+        self.state = NOT_LOADED
+        self.warmed_up = False
+        self.error = None
+        self.timings = {}
+        self.footprint = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def _file_version(self):
+        """Identify the model file by size and mtime so caches can key on it"""
+        size, mtime_ns, _ = file_validator(self.path)
+        return f"{size:x}-{mtime_ns:x}" if size else 'none'
+
+    def _rss(self):
+        try:
+            return psutil.Process().memory_info().rss
+        except Exception:
+            return None
+
+    def load(self, warm_up=False):
+        """Load (and optionally warm up) the model on the calling thread"""
+        with self._lock:
+            self.state = LOADING
+            rss_before = self._rss()
+            start = time.perf_counter()
+            model = self._loader()
+            self.timings['load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            rss_after = self._rss()
+            # RSS growth across the load approximates the model's in-memory
+            # size; other threads allocating at the same time add noise
+            self.footprint = {
+                'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else None,
+                'load_rss_delta_bytes': rss_after - rss_before if rss_before and rss_after else None
+            }
+            startup_timer.record('model_load', time.perf_counter() - start)
+
+            if model is None:
+                self.state = FAILED
+                self.error = f"Model could not be loaded from {self.path}"
+                self._ready.set()
+                return None
+
+            self.model = model
+            self.version = self._file_version()
+            self.error = None
+            self.state = WARMING_UP if warm_up else READY
+        if warm_up:
+            self.warm_up()
+        self._ready.set()
+        return model
+
+    def replace(self, model, version):
+        """Serve an already loaded model (benchmarks, tests, model swaps)"""
+        with self._lock:
+            self.model = model
+            self.version = version
+            self.error = None
+            self.state = READY
+        self._ready.set()
+
+    def warm_up(self):
+        if self.model is None or self._warm_up is None:
+            return False
+        self.state = WARMING_UP
+        start = time.perf_counter()
+        self.warmed_up = bool(self._warm_up(self.model))
+        self.timings['warmup_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        startup_timer.record('model_warmup', time.perf_counter() - start)
+        self.state = READY
+        return self.warmed_up
+
+    def load_in_background(self):
+        """Fast-start mode: load and warm up without blocking app start-up"""
+        self.state = LOADING
+        self._thread = threading.Thread(
+            target=self._background_load, name='model-loader', daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def _background_load(self):
+        try:
+            self.load(warm_up=True)
+        except Exception as e:
+            logging.error(f"Background model load failed: {str(e)}")
+            self.state = FAILED
+            self.error = str(e)
+            self._ready.set()
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def is_ready(self):
+        return self.state == READY and self.model is not None
+
+    def describe(self):
+        return {
+            'state': self.state,
+            'path': self.path,
+            'version': self.version,
+            'warmed_up': self.warmed_up,
+            'error': self.error,
+            **self.timings,
+            **self.footprint
+        }
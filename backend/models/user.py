@@ -1,5 +1,5 @@
 from db import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.security import password_hasher
 
 class User(db.Model):
     __tablename__ = "users"
@@ -9,8 +9,9 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)  # unique login identifier
     password_hash = db.Column(db.String(128), nullable=False)
 
+    # Hashing runs on the bounded password hasher pool; raises HashingBusy when it is saturated
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def verify_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
@@ -0,0 +1,246 @@
+"""
+Re-score logged single predictions against a model and compare.
+
+Streams logs/predict.log, rebuilds each logged device from its stored
+features and scores it with the columnar batch engine in large blocks.
+The log is split into byte ranges that worker processes parse and score
+independently, each holding at most one block of rows, so memory stays
+flat however large the log is. Prints agreement statistics and a
+confusion matrix (logged vs re-scored price range) as JSON.
+
+Entries logged before every raw feature was recorded lack clock_speed,
+m_dep, mobile_wt, n_cores and talk_time; those are filled with the middle
+of the training range and reported separately as imputed rows.
+
+    cd backend
+    python replay_log.py --model models-ai/candidate.pkl --workers 8
+    python replay_log.py --log /data/predict.log --output replay.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+
+import joblib
+import numpy as np
+
+from config import FEATURES, FEATURE_RANGES, BOOLEAN_FIELDS, MODEL_PATH
+from ml import batch_engine
+from ml.executor import set_model_threads
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+DEFAULT_LOG = os.path.join('logs', 'predict.log')
+
+# Middle of the training range for features older log entries did not record
+IMPUTED_VALUES = np.array([
+    0.0 if field in BOOLEAN_FIELDS else (FEATURE_RANGES[field][0] + FEATURE_RANGES[field][1]) / 2
+    for field in FEATURES
+])
+
+_worker_model = None
+
+
+class ReplayStats:
+    """Counters and (logged, re-scored) pair counts, mergeable across workers."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.pairs = Counter()
+        self.imputed_pairs = Counter()
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.pairs.update(other.pairs)
+        self.imputed_pairs.update(other.imputed_pairs)
+        return self
+
+    @staticmethod
+    def _agreement(pairs):
+        total = sum(pairs.values())
+        agreeing = sum(count for (logged, scored), count in pairs.items() if logged == scored)
+        return {
+            'rows': total,
+            'agreeing': agreeing,
+            'agreement_rate': round(agreeing / total, 4) if total else None
+        }
+
+    def report(self):
+        all_pairs = self.pairs + self.imputed_pairs
+        labels = sorted({label for pair in all_pairs for label in pair})
+        matrix = [[all_pairs.get((logged, scored), 0) for scored in labels] for logged in labels]
+        per_class = {}
+        for i, label in enumerate(labels):
+            logged_total = sum(matrix[i])
+            per_class[str(label)] = {
+                'logged': logged_total,
+                'rescored': sum(row[i] for row in matrix),
+                'agreement_rate': round(matrix[i][i] / logged_total, 4) if logged_total else None
+            }
+        return {
+            'lines': dict(self.counts),
+            'overall': self._agreement(all_pairs),
+            'complete_rows': self._agreement(self.pairs),
+            'imputed_rows': self._agreement(self.imputed_pairs),
+            'per_class': per_class,
+            'confusion_matrix': {
+                'labels': labels,
+                'rows': 'logged predicted_price_range',
+                'columns': 're-scored predicted_price_range',
+                'matrix': matrix
+            }
+        }
+
+
+def parse_entry(line):
+    """(feature row, imputed?, logged label) for a single-prediction log line, else None"""
+    if b'"features"' not in line:
+        return None
+    _, separator, payload = line.partition(b' - ')
+    if not separator:
+        return None
+    entry = loads(payload)
+    features = entry.get('features')
+    label = entry.get('predicted_price_range')
+    if entry.get('type') != 'single' or not isinstance(features, dict) or label is None:
+        return None
+    row = IMPUTED_VALUES.copy()
+    imputed = False
+    for i, field in enumerate(FEATURES):
+        value = features.get(field)
+        if value is None:
+            imputed = True
+        else:
+            row[i] = float(value)
+    return row, imputed, int(label)
+
+
+def _score_block(model, rows, imputed, labels, count, stats):
+    values = rows[:count]
+    result = batch_engine.score_block(model, values, np.zeros(count, dtype=np.int16))
+    stats.counts['score_errors'] += len(result.errors)
+    scored_idx = result.rows - 1
+    for target, mask in ((stats.pairs, ~imputed[scored_idx]), (stats.imputed_pairs, imputed[scored_idx])):
+        pairs = labels[scored_idx][mask] * 1000 + result.predictions[mask]
+        keys, counts = np.unique(pairs, return_counts=True)
+        for key, pair_count in zip(keys.tolist(), counts.tolist()):
+            target[(key // 1000, key % 1000)] += pair_count
+
+
+def replay_range(model, path, start, end, block_rows):
+    """Parse and score the log lines that start inside [start, end)"""
+    stats = ReplayStats()
+    rows = np.empty((block_rows, len(FEATURES)), dtype=np.float64)
+    imputed = np.zeros(block_rows, dtype=bool)
+    labels = np.empty(block_rows, dtype=np.int64)
+    count = 0
+    with open(path, 'rb') as file:
+        if start > 0:
+            # Skip the line that straddles the range start; its owner reads it
+            file.seek(start - 1)
+            file.readline()
+        position = file.tell()
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            stats.counts['lines'] += 1
+            try:
+                parsed = parse_entry(line)
+            except (ValueError, TypeError):
+                stats.counts['malformed'] += 1
+                continue
+            if parsed is None:
+                stats.counts['skipped'] += 1
+                continue
+            rows[count], imputed[count], labels[count] = parsed
+            stats.counts['replayed'] += 1
+            stats.counts['imputed'] += int(imputed[count])
+            count += 1
+            if count == block_rows:
+                _score_block(model, rows, imputed, labels, count, stats)
+                count = 0
+    if count:
+        _score_block(model, rows, imputed, labels, count, stats)
+    return stats
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model = joblib.load(model_path)
+    # Parallelism comes from the processes; one OpenMP thread each
+    set_model_threads(_worker_model, 1)
+
+
+def _replay_range_in_worker(path, start, end, block_rows):
+    return replay_range(_worker_model, path, start, end, block_rows)
+
+
+def split_ranges(size, parts):
+    step = max(1, -(-size // parts))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def replay(log_path, model_path, workers=1, block_rows=50000):
+    size = os.path.getsize(log_path)
+    if workers <= 1:
+        model = joblib.load(model_path)
+        return replay_range(model, log_path, 0, size, block_rows)
+
+    # Several ranges per worker so one slow range does not idle the rest
+    ranges = split_ranges(size, workers * 4)
+    context = get_context('fork') if 'fork' in get_all_start_methods() else None
+    stats = ReplayStats()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = [pool.submit(_replay_range_in_worker, log_path, start, end, block_rows)
+                   for start, end in ranges]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', default=DEFAULT_LOG, help='prediction log to replay')
+    parser.add_argument('--model', default=MODEL_PATH, help='model to re-score with')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--block-rows', type=int, default=50000, help='rows scored per model call')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args()
+
+    for path in (args.log, args.model):
+        if not os.path.exists(path):
+            sys.exit(f"Not found: {path}")
+
+    start = time.perf_counter()
+    stats = replay(args.log, args.model, max(1, args.workers), max(1, args.block_rows))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'log': os.path.abspath(args.log),
+        'log_bytes': os.path.getsize(args.log),
+        'model': os.path.abspath(args.model),
+        'workers': args.workers,
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_second': round(stats.counts['replayed'] / elapsed) if elapsed else None,
+        **stats.report()
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 from flask import Blueprint, jsonify
 import os
-import joblib
 import logging
 from db import db
 from datetime import datetime
-import psutil
-from config import MODEL_PATH, DEBUG
+from sqlalchemy import text
+from config import MODEL_PATH, DEBUG, FAST_START
+from ml.executor import inference_executor
+from routes.predict import admission, model_store, progress_cache, progress_streams, rate_limiter, result_cache
+from utils.lazy import lazy_import
+from utils.security import password_hasher, token_cache
+from utils.startup import startup_timer
+
+joblib = lazy_import('joblib')
+psutil = lazy_import('psutil')
 
 health_bp = Blueprint('health', __name__)
 
@@ -40,7 +47,7 @@ def detailed_health():
         
         # Check database connection
         try:
-            db.engine.execute('SELECT 1')
+            db.session.execute(text('SELECT 1'))
             health_status['components']['database'] = {
                 'status': 'healthy',
                 'message': 'Database connection successful'
@@ -94,6 +101,13 @@ def detailed_health():
                 'error': str(e)
             }
         
+        # Inference thread budget: workers x threads x model threads
+        health_status['inference'] = inference_executor.describe()
+        health_status['admission'] = admission.describe()
+        health_status['auth'] = {'password_hashing': password_hasher.describe(), 'jwt_cache': token_cache.describe()}
+        health_status['result_cache'] = result_cache.describe()
+        health_status['batch_progress'] = {'store': progress_cache.describe(), 'streams': progress_streams.describe()}
+        
         # Environment info
         health_status['environment'] = {
             'flask_env': os.environ.get('FLASK_ENV', 'development'),
@@ -121,16 +135,23 @@ def readiness_check():
         
         # Database check
         try:
-            db.engine.execute('SELECT 1')
+            db.session.execute(text('SELECT 1'))
             checks.append({'name': 'database', 'status': 'ready'})
         except Exception as e:
             checks.append({'name': 'database', 'status': 'not_ready', 'error': str(e)})
         
-        # Model check
-        if os.path.exists(MODEL_PATH):
+        # Model check: not ready until the model is loaded and warmed up
+        if model_store.is_ready():
             checks.append({'name': 'ml_model', 'status': 'ready'})
-        else:
+        elif not os.path.exists(MODEL_PATH):
             checks.append({'name': 'ml_model', 'status': 'not_ready', 'error': 'Model file not found'})
+        else:
+            checks.append({
+                'name': 'ml_model',
+                'status': 'not_ready',
+                'state': model_store.state,
+                'error': model_store.error
+            })
         
         # Determine overall readiness
         all_ready = all(check['status'] == 'ready' for check in checks)
@@ -169,4 +190,24 @@ def liveness_check():
             'alive': False,
             'error': str(e),
             'timestamp': datetime.utcnow().isoformat()
-        }), 500
\ No newline at end of file
+        }), 500
+
+@health_bp.route('/startup', methods=['GET'])
+def startup_report():
+    """Where start-up time went: import, app creation, model load and warm-up"""
+    return jsonify({
+        'fast_start': FAST_START,
+        'startup': startup_timer.report(),
+        'model': model_store.describe(),
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
+
+@health_bp.route('/admission', methods=['GET'])
+def admission_report():
+    """Adaptive concurrency limits, row quota and rejection counters for this worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'admission': admission.describe(),
+        'rate_limit': rate_limiter.describe(),
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
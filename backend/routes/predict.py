@@ -1,14 +1,52 @@
-from flask import Blueprint, request, jsonify
-import joblib
-import pandas as pd
-import numpy as np
+from flask import Blueprint, Response, g, request, jsonify, stream_with_context
 import logging
+import math
 import os
 import json
+import time
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import tempfile
 from datetime import datetime
-from config import MODEL_PATH, FEATURES
+from config import (
+    MODEL_PATH, FEATURES, FEATURE_RANGES, FAST_START, NUMERIC_FIELDS, BOOLEAN_FIELDS,
+    BATCH_CACHE_ENABLED, BATCH_CACHE_DIR, BATCH_CACHE_MAX_AGE, BATCH_CACHE_MAX_BYTES,
+    SERVER_TIMING_ENABLED, SERVER_TIMING_ALLOW_ORIGIN, REQUEST_LOG_ENABLED, REQUEST_LOG_FILE,
+    BATCH_MAX_DECOMPRESSED_BYTES, MODEL_CANDIDATE_PATH, MODEL_CANDIDATE_TRAFFIC, MODEL_SHADOW_RATE,
+    MODEL_SHADOW_BATCH_RATE, MODEL_SHADOW_QUEUE, PREDICT_MAX_DEVICES, ADMISSION_ENABLED, ADMISSION_SINGLE_LIMIT,
+    ADMISSION_SINGLE_MAX, ADMISSION_SINGLE_TARGET_MS, ADMISSION_BATCH_LIMIT, ADMISSION_BATCH_MAX,
+    ADMISSION_BATCH_TARGET_MS, ADMISSION_BACKOFF, ADMISSION_YIELD_SECONDS, RATE_LIMIT_ENABLED,
+    RATE_LIMIT_ROWS_PER_SECOND, RATE_LIMIT_BURST_ROWS, RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_DB_PATH, DRIFT_ENABLED, DRIFT_REFERENCE_PATH, BATCH_DEADLINE_RESERVE_MS,
+    RESULT_CACHE_BACKEND, RESULT_CACHE_PATH, RESULT_CACHE_URL, RESULT_CACHE_PREDICTIONS_TTL,
+    RESULT_CACHE_PREDICTIONS_MAX_BYTES, RESULT_CACHE_HISTORY_TTL, RESULT_CACHE_HISTORY_MAX_BYTES,
+    RESULT_CACHE_ANALYTICS_TTL, RESULT_CACHE_ANALYTICS_MAX_BYTES, BATCH_PROGRESS_TTL, BATCH_PROGRESS_MAX_BYTES,
+    BATCH_PROGRESS_INTERVAL, BATCH_PROGRESS_WAIT, BATCH_PROGRESS_BACKEND, BATCH_PROGRESS_PATH,
+    BATCH_PROGRESS_MAX_STREAMS, WEB_WORKERS
+)
+from ml import batch_engine
+from ml.drift import DriftMonitor
+from ml.executor import inference_executor
+from ml.model_registry import ModelRegistry, ModelVersion
+from ml.model_store import ModelStore
+from services.batch_cache import BatchResultCache, batch_cache_key, hash_upload
+from services.result_cache import cache_key, create_result_cache
+from services.batch_progress import BatchProgress, StreamSlots, progress_events, valid_progress_id
+from services.batch_continuation import InvalidContinuation, make_continuation_token, read_continuation_token
+from utils.admission import AdaptiveLimit, AdmissionController, admit_request, release_request
+from utils.batch_io import (
+    BATCH_OUTPUT_FORMATS, UPLOAD_FORMAT_LABELS, UploadTooLarge, inspect_upload, open_upload,
+    read_batch_upload, parquet_available, render_batch_output
+)
+from utils.http_cache import file_validator, make_etag, add_validators, not_modified
+from utils.lazy import lazy_import
+from utils.rate_limit import create_rate_limiter, request_identity
+from utils.timing import timed, current_timer, start_request_timer, finish_request_timer, setup_request_logging
+
+# Heavy modules are imported on first use to keep application start-up fast
+joblib = lazy_import('joblib')
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
 
 predict_bp = Blueprint('predict', __name__)
 
@@ -35,9 +73,78 @@ def setup_prediction_logging():
 
 # Initialize prediction logger
 prediction_logger = setup_prediction_logging()
+request_logger = setup_request_logging(REQUEST_LOG_FILE) if REQUEST_LOG_ENABLED else None
+
+@predict_bp.before_request
+def start_stage_timer():
+    if SERVER_TIMING_ENABLED or REQUEST_LOG_ENABLED:
+        start_request_timer()
+
+@predict_bp.after_request
+def add_server_timing(response):
+    """Server-Timing header and structured request log line with the per-stage breakdown"""
+    return finish_request_timer(response, SERVER_TIMING_ENABLED, SERVER_TIMING_ALLOW_ORIGIN, request_logger)
+
+# Separate adaptive concurrency limits for single and batch inference;
+# single predictions have priority (see utils/admission.py)
+admission = AdmissionController([
+    AdaptiveLimit('single', ADMISSION_SINGLE_LIMIT, max_limit=ADMISSION_SINGLE_MAX,
+                  target_ms=ADMISSION_SINGLE_TARGET_MS, backoff=ADMISSION_BACKOFF),
+    AdaptiveLimit('batch', ADMISSION_BATCH_LIMIT, max_limit=ADMISSION_BATCH_MAX,
+                  target_ms=ADMISSION_BATCH_TARGET_MS, backoff=ADMISSION_BACKOFF)
+], yield_seconds=ADMISSION_YIELD_SECONDS, enabled=ADMISSION_ENABLED)
+
+ADMISSION_CLASSES = {
+    'predict.predict_single': 'single',
+    'predict.explain_prediction': 'single',
+    'predict.predict_batch': 'batch'
+}
+
+# Per-user (or per-IP) row quota, charged for every predicted row
+rate_limiter = create_rate_limiter(
+    RATE_LIMIT_ENABLED, RATE_LIMIT_BACKEND, RATE_LIMIT_ROWS_PER_SECOND,
+    RATE_LIMIT_BURST_ROWS, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_DB_PATH
+)
+
+@predict_bp.before_request
+def admit_inference_request():
+    """429 for callers out of row quota, then 503 + Retry-After over the adaptive limit"""
+    request_class = ADMISSION_CLASSES.get(request.endpoint)
+    if request_class is None:
+        return None
+    if rate_limiter.enabled:
+        g.rate_identity = request_identity()
+        limited = rate_limiter.check(g.rate_identity)
+        if limited is not None:
+            return limited
+    return admit_request(admission, request_class)
+
+def charge_rows(rows):
+    """Charge predicted rows to the caller's row quota"""
+    identity = g.get('rate_identity')
+    if identity is not None:
+        rate_limiter.charge(identity, rows)
+
+@predict_bp.after_request
+def release_admission(response):
+    release_request(failed=response.status_code >= 500)
+    return response
+
+@predict_bp.teardown_request
+def release_admission_on_error(error=None):
+    release_request(failed=True)
+
+# Constant-memory histograms of served inputs and predictions for /predict/drift
+drift_monitor = DriftMonitor(reference_path=DRIFT_REFERENCE_PATH or None)
+
+def observe_batch_rows(values, error_codes):
+    """batch_engine.run_batch hook: feed the rows that passed validation to the drift monitor"""
+    drift_monitor.observe(values, valid=error_codes == 0)
 
 def log_prediction(user_id, prediction_data):
     """Log prediction to file"""
+    if DRIFT_ENABLED and isinstance(prediction_data.get('features'), dict):
+        drift_monitor.observe_record(prediction_data['features'], prediction_data.get('predicted_price_range'))
     try:
         log_entry = {
             'timestamp': datetime.utcnow().isoformat() + 'Z',
@@ -49,22 +156,47 @@ def log_prediction(user_id, prediction_data):
     except Exception as e:
         logging.error(f"Error logging prediction: {str(e)}")
 
-def load_model():
+def log_predictions(user_id, entries):
+    """Log several predictions, one line each, with a single app log message"""
+    if not entries:
+        return
+    try:
+        timestamp = datetime.utcnow().isoformat() + 'Z'
+        for prediction_data in entries:
+            log_entry = {'timestamp': timestamp, 'user_id': user_id, **prediction_data}
+            prediction_logger.info(json.dumps(log_entry, ensure_ascii=False))
+        logging.info(f"Logged {len(entries)} predictions for user {user_id}")
+    except Exception as e:
+        logging.error(f"Error logging predictions: {str(e)}")
+
+def load_model(path=MODEL_PATH):
     """Load the ML model, handling potential errors"""
     try:
-        if os.path.exists(MODEL_PATH):
-            model = joblib.load(MODEL_PATH)
-            logging.info(f"Model loaded successfully from {MODEL_PATH}")
-            return model
+        if os.path.exists(path):
+            model = joblib.load(path)
+            logging.info(f"Model loaded successfully from {path}")
+            return inference_executor.configure_model(model)
         else:
-            logging.error(f"Model file not found at {MODEL_PATH}")
+            logging.error(f"Model file not found at {path}")
             return None
     except Exception as e:
         logging.error(f"Error loading model: {str(e)}")
         return None
 
-# Try to load model on startup
-model = load_model()
+batch_cache = BatchResultCache(BATCH_CACHE_DIR, BATCH_CACHE_MAX_AGE, BATCH_CACHE_MAX_BYTES)
+
+# Smaller results, shared by all workers unless RESULT_CACHE_BACKEND is memory
+result_cache = create_result_cache(RESULT_CACHE_BACKEND, RESULT_CACHE_PATH, RESULT_CACHE_URL)
+prediction_cache = result_cache.namespace('predictions', RESULT_CACHE_PREDICTIONS_TTL, RESULT_CACHE_PREDICTIONS_MAX_BYTES)
+history_cache = result_cache.namespace('history', RESULT_CACHE_HISTORY_TTL, RESULT_CACHE_HISTORY_MAX_BYTES)
+analytics_cache = result_cache.namespace('analytics', RESULT_CACHE_ANALYTICS_TTL, RESULT_CACHE_ANALYTICS_MAX_BYTES)
+
+# Batch progress states; every worker must see them, as the upload and its
+# event stream are usually served by different workers
+progress_cache = create_result_cache(BATCH_PROGRESS_BACKEND, BATCH_PROGRESS_PATH, RESULT_CACHE_URL)
+progress_store = progress_cache.namespace('progress', BATCH_PROGRESS_TTL, BATCH_PROGRESS_MAX_BYTES)
+progress_shared = progress_store.enabled and (progress_cache.backend.name != 'memory' or WEB_WORKERS == 1)
+progress_streams = StreamSlots(BATCH_PROGRESS_MAX_STREAMS)
 
 def validate_device_data(data):
     """Validate device data input based on actual model features"""
@@ -74,19 +206,8 @@ def validate_device_data(data):
         if field not in data:
             return False, f"Missing required field: {field}"
     
-    # Type validation for numeric fields
-    numeric_fields = [
-        'battery_power', 'clock_speed', 'fc', 'int_memory', 'm_dep',
-        'mobile_wt', 'n_cores', 'pc', 'px_height', 'px_width', 'ram',
-        'sc_h', 'sc_w', 'talk_time'
-    ]
-    
-    boolean_fields = [
-        'blue', 'dual_sim', 'four_g', 'three_g', 'touch_screen', 'wifi'
-    ]
-    
     # Validate numeric fields
-    for field in numeric_fields:
+    for field in NUMERIC_FIELDS:
         if field in data:
             try:
                 data[field] = float(data[field])
@@ -94,7 +215,7 @@ def validate_device_data(data):
                 return False, f"Invalid numeric value for field {field}"
     
     # Validate boolean fields (convert to 0/1)
-    for field in boolean_fields:
+    for field in BOOLEAN_FIELDS:
         if field in data:
             if isinstance(data[field], bool):
                 data[field] = int(data[field])
@@ -107,8 +228,10 @@ def validate_device_data(data):
     
     return True, None
 
-def prepare_features(data):
+def prepare_features(data, model=None):
     """Prepare features for model prediction using exact feature order the model expects"""
+    if model is None:
+        model = model_store.model
     if hasattr(model, "feature_names_in_"):
         feature_order = model.feature_names_in_
     else:
@@ -117,6 +240,78 @@ def prepare_features(data):
     feature_df = pd.DataFrame([{f: data.get(f, 0) for f in feature_order}])
     return feature_df
 
+def warm_up_model(model):
+    """Run throwaway single and batch predictions so the first request is not slowed by lazy initialisation"""
+    if model is None:
+        return False
+    try:
+        start = time.perf_counter()
+        sample = {field: 1 for field in FEATURES}
+        data = dict(sample)
+        validate_device_data(data)
+        features = prepare_features(feature_engineering(data), model)
+        model.predict(features)
+        if hasattr(model, 'predict_proba'):
+            model.predict_proba(features)
+        values, error_codes = batch_engine.coerce_columns(pd.DataFrame([sample] * 8))
+        batch_engine.score_block(model, values, error_codes)
+        logging.info(f"Model warm-up finished in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return True
+    except Exception as e:
+        logging.error(f"Model warm-up failed: {str(e)}")
+        return False
+
+# Load the model on startup; in fast-start mode it loads and warms up on a
+# background thread and /health/ready reports not-ready until it finishes
+model_store = ModelStore(MODEL_PATH, load_model, warm_up_model)
+candidate_store = None
+if MODEL_CANDIDATE_PATH:
+    candidate_store = ModelStore(MODEL_CANDIDATE_PATH, lambda: load_model(MODEL_CANDIDATE_PATH), warm_up_model)
+for store in (model_store, candidate_store):
+    if store is None:
+        continue
+    if FAST_START:
+        store.load_in_background()
+    else:
+        store.load()
+
+model_registry = ModelRegistry(
+    ModelVersion('primary', model_store),
+    ModelVersion('candidate', candidate_store) if candidate_store is not None else None,
+    traffic_percent=MODEL_CANDIDATE_TRAFFIC,
+    shadow_rate=MODEL_SHADOW_RATE,
+    shadow_queue=MODEL_SHADOW_QUEUE,
+    shadow_batch_rate=MODEL_SHADOW_BATCH_RATE,
+    executor=inference_executor
+)
+
+def shadow_single(model, data, features):
+    """Shadow scorer for /predict/; reuses the served features when the column order matches"""
+    if list(getattr(model, 'feature_names_in_', FEATURES)) != list(features.columns):
+        features = prepare_features(data, model)
+    return model.predict(features)
+
+def batch_deadline():
+    """
+    The perf_counter() time by which /predict/batch scoring should stop, from
+    an X-Deadline-Ms header or ?deadline_ms= budget counted from the start of
+    the request. None when no deadline was given; ValueError when malformed.
+    """
+    raw = request.headers.get('X-Deadline-Ms') or request.args.get('deadline_ms')
+    if raw is None:
+        return None
+    budget_ms = float(raw)
+    if not math.isfinite(budget_ms) or budget_ms <= 0:
+        raise ValueError(raw)
+    timer = current_timer()
+    started = timer.started if timer is not None else time.perf_counter()
+    return started + (budget_ms - BATCH_DEADLINE_RESERVE_MS) / 1000
+
+def shadow_batch(model, blocks):
+    """Shadow scorer for /predict/batch over the (values, error_codes) blocks the served call parsed"""
+    parts = [batch_engine.score_block(model, values, error_codes).predictions for values, error_codes in blocks]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
 def read_user_predictions(user_id):
     """Read predictions from log file for a specific user"""
     predictions = []
@@ -180,6 +375,51 @@ def read_user_predictions(user_id):
     
     return predictions
 
+def cached_user_predictions(user_id, log_size, log_mtime_ns):
+    """read_user_predictions through the history cache; the log's size and mtime in the key retire stale entries"""
+    key = cache_key('history', user_id, os.path.abspath(PREDICTION_LOG_FILE), log_size, log_mtime_ns)
+    return history_cache.get_or_set(key, lambda: read_user_predictions(user_id))
+
+def summarize_predictions(predictions, days=7, top_brands=5):
+    """Rollups of a user's history: totals, price range distribution, daily counts and top brands"""
+    price_ranges = {str(price_range): 0 for price_range in range(4)}
+    types = {}
+    daily = {}
+    brands = {}
+    confidence_total = 0.0
+    for prediction in predictions:
+        price_range = prediction.get('predicted_price_range')
+        if price_range is not None:
+            price_ranges[str(price_range)] = price_ranges.get(str(price_range), 0) + 1
+        types[prediction.get('type')] = types.get(prediction.get('type'), 0) + 1
+        confidence_total += prediction.get('confidence') or 0
+        day = (prediction.get('createdAt') or '')[:10]
+        if day:
+            stats = daily.setdefault(day, [0, 0.0])
+            stats[0] += 1
+            stats[1] += prediction.get('confidence') or 0
+        brand = prediction.get('brand')
+        if prediction.get('type') == 'single' and brand:
+            stats = brands.setdefault(brand, [0, 0])
+            stats[0] += 1
+            stats[1] += price_range or 0
+    
+    total = len(predictions)
+    return {
+        'total_predictions': total,
+        'avg_confidence': confidence_total / total if total else 0.0,
+        'by_type': types,
+        'price_distribution': price_ranges,
+        'daily': [
+            {'date': day, 'predictions': count, 'avg_confidence': confidence / count}
+            for day, (count, confidence) in sorted(daily.items())[-days:]
+        ],
+        'top_brands': [
+            {'brand': brand, 'predictions': count, 'avg_price_range': round(range_total / count)}
+            for brand, (count, range_total) in sorted(brands.items(), key=lambda item: -item[1][0])[:top_brands]
+        ]
+    }
+
 
 def feature_engineering(data):
     data['camera_total'] = data.get('fc',0) + data.get('pc',0)
@@ -208,10 +448,160 @@ def feature_engineering(data):
             data[f] = 0
     return data
 
+def logged_features(data):
+    """Every raw feature of a validated device, so replay_log.py can re-score the entry exactly"""
+    return {
+        'battery_power': data['battery_power'],
+        'ram': data['ram'],
+        'int_memory': data['int_memory'],
+        'fc': data['fc'],
+        'pc': data['pc'],
+        'sc_h': data['sc_h'],
+        'sc_w': data['sc_w'],
+        'px_height': data['px_height'],
+        'px_width': data['px_width'],
+        'clock_speed': data['clock_speed'],
+        'm_dep': data['m_dep'],
+        'mobile_wt': data['mobile_wt'],
+        'n_cores': data['n_cores'],
+        'talk_time': data['talk_time'],
+        'blue': bool(data['blue']),
+        'dual_sim': bool(data['dual_sim']),
+        'four_g': bool(data['four_g']),
+        'three_g': bool(data['three_g']),
+        'touch_screen': bool(data['touch_screen']),
+        'wifi': bool(data['wifi'])
+    }
+
+def device_features(data):
+    """The device_features block of a /predict/ response"""
+    return {
+        'battery_power': data['battery_power'],
+        'ram': data['ram'],
+        'internal_memory': data['int_memory'],
+        'camera_front': data['fc'],
+        'camera_primary': data['pc'],
+        'screen_height': data['sc_h'],
+        'screen_width': data['sc_w'],
+        'pixel_height': data['px_height'],
+        'pixel_width': data['px_width'],
+        'has_bluetooth': bool(data['blue']),
+        'has_dual_sim': bool(data['dual_sim']),
+        'has_4g': bool(data['four_g']),
+        'has_3g': bool(data['three_g']),
+        'has_touch_screen': bool(data['touch_screen']),
+        'has_wifi': bool(data['wifi'])
+    }
+
+def validate_devices(items):
+    """
+    Columnwise validate_device_data for a list of devices. Returns the
+    (rows, len(FEATURES)) matrix of valid devices, their input positions,
+    and a per-position error message (None for valid devices), with the
+    same messages validate_device_data would give.
+    """
+    messages = [None] * len(items)
+    present = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            messages[i] = 'Each device must be a JSON object'
+            continue
+        missing = next((field for field in FEATURES if field not in item), None)
+        if missing is not None:
+            messages[i] = f"Missing required field: {missing}"
+            continue
+        present.append(i)
+
+    columns = {}
+    for field in FEATURES:
+        column = [items[i][field] for i in present]
+        series = pd.Series(column)
+        # pandas turns None into NaN in numeric columns; keep those as
+        # objects so None fails the same float()/bool checks as per device
+        if not pd.api.types.is_numeric_dtype(series.dtype) or None in column:
+            series = pd.Series(column, dtype=object)
+        columns[field] = series
+    frame = pd.DataFrame(columns)
+    values, error_codes = batch_engine.coerce_columns(frame)
+    for j in np.flatnonzero(error_codes):
+        messages[present[j]] = batch_engine.ERROR_MESSAGES[error_codes[j]]
+    valid = np.flatnonzero(error_codes == 0)
+    return values[valid], [present[j] for j in valid], messages
+
+def shadow_devices(model, values):
+    """Shadow scorer for multi-device /predict/ requests"""
+    return model.predict(batch_engine.build_feature_frame(values, batch_engine.get_feature_order(model)))
+
+def predict_devices(items, serving, shadow_version, user_id):
+    """/predict/ with a JSON array: one vectorised model call, results in input order"""
+    model = serving.model
+    with timed('validate'):
+        values, positions, messages = validate_devices(items)
+
+    predictions, probabilities = [], None
+    if positions:
+        with timed('features'):
+            features = batch_engine.build_feature_frame(values, batch_engine.get_feature_order(model))
+        with timed('predict'):
+            predictions = inference_executor.run(serving.call, 'multi', len(positions), model.predict, features)
+        model_registry.shadow(shadow_version, 'multi', predictions, shadow_devices, values)
+        charge_rows(len(positions))
+        if DRIFT_ENABLED:
+            drift_monitor.observe(values, predictions)
+        if hasattr(model, 'predict_proba'):
+            try:
+                with timed('proba'):
+                    probabilities = inference_executor.run(
+                        serving.call, 'proba', len(positions), model.predict_proba, features
+                    ).tolist()
+            except Exception:
+                pass
+
+    results = [{'index': i, 'error': message} for i, message in enumerate(messages)]
+    log_entries = []
+    base_id = int(datetime.utcnow().timestamp() * 1000)
+    for n, (position, row) in enumerate(zip(positions, values.tolist())):
+        data = dict(zip(FEATURES, row))
+        prediction = int(predictions[n])
+        proba = probabilities[n] if probabilities is not None else None
+        item = items[position]
+        log_entries.append({
+            'id': base_id + n,
+            'type': 'single',
+            'brand': item.get('brand', 'Unknown'),
+            'model': item.get('model_name', item.get('model', 'Unknown')),
+            'predicted_price_range': prediction,
+            'confidence': float(max(proba) * 100) if proba is not None else 95.0,
+            'model_version': serving.version,
+            'features': logged_features(data)
+        })
+        results[position] = {
+            'index': position,
+            'predicted_price_range': prediction,
+            'confidence': proba,
+            'device_features': device_features(data)
+        }
+
+    with timed('log'):
+        log_predictions(user_id, log_entries)
+
+    logging.info(f"Predictions made for {len(positions)} of {len(items)} devices")
+    with timed('serialize'):
+        response = jsonify({
+            'predictions': results,
+            'total_devices': len(items),
+            'successful_predictions': len(positions),
+            'errors_count': len(items) - len(positions)
+        })
+    response.headers['X-Model-Version'] = serving.version
+    return response, 200
+
 @predict_bp.route('/', methods=['POST'])
 def predict_single():
-    """Single device price prediction"""
+    """Device price prediction for one JSON object or a JSON array of devices"""
     try:
+        serving, shadow_version = model_registry.choose()
+        model = serving.model
         if model is None:
             return jsonify({
                 'error': 'ML model not available. Please ensure the model is trained and placed in the models directory.',
@@ -220,33 +610,61 @@ def predict_single():
         
         # Use a default user_id since we're not using JWT authentication
         user_id = "anonymous_user"
-        data = request.get_json()
+        with timed('parse'):
+            data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
+        # A JSON array scores several devices in one call
+        if isinstance(data, list):
+            if len(data) > PREDICT_MAX_DEVICES:
+                return jsonify({
+                    'error': f'Too many devices: at most {PREDICT_MAX_DEVICES} per request',
+                    'devices': len(data)
+                }), 413
+            return predict_devices(data, serving, shadow_version, user_id)
+        
         # Validate input data
-        is_valid, error_msg = validate_device_data(data)
+        with timed('validate'):
+            is_valid, error_msg = validate_device_data(data)
         if not is_valid:
             return jsonify({'error': error_msg}), 400
         
         # Prepare features for prediction
         original_data = data.copy()  # Keep original for logging
-        data = feature_engineering(data)
-        features = prepare_features(data)
-        
-        # Make prediction
-        prediction = model.predict(features)[0]
+        with timed('features'):
+            data = feature_engineering(data)
         
-        # Get prediction probability if available (for classification models)
-        prediction_proba = None
-        confidence = 95.0  # Default confidence
-        if hasattr(model, 'predict_proba'):
-            try:
-                proba = model.predict_proba(features)[0]
-                prediction_proba = proba.tolist()
-                confidence = float(max(proba) * 100)  # Confidence as percentage
-            except:
-                pass
+        # The same device on the same model version is answered from the result cache
+        prediction_key = cache_key('single', serving.version, logged_features(data))
+        with timed('cache'):
+            cached_prediction = prediction_cache.get(prediction_key)
+        if cached_prediction is not None:
+            prediction, prediction_proba = cached_prediction['prediction'], cached_prediction['proba']
+        else:
+            with timed('prepare'):
+                features = prepare_features(data, model)
+            
+            # Make prediction
+            with timed('predict'):
+                prediction = inference_executor.run(serving.call, 'single', 1, model.predict, features)[0]
+            model_registry.shadow(shadow_version, 'single', [prediction], shadow_single, data, features)
+            
+            # Get prediction probability if available (for classification models)
+            prediction_proba = None
+            if hasattr(model, 'predict_proba'):
+                try:
+                    with timed('proba'):
+                        proba = inference_executor.run(serving.call, 'proba', 1, model.predict_proba, features)[0]
+                    prediction_proba = proba.tolist()
+                except:
+                    pass
+            with timed('cache'):
+                prediction_cache.set(prediction_key, {'prediction': int(prediction), 'proba': prediction_proba})
+            # Only scored rows use quota; cache hits are free, as for batches
+            charge_rows(1)
+        # Confidence as percentage, with a default for models without predict_proba
+        confidence = float(max(prediction_proba) * 100) if prediction_proba else 95.0
         
         # Log the prediction
         log_data = {
@@ -256,52 +674,27 @@ def predict_single():
             'model': original_data.get('model_name', original_data.get('model', 'Unknown')),
             'predicted_price_range': int(prediction),
             'confidence': confidence,
-            'features': {
-                'battery_power': data['battery_power'],
-                'ram': data['ram'],
-                'int_memory': data['int_memory'],
-                'fc': data['fc'],
-                'pc': data['pc'],
-                'sc_h': data['sc_h'],
-                'sc_w': data['sc_w'],
-                'px_height': data['px_height'],
-                'px_width': data['px_width'],
-                'blue': bool(data['blue']),
-                'dual_sim': bool(data['dual_sim']),
-                'four_g': bool(data['four_g']),
-                'three_g': bool(data['three_g']),
-                'touch_screen': bool(data['touch_screen']),
-                'wifi': bool(data['wifi'])
-            }
+            'model_version': serving.version,
+            'features': logged_features(data)
         }
         
-        log_prediction(user_id, log_data)
+        with timed('log'):
+            log_prediction(user_id, log_data)
         
         # Format the response
         response = {
             'predicted_price_range': int(prediction),
             'confidence': prediction_proba,
-            'device_features': {
-                'battery_power': data['battery_power'],
-                'ram': data['ram'],
-                'internal_memory': data['int_memory'],
-                'camera_front': data['fc'],
-                'camera_primary': data['pc'],
-                'screen_height': data['sc_h'],
-                'screen_width': data['sc_w'],
-                'pixel_height': data['px_height'],
-                'pixel_width': data['px_width'],
-                'has_bluetooth': bool(data['blue']),
-                'has_dual_sim': bool(data['dual_sim']),
-                'has_4g': bool(data['four_g']),
-                'has_3g': bool(data['three_g']),
-                'has_touch_screen': bool(data['touch_screen']),
-                'has_wifi': bool(data['wifi'])
-            }
+            'device_features': device_features(data)
         }
         
         logging.info(f"Prediction made for device: Price range {prediction}")
-        return jsonify(response), 200
+        with timed('serialize'):
+            response = jsonify(response)
+        if prediction_cache.enabled:
+            response.headers['X-Cache'] = 'HIT' if cached_prediction is not None else 'MISS'
+        response.headers['X-Model-Version'] = serving.version
+        return response, 200
         
     except Exception as e:
         logging.error(f"Error in single prediction: {str(e)}")
@@ -309,8 +702,58 @@ def predict_single():
 
 @predict_bp.route('/batch', methods=['POST'])
 def predict_batch():
-    """Batch prediction from CSV upload"""
+    """Batch prediction from a CSV, Parquet, Arrow IPC or NDJSON upload; ?format=json|columnar|csv|parquet selects the output"""
+    progress_id = request.args.get('progress_id') or request.headers.get('X-Progress-Id')
+    if progress_id is None or not progress_shared:
+        return score_batch_upload(None)
+    if not valid_progress_id(progress_id):
+        return jsonify({'error': 'progress_id must be 8-64 letters, digits, "-" or "_"'}), 400
+    
+    # Whatever ends the request, the progress stream must see a final state
+    progress = BatchProgress(progress_store, progress_id, BATCH_PROGRESS_INTERVAL)
     try:
+        result = score_batch_upload(progress)
+    except Exception as e:
+        progress.fail(str(e) or type(e).__name__)
+        raise
+    if not progress.finished:
+        response = result[0] if isinstance(result, tuple) else result
+        body = response.get_json(silent=True) if isinstance(response, Response) else None
+        progress.fail((body or {}).get('error', 'Batch prediction failed'))
+    return result
+
+@predict_bp.route('/batch/progress/<progress_id>', methods=['GET'])
+def batch_progress(progress_id):
+    """Server-Sent Events with the stage, row counts and ETA of the batch started with ?progress_id=<progress_id>"""
+    if not valid_progress_id(progress_id):
+        return jsonify({'error': 'Invalid progress id'}), 400
+    if not progress_shared:
+        backend = progress_cache.describe()['backend']
+        return jsonify({
+            'error': 'Batch progress is unavailable',
+            'details': f'The {backend} progress store is not shared by the {WEB_WORKERS} workers; '
+                       'set BATCH_PROGRESS_BACKEND to sqlite or redis'
+        }), 501
+    if not progress_streams.acquire():
+        response = jsonify({
+            'error': 'Server busy, please retry later',
+            'details': f'{progress_streams.max_streams} progress streams are already open on this worker'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    events = progress_events(progress_store, progress_id, BATCH_PROGRESS_INTERVAL, BATCH_PROGRESS_WAIT)
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.call_on_close(progress_streams.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering the stream
+    return response
+
+def score_batch_upload(progress):
+    """Body of /predict/batch; progress is a BatchProgress to report to, or None"""
+    try:
+        serving, shadow_version = model_registry.choose('batch')
+        model = serving.model
         if model is None:
             return jsonify({
                 'error': 'ML model not available. Please ensure the model is trained and placed in the models directory.'
@@ -326,68 +769,138 @@ def predict_batch():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not file.filename.lower().endswith('.csv'):
-            return jsonify({'error': 'File must be a CSV'}), 400
+        try:
+            compression, upload_format = inspect_upload(file)
+        except ImportError as e:
+            return jsonify({'error': 'zstd uploads are not supported by this server', 'details': str(e)}), 501
+        except Exception as e:
+            return jsonify({'error': f'Error reading compressed upload: {str(e)}'}), 400
+        if upload_format is None:
+            return jsonify({
+                'error': 'File must be CSV, Parquet, Arrow IPC or NDJSON',
+                'supported_formats': list(UPLOAD_FORMAT_LABELS)
+            }), 400
+        
+        try:
+            deadline = batch_deadline()
+        except ValueError:
+            return jsonify({'error': 'Deadline must be a positive number of milliseconds'}), 400
+        continuation = request.args.get('continuation') or request.form.get('continuation')
+        resumable = deadline is not None or bool(continuation)
+        
+        output_format = request.args.get('format', 'json').lower()
+        if output_format not in BATCH_OUTPUT_FORMATS:
+            return jsonify({
+                'error': f'Unsupported output format: {output_format}',
+                'supported_formats': list(BATCH_OUTPUT_FORMATS)
+            }), 400
+        if output_format == 'parquet' and not parquet_available():
+            return jsonify({'error': 'Parquet output requires pyarrow to be installed on the server'}), 501
         
-        # Read CSV directly from memory - NO TEMP FILE
+        idempotency_key = request.headers.get('Idempotency-Key')
+        content_hash = None
+        if resumable or (BATCH_CACHE_ENABLED and not idempotency_key):
+            with timed('cache'):
+                content_hash = hash_upload(file.stream)
+        
+        # Resume where an earlier deadline stopped, on the same model version if it is still loaded
+        start_row = 0
+        if continuation:
+            try:
+                start_row, token_version = read_continuation_token(continuation, content_hash)
+            except InvalidContinuation as e:
+                return jsonify({'error': str(e)}), 400
+            if token_version and token_version != serving.version:
+                resumed = model_registry.find(token_version)
+                if resumed is not None:
+                    serving, shadow_version = resumed, None
+                    model = serving.model
+        
+        # Replay a stored result for retried uploads instead of re-scoring
+        cache_key = None
+        if BATCH_CACHE_ENABLED and not start_row:
+            with timed('cache'):
+                cache_key = batch_cache_key(user_id, serving.version,
+                                            None if idempotency_key else content_hash, idempotency_key)
+                cached_response = batch_cache.get(cache_key)
+            if cached_response is not None:
+                logging.info(f"Batch prediction served from cache ({cache_key[:12]})")
+                cached_summary = cached_response['summary']
+                if resumable:
+                    cached_summary = {**cached_summary, 'complete': True, 'start_row': 0}
+                with timed('serialize'):
+                    response = render_batch_output(
+                        cached_summary, cached_response['columns'],
+                        output_format, secure_filename(file.filename))
+                response.headers['X-Cache'] = 'HIT'
+                if resumable:
+                    response.headers['X-Batch-Complete'] = 'true'
+                if progress is not None:
+                    progress.finish(rows_total=cached_summary['total_processed'],
+                                    rows_predicted=cached_summary['total_processed'], cached=True)
+                response.headers['X-Model-Version'] = serving.version
+                return response, 200
+        
+        label = UPLOAD_FORMAT_LABELS[upload_format]
         try:
-            import io
-            # Read the file content as string
-            file_content = file.stream.read().decode('utf-8')
-            # Create StringIO object
-            csv_string_io = io.StringIO(file_content)
-            # Read CSV from StringIO
-            df = pd.read_csv(csv_string_io)
-            logging.info(f"CSV loaded with {len(df)} rows")
+            with timed('parse'):
+                stream = open_upload(file.stream, compression, BATCH_MAX_DECOMPRESSED_BYTES)
+                df = read_batch_upload(stream, upload_format)
+            logging.info(f"{label} upload loaded with {len(df)} rows" + (f" ({compression})" if compression else ""))
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        except ImportError as e:
+            return jsonify({'error': f'{label} uploads are not supported by this server', 'details': str(e)}), 501
         except Exception as e:
-            return jsonify({'error': f'Error reading CSV: {str(e)}'}), 400
+            return jsonify({'error': f'Error reading {label}: {str(e)}'}), 400
         
-        # Validate CSV structure
-        missing_columns = [col for col in FEATURES if col not in df.columns]
+        # Validate upload structure
+        with timed('validate'):
+            missing_columns = [col for col in FEATURES if col not in df.columns]
         if missing_columns:
             return jsonify({
                 'error': f'Missing required columns: {", ".join(missing_columns)}',
                 'required_columns': FEATURES,
                 'found_columns': list(df.columns)
             }), 400
+        if start_row > len(df):
+            return jsonify({'error': f'Continuation offset {start_row} is past the end of the upload ({len(df)} rows)'}), 400
+        if progress is not None:
+            progress.parsed(len(df), rows_total=len(df) - start_row)
         
-        predictions = []
-        errors = []
-        successful_count = 0
-        
-        for index, row in df.iterrows():
-            try:
-                # Validate row data
-                row_data = row.to_dict()
-                is_valid, error_msg = validate_device_data(row_data)
-                
-                if not is_valid:
-                    errors.append(f"Row {index + 1}: {error_msg}")
-                    continue
-                
-                # Make prediction
-                row_data = feature_engineering(row_data)
-                features = prepare_features(row_data)
+        # The shadow model rescores the parsed matrix, so the DataFrame is not kept for it
+        parsed_blocks = [] if shadow_version is not None else None
 
-                prediction = model.predict(features)[0]
-                successful_count += 1
-                
-                predictions.append({
-                    'row': index + 1,
-                    'predicted_price_range': int(prediction),
-                    'battery_power': row_data['battery_power'],
-                    'ram': row_data['ram'],
-                    'int_memory': row_data['int_memory']  # Note: this should match your frontend expectation
-                })
-                
-            except Exception as e:
-                errors.append(f"Row {index + 1}: {str(e)}")
+        def on_parsed(values, error_codes):
+            if DRIFT_ENABLED:
+                observe_batch_rows(values, error_codes)
+            if parsed_blocks is not None:
+                parsed_blocks.append((values, error_codes))
+
+        # Coercion, feature engineering and scoring all run inside the engine
+        with timed('predict'):
+            result = inference_executor.run(
+                serving.call, 'batch', len(df) - start_row, batch_engine.run_batch, model, df,
+                on_parsed=on_parsed if DRIFT_ENABLED or parsed_blocks is not None else None,
+                deadline=deadline, start_row=start_row, on_progress=progress
+            )
+        stop_row = len(df) if result.next_row is None else result.next_row
+        processed = stop_row - start_row
+        if DRIFT_ENABLED:
+            drift_monitor.observe(None, result.predictions)
+        if parsed_blocks:
+            model_registry.shadow(shadow_version, 'batch', result.predictions, shadow_batch, parsed_blocks)
+        charge_rows(len(result))
+        with timed('columns'):
+            columns = result.to_columns()
+            errors = result.error_messages()
+        successful_count = len(result)
         
         # Log batch prediction
         avg_confidence = 85.0  # Default batch confidence
         if successful_count > 0:
             # Calculate average price range for summary
-            avg_price_range = sum(p['predicted_price_range'] for p in predictions) / len(predictions)
+            avg_price_range = sum(columns['predicted_price_range']) / successful_count
             
             log_data = {
                 'id': int(datetime.utcnow().timestamp() * 1000),
@@ -396,30 +909,57 @@ def predict_batch():
                 'totalDevices': successful_count,
                 'predicted_price_range': int(round(avg_price_range)),
                 'confidence': avg_confidence,
+                'model_version': serving.version,
                 'summary': {
-                    'total_processed': len(df),
+                    'total_processed': processed,
                     'successful_predictions': successful_count,
                     'errors_count': len(errors)
                 }
             }
             
-            log_prediction(user_id, log_data)
+            with timed('log'):
+                log_prediction(user_id, log_data)
         
-        response = {
-            'total_processed': len(df),
-            'successful_predictions': len(predictions),
-            'errors_count': len(errors),
-            'predictions': predictions
+        summary = {
+            'total_processed': processed,
+            'successful_predictions': successful_count,
+            'errors_count': len(errors)
         }
+        if resumable:
+            summary['complete'] = result.next_row is None
+            summary['start_row'] = start_row
+            if result.next_row is not None:
+                summary['next_row'] = result.next_row
+                summary['remaining_rows'] = len(df) - result.next_row
+                summary['continuation_token'] = make_continuation_token(result.next_row, content_hash, serving.version)
         
         if errors:
-            response['errors'] = errors[:10]  # Limit to first 10 errors
+            summary['errors'] = errors[:10]  # Limit to first 10 errors
             if len(errors) > 10:
-                response['additional_errors'] = len(errors) - 10
+                summary['additional_errors'] = len(errors) - 10
         
-        logging.info(f"Batch prediction completed: {len(predictions)} successful, {len(errors)} errors")
-        return jsonify(response), 200
+        logging.info(f"Batch prediction completed: {successful_count} successful, {len(errors)} errors"
+                     + (f", stopped at row {result.next_row} of {len(df)} by deadline" if result.next_row is not None else ""))
+        if cache_key is not None and result.next_row is None:
+            with timed('cache'):
+                batch_cache.put(cache_key, {'summary': summary, 'columns': columns})
+        if progress is not None:
+            progress.update('serializing', force=True, rows_predicted=processed)
+        with timed('serialize'):
+            response = render_batch_output(summary, columns, output_format, secure_filename(file.filename))
+        if progress is not None:
+            progress.finish(successful_predictions=successful_count, errors_count=len(errors), next_row=result.next_row)
+        if cache_key is not None:
+            response.headers['X-Cache'] = 'MISS'
+        if resumable:
+            response.headers['X-Batch-Complete'] = 'true' if result.next_row is None else 'false'
+            if result.next_row is not None:
+                response.headers['X-Continuation-Token'] = summary['continuation_token']
+        response.headers['X-Model-Version'] = serving.version
+        return response, 200
         
+    except RequestEntityTooLarge:
+        raise  # answered by the app's JSON 413 handler
     except Exception as e:
         logging.error(f"Error in batch prediction: {str(e)}")
         return jsonify({'error': 'Batch prediction failed', 'details': str(e)}), 500
@@ -428,28 +968,37 @@ def predict_batch():
 def explain_prediction():
     """Feature importance explanation for prediction"""
     try:
+        # Explanations follow the same roll-out split as predictions, without shadowing
+        serving, _ = model_registry.choose('explain')
+        model = serving.model
         if model is None:
             return jsonify({
                 'error': 'ML model not available for explanations.'
             }), 500
         
-        data = request.get_json()
+        with timed('parse'):
+            data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
         # Validate input data
-        is_valid, error_msg = validate_device_data(data)
+        with timed('validate'):
+            is_valid, error_msg = validate_device_data(data)
         if not is_valid:
             return jsonify({'error': error_msg}), 400
 
         # Apply feature engineering first
-        data = feature_engineering(data)
+        with timed('features'):
+            data = feature_engineering(data)
 
         # Prepare features for the model
-        features = prepare_features(data)
+        with timed('prepare'):
+            features = prepare_features(data, model)
 
         # Predict
-        prediction = model.predict(features)[0]
+        with timed('predict'):
+            prediction = inference_executor.run(serving.call, 'explain', 1, model.predict, features)[0]
+        charge_rows(1)
 
         
         # Get feature importance if available
@@ -496,64 +1045,135 @@ def explain_prediction():
             }
         }
         
-        return jsonify(explanation), 200
+        with timed('serialize'):
+            response = jsonify(explanation)
+        response.headers['X-Model-Version'] = serving.version
+        return response, 200
         
     except Exception as e:
         logging.error(f"Error in explanation: {str(e)}")
         return jsonify({'error': 'Explanation failed', 'details': str(e)}), 500
 
+@predict_bp.route('/models/report', methods=['GET'])
+def model_report():
+    """Primary vs candidate model: traffic split, latency, memory footprint and agreement"""
+    try:
+        return jsonify(model_registry.report()), 200
+    except Exception as e:
+        logging.error(f"Error building model report: {str(e)}")
+        return jsonify({'error': 'Failed to build model report', 'details': str(e)}), 500
+
+FEATURE_DESCRIPTIONS = {
+    'battery_power': 'Total energy a battery can store in mAh',
+    'blue': 'Has bluetooth (1/0)',
+    'clock_speed': 'Speed at which microprocessor executes instructions',
+    'dual_sim': 'Has dual sim support (1/0)',
+    'fc': 'Front Camera mega pixels',
+    'four_g': 'Has 4G support (1/0)',
+    'int_memory': 'Internal Memory in GB',
+    'm_dep': 'Mobile Depth in cm',
+    'mobile_wt': 'Weight of mobile phone',
+    'n_cores': 'Number of cores of processor',
+    'pc': 'Primary Camera mega pixels',
+    'px_height': 'Pixel Resolution Height',
+    'px_width': 'Pixel Resolution Width',
+    'ram': 'Random Access Memory in MB',
+    'sc_h': 'Screen Height of mobile in cm',
+    'sc_w': 'Screen Width of mobile in cm',
+    'talk_time': 'Longest time that battery will last during calls',
+    'three_g': 'Has 3G support (1/0)',
+    'touch_screen': 'Has touch screen (1/0)',
+    'wifi': 'Has wifi support (1/0)'
+}
+
+# Static part of the /features payload; changes only when the code does
+FEATURES_SCHEMA_TAG = make_etag(
+    FEATURES, sorted(FEATURE_DESCRIPTIONS.items()), sorted(FEATURE_RANGES.items())
+)
+
+@predict_bp.route('/drift', methods=['GET'])
+def get_drift_report():
+    """Input and prediction drift of recent traffic against the model's reference profile; ?window=<seconds>&histograms=1"""
+    try:
+        window = request.args.get('window', type=int)
+        if window is not None and window <= 0:
+            return jsonify({'error': 'window must be a positive number of seconds'}), 400
+        report = drift_monitor.report(window, request.args.get('histograms') == '1')
+        report['enabled'] = DRIFT_ENABLED
+        report['model_version'] = model_store.version
+        return jsonify(report), 200
+    except Exception as e:
+        logging.error(f"Error building drift report: {str(e)}")
+        return jsonify({'error': 'Failed to build drift report', 'details': str(e)}), 500
+
 @predict_bp.route('/features', methods=['GET'])
 def get_model_features():
     """Get the required features for the model"""
-    return jsonify({
+    model_exists = os.path.exists(MODEL_PATH)
+    log_exists = os.path.exists(PREDICTION_LOG_FILE)
+    etag = make_etag('features', FEATURES_SCHEMA_TAG, model_store.version, model_exists, log_exists)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    response = jsonify({
         'features': FEATURES,
-        'feature_descriptions': {
-            'battery_power': 'Total energy a battery can store in mAh',
-            'blue': 'Has bluetooth (1/0)',
-            'clock_speed': 'Speed at which microprocessor executes instructions',
-            'dual_sim': 'Has dual sim support (1/0)',
-            'fc': 'Front Camera mega pixels',
-            'four_g': 'Has 4G support (1/0)',
-            'int_memory': 'Internal Memory in GB',
-            'm_dep': 'Mobile Depth in cm',
-            'mobile_wt': 'Weight of mobile phone',
-            'n_cores': 'Number of cores of processor',
-            'pc': 'Primary Camera mega pixels',
-            'px_height': 'Pixel Resolution Height',
-            'px_width': 'Pixel Resolution Width',
-            'ram': 'Random Access Memory in MB',
-            'sc_h': 'Screen Height of mobile in cm',
-            'sc_w': 'Screen Width of mobile in cm',
-            'talk_time': 'Longest time that battery will last during calls',
-            'three_g': 'Has 3G support (1/0)',
-            'touch_screen': 'Has touch screen (1/0)',
-            'wifi': 'Has wifi support (1/0)'
-        },
+        'feature_descriptions': FEATURE_DESCRIPTIONS,
+        'feature_ranges': FEATURE_RANGES,
         'model_path': MODEL_PATH,
-        'model_exists': os.path.exists(MODEL_PATH),
+        'model_exists': model_exists,
         'prediction_log_path': PREDICTION_LOG_FILE,
-        'log_exists': os.path.exists(PREDICTION_LOG_FILE)
-    }), 200
+        'log_exists': log_exists
+    })
+    return add_validators(response, etag), 200
 
 
+def history_etag(user_id, log_size, log_mtime_ns, page, page_size):
+    """ETag of a /predict/history response, from the log's stat() and the page asked for"""
+    return make_etag('history', user_id, log_size, log_mtime_ns, model_store.version, page, page_size)
+
+def history_page(user_id, page, page_size, log_size, log_mtime_ns, last_modified):
+    """Body of /predict/history: one page of the user's predictions, or all of them without a page_size"""
+    logging.info(f"Fetching prediction history for user: {user_id}")
+    
+    predictions = cached_user_predictions(user_id, log_size, log_mtime_ns)
+    
+    response_data = {
+        'predictions': predictions,
+        'total_count': len(predictions),
+        'log_file_path': PREDICTION_LOG_FILE,
+        'log_file_exists': last_modified is not None
+    }
+    if page_size is not None:
+        page = page or 1
+        response_data['predictions'] = predictions[(page - 1) * page_size:page * page_size]
+        response_data['page'] = page
+        response_data['page_size'] = page_size
+    
+    logging.info(f"Retrieved {len(predictions)} predictions for user {user_id}")
+    return response_data
+
 @predict_bp.route('/history', methods=['GET'])
 def get_prediction_history():
-    """Get prediction history from log files"""
+    """Get prediction history from log files; ?page=<n>&page_size=<n> returns one page, newest first"""
     try:
         user_id = "anonymous_user"
-        logging.info(f"Fetching prediction history for user: {user_id}")
-        
-        predictions = read_user_predictions(user_id)
+        page = request.args.get('page', type=int)
+        page_size = request.args.get('page_size', type=int)
+        if (page is not None and page < 1) or (page_size is not None and page_size < 1):
+            return jsonify({'error': 'page and page_size must be positive integers'}), 400
+        if page is not None and page_size is None:
+            page_size = 50
         
-        response_data = {
-            'predictions': predictions,
-            'total_count': len(predictions),
-            'log_file_path': PREDICTION_LOG_FILE,
-            'log_file_exists': os.path.exists(PREDICTION_LOG_FILE)
-        }
+        # Answer revalidation from the log's stat() alone, before any scan
+        log_size, log_mtime_ns, last_modified = file_validator(PREDICTION_LOG_FILE)
+        etag = history_etag(user_id, log_size, log_mtime_ns, page, page_size)
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
         
-        logging.info(f"Retrieved {len(predictions)} predictions for user {user_id}")
-        return jsonify(response_data), 200
+        response = jsonify(history_page(user_id, page, page_size, log_size, log_mtime_ns, last_modified))
+        return add_validators(response, etag, last_modified), 200
         
     except Exception as e:
         logging.error(f"Error retrieving prediction history: {str(e)}")
@@ -564,6 +1184,27 @@ def get_prediction_history():
             'total_count': 0
         }), 500
 
+@predict_bp.route('/history/summary', methods=['GET'])
+def get_history_summary():
+    """Analytics rollups of the prediction history, computed server-side and cached"""
+    try:
+        user_id = "anonymous_user"
+        log_size, log_mtime_ns, last_modified = file_validator(PREDICTION_LOG_FILE)
+        etag = make_etag('history-summary', user_id, log_size, log_mtime_ns)
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+        
+        key = cache_key('summary', user_id, os.path.abspath(PREDICTION_LOG_FILE), log_size, log_mtime_ns)
+        summary = analytics_cache.get_or_set(
+            key, lambda: summarize_predictions(cached_user_predictions(user_id, log_size, log_mtime_ns))
+        )
+        return add_validators(jsonify(summary), etag, last_modified), 200
+        
+    except Exception as e:
+        logging.error(f"Error summarizing prediction history: {str(e)}")
+        return jsonify({'error': 'Failed to summarize history', 'details': str(e)}), 500
+
 @predict_bp.route('/history/debug', methods=['GET'])
 def debug_prediction_history():
     """Debug endpoint to check log file contents"""
@@ -1,7 +1,27 @@
+import asyncio
+
 from flask import jsonify
 from models.user import User
 from db import db
-from utils.security import create_jwt
+from utils.security import create_jwt, HashingBusy, password_hasher
+
+HASHING_BUSY = {"success": False, "error": "too many authentication requests, please retry"}
+
+def hashing_busy_response():
+    response = jsonify(HASHING_BUSY)
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+def find_user(email):
+    return User.query.filter_by(email=email).first()
+
+
+def add_user(name, email, password_hash):
+    user = User(username=name, email=email, password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+
 
 def register_user(data: dict):
     name = data.get("name")
@@ -11,11 +31,14 @@ def register_user(data: dict):
     if not name or not email or not password:
         return jsonify({"success": False, "error": "name, email, and password are required"}), 400
 
-    if User.query.filter_by(email=email).first():
+    if find_user(email):
         return jsonify({"success": False, "error": "email already exists"}), 400
 
     user = User(username=name, email=email)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashingBusy:
+        return hashing_busy_response()
     db.session.add(user)
     db.session.commit()
 
@@ -25,14 +48,69 @@ def register_user(data: dict):
 def login_user(data: dict):
     email = data.get("email")
     password = data.get("password")
-    
+
     if not email or not password:
         return jsonify({"success": False, "error": "email and password required"}), 400
 
-    user = User.query.filter_by(email=email).first()
-    if not user or not user.verify_password(password):
-        return jsonify({"success": False, "error": "invalid credentials"}), 401
+    user = find_user(email)
+    try:
+        if not user or not user.verify_password(password):
+            return jsonify({"success": False, "error": "invalid credentials"}), 401
+    except HashingBusy:
+        return hashing_busy_response()
 
     token = create_jwt({"user_id": user.id})
     return jsonify({"success": True, "token": token}), 200
 
+
+# Coroutine versions for the ASGI entrypoint. They return (payload, status,
+# extra headers) instead of Flask responses; database calls run off the
+# event loop in an app context of `app`, and hashing is awaited on the
+# password hasher pool.
+
+def _in_app_context(app, fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+async def _run_db(app, fn, *args):
+    return await asyncio.to_thread(_in_app_context, app, fn, *args)
+
+
+async def register_user_async(app, data: dict):
+    name = data.get("name")
+    email = data.get("email")
+    password = data.get("password")
+
+    if not name or not email or not password:
+        return {"success": False, "error": "name, email, and password are required"}, 400, ()
+
+    if await _run_db(app, find_user, email):
+        return {"success": False, "error": "email already exists"}, 400, ()
+
+    try:
+        password_hash = await password_hasher.hash_async(password)
+    except HashingBusy:
+        return HASHING_BUSY, 503, (("Retry-After", "1"),)
+    await _run_db(app, add_user, name, email, password_hash)
+
+    return {"success": True, "message": "user registered successfully"}, 201, ()
+
+
+async def login_user_async(app, data: dict):
+    email = data.get("email")
+    password = data.get("password")
+
+    if not email or not password:
+        return {"success": False, "error": "email and password required"}, 400, ()
+
+    # Only the id and hash are read, so the row outlives its session
+    user = await _run_db(app, find_user, email)
+    try:
+        if not user or not await password_hasher.verify_async(user.password_hash, password):
+            return {"success": False, "error": "invalid credentials"}, 401, ()
+    except HashingBusy:
+        return HASHING_BUSY, 503, (("Retry-After", "1"),)
+
+    token = create_jwt({"user_id": user.id})
+    return {"success": True, "token": token}, 200, ()
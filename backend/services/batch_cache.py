@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_upload(stream) -> str:
+    """Hash an uploaded file stream in chunks and rewind it for the reader."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def batch_cache_key(user_id, model_version, content_hash=None, idempotency_key=None) -> str:
+    """
+    Build the cache key for a batch upload. A client supplied idempotency key
+    wins over the content hash; both are scoped to the user and model version.
+    """
+    if idempotency_key:
+        source = f"idem:{idempotency_key}"
+    else:
+        source = f"sha256:{content_hash}"
+    raw = f"{user_id}|{model_version}|{source}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class BatchResultCache:
+    """
+    Bounded on-disk store of batch prediction responses, one JSON file per key.
+    Entries expire max_age seconds after they were written (file mtime),
+    however often they are read; when the directory grows past max_bytes
+    the least recently used entries (file atime, set on every hit) are
+    removed first. Writes go
+    through a temp file and os.replace so concurrent workers never see a
+    partially written entry.
+    """
+
+    def __init__(self, directory, max_age, max_bytes):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.max_age:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as file:
+                payload = json.load(file)
+            # Mark as recently used for size-based eviction; the mtime, and so
+            # the expiry, stays at the write time
+            os.utime(path, (time.time(), stat.st_mtime))
+            return payload
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Discarding unreadable batch cache entry {key}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, key, payload):
+        try:
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            if len(data) > self.max_bytes:
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, self._path(key))
+            self.prune()
+            return True
+        except Exception as e:
+            logging.error(f"Error writing batch cache entry {key}: {e}")
+            return False
+
+    def prune(self):
+        """Drop expired entries, then the least recently used until under max_bytes."""
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.max_age:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
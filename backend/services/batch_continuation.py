@@ -0,0 +1,36 @@
+"""
+Continuation tokens for /predict/batch requests cut short by a deadline.
+
+A token records where scoring stopped (a 0-based row offset), the SHA-256 of
+the upload it belongs to and the model version that scored the first part.
+It is opaque to clients: they send the same file again with the token and
+scoring resumes at the offset. Tokens are not signed; the content hash ties
+one to its upload, and a forged offset only skips rows of the caller's own
+file.
+"""
+import base64
+import json
+
+
+class InvalidContinuation(ValueError):
+    """The continuation token is malformed or belongs to a different upload"""
+
+
+def make_continuation_token(offset: int, content_hash: str, model_version: str) -> str:
+    payload = json.dumps({'o': int(offset), 'h': content_hash, 'm': model_version}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def read_continuation_token(token: str, content_hash: str):
+    """(offset, model version) from a token, checked against the upload's hash"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset, token_hash, model_version = int(payload['o']), payload['h'], payload.get('m')
+    except Exception:
+        raise InvalidContinuation('Malformed continuation token')
+    if offset < 0:
+        raise InvalidContinuation('Malformed continuation token')
+    if token_hash != content_hash:
+        raise InvalidContinuation('Continuation token does not match the uploaded file')
+    return offset, model_version
@@ -0,0 +1,157 @@
+"""
+Progress of /predict/batch uploads, for the Server-Sent Events channel.
+
+A client that wants progress picks a random id, sends it as ?progress_id=
+(or an X-Progress-Id header) with the upload and opens
+GET /predict/batch/progress/<id>. The batch route records its stage and row
+counts in a result cache namespace, which every worker can read when the
+cache backend is shared (sqlite or redis), and the event stream polls it.
+Writes are throttled to one per interval, so the scoring loop pays no more
+than a clock read per chunk.
+"""
+import json
+import re
+import threading
+import time
+
+PROGRESS_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+FINAL_STAGES = ('done', 'failed')
+
+
+def valid_progress_id(value) -> bool:
+    return bool(value) and PROGRESS_ID.match(value) is not None
+
+
+class BatchProgress:
+    """
+    Stage and row counts of one batch request: parsing, validating,
+    predicting, serializing, then done or failed. Instances are also the
+    engine's on_progress callback.
+    """
+
+    def __init__(self, store, progress_id, interval=0.25):
+        self.store = store
+        self.progress_id = progress_id
+        self.interval = interval
+        self.finished = False
+        self._started = time.monotonic()
+        self._predict_started = None
+        self._last_write = 0.0
+        self.state = {
+            'stage': 'parsing',
+            'rows_total': None,
+            'rows_parsed': 0,
+            'rows_validated': 0,
+            'rows_predicted': 0,
+            'elapsed_ms': 0,
+            'eta_ms': None,
+            'seq': 0
+        }
+        self._write()
+
+    def _write(self):
+        now = time.monotonic()
+        self._last_write = now
+        state = self.state
+        state['seq'] += 1
+        state['elapsed_ms'] = round((now - self._started) * 1000)
+        total, predicted = state['rows_total'], state['rows_predicted']
+        if self._predict_started is not None and predicted and total:
+            rate = predicted / max(now - self._predict_started, 1e-6)
+            state['eta_ms'] = round((total - predicted) / rate * 1000)
+        self.store.set(self.progress_id, state)
+
+    def update(self, stage=None, force=False, **counts):
+        """Record a stage and/or counts; stored at most once per interval unless forced"""
+        if stage is not None:
+            self.state['stage'] = stage
+        self.state.update(counts)
+        if force or time.monotonic() - self._last_write >= self.interval:
+            self._write()
+
+    def parsed(self, rows, rows_total=None):
+        self.update('validating', force=True, rows_parsed=rows, rows_total=rows if rows_total is None else rows_total)
+
+    def __call__(self, stage, rows):
+        # batch_engine.run_batch on_progress hook
+        if stage == 'validated':
+            self._predict_started = time.monotonic()
+            self.update('predicting', force=True, rows_validated=rows)
+        else:
+            self.update(rows_predicted=rows)
+
+    def finish(self, **summary):
+        self.finished = True
+        self.update('done', force=True, eta_ms=0, **summary)
+
+    def fail(self, error):
+        self.finished = True
+        self.update('failed', force=True, eta_ms=None, error=error)
+
+
+class StreamSlots:
+    """
+    Bound on the progress streams open at once in this process. Each stream
+    holds a server thread for as long as its batch runs, so without a cap a
+    few slow batches could take every thread from the prediction routes.
+    """
+
+    def __init__(self, max_streams):
+        self.max_streams = max(1, max_streams)
+        self.open = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.open >= self.max_streams:
+                self.rejected += 1
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+    def describe(self):
+        return {'max_streams': self.max_streams, 'open': self.open, 'rejected': self.rejected}
+
+
+def format_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def progress_events(store, progress_id, poll_interval=0.25, wait_seconds=30.0, heartbeat_seconds=15.0):
+    """
+    Server-Sent Events for one progress id: a 'progress' event whenever the
+    state changes, ending with 'done' or 'failed', or with 'timeout' when no
+    state shows up for wait_seconds.
+    """
+    yield 'retry: 2000\n\n'
+    last_seq = None
+    last_seen = last_sent = time.monotonic()
+    while True:
+        state = store.get(progress_id)
+        now = time.monotonic()
+        if state is None:
+            if now - last_seen > wait_seconds:
+                yield format_event('timeout', {'error': 'No batch is reporting progress under this id'})
+                return
+        else:
+            last_seen = now
+            if state.get('seq') != last_seq:
+                last_seq = state.get('seq')
+                final = state.get('stage') in FINAL_STAGES
+                yield format_event(state['stage'] if final else 'progress', state, last_seq)
+                last_sent = now
+                if final:
+                    return
+        if now - last_sent >= heartbeat_seconds:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        time.sleep(poll_interval)
@@ -0,0 +1,357 @@
+"""
+Pluggable cache for computed results (single predictions, history pages,
+analytics rollups), split into namespaces with their own TTL and size limit.
+
+Backends:
+- memory: an LRU per namespace in this process. Fast, but every gunicorn
+  worker holds its own copy.
+- sqlite: one WAL database shared by every worker on the host. Placed on
+  /dev/shm by default so it lives in shared memory rather than on disk.
+- redis: any client with Redis' get/set(ex=)/delete/scan_iter/dbsize commands,
+  e.g. redis.Redis.from_url(RESULT_CACHE_URL) or a local stand-in. Expiry is
+  left to the server; the namespace size limit is the server's maxmemory
+  policy, only oversized entries are refused here.
+
+Values are JSON documents. Any backend error is logged and treated as a
+miss, so a broken cache never fails a request.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, stdlib json is used without it
+    orjson = None
+
+
+def cache_key(*parts) -> str:
+    """Stable fixed-length key for any JSON-serializable parts"""
+    raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def encode_value(value) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def decode_value(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class MemoryBackend:
+    """LRU of (value, expires) per namespace, bounded by the namespace's max_bytes."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._namespaces = {}  # namespace -> [OrderedDict(key -> (data, expires)), total bytes]
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            store = self._namespaces.get(namespace)
+            entry = store[0].get(key) if store else None
+            if entry is None:
+                return None
+            data, expires = entry
+            if time.time() >= expires:
+                del store[0][key]
+                store[1] -= len(data)
+                return None
+            store[0].move_to_end(key)
+            return data
+
+    def set(self, namespace, key, data, ttl, max_bytes):
+        with self._lock:
+            entries, total = self._namespaces.setdefault(namespace, [OrderedDict(), 0])
+            old = entries.pop(key, None)
+            if old is not None:
+                total -= len(old[0])
+            entries[key] = (data, time.time() + ttl)
+            total += len(data)
+            while total > max_bytes and entries:
+                _, (evicted, _) = entries.popitem(last=False)
+                total -= len(evicted)
+            self._namespaces[namespace][1] = total
+
+    def delete(self, namespace, key):
+        with self._lock:
+            store = self._namespaces.get(namespace)
+            old = store[0].pop(key, None) if store else None
+            if old is not None:
+                store[1] -= len(old[0])
+
+    def clear(self, namespace):
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+
+    def usage(self, namespace):
+        with self._lock:
+            store = self._namespaces.get(namespace)
+            return {'entries': len(store[0]), 'bytes': store[1]} if store else {'entries': 0, 'bytes': 0}
+
+
+class SQLiteBackend:
+    """
+    Entries in a SQLite table shared by every worker on the host. Reads are
+    plain SELECTs; last-access times are refreshed at most once a second per
+    entry. Each namespace is pruned back under max_bytes, least recently used
+    first, every PRUNE_EVERY writes to it.
+    """
+
+    name = 'sqlite'
+    PRUNE_EVERY = 64
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = {}
+        self._writes_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        connection = self._connect()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries (namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+            'size INTEGER NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (namespace, key))'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed)')
+
+    def _connect(self):
+        # One connection per thread (and per process, after a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')  # a cache may lose writes on a crash
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, namespace, key):
+        now = time.time()
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT value, expires, accessed FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        data, expires, accessed = row
+        if now >= expires:
+            connection.execute('DELETE FROM entries WHERE namespace = ? AND key = ? AND expires <= ?',
+                               (namespace, key, now))
+            return None
+        if now - accessed >= 1:
+            connection.execute('UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?', (now, namespace, key))
+        return bytes(data)
+
+    def set(self, namespace, key, data, ttl, max_bytes):
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+            (namespace, key, sqlite3.Binary(data), len(data), now + ttl, now)
+        )
+        with self._writes_lock:
+            writes = self._writes[namespace] = self._writes.get(namespace, 0) + 1
+        if writes % self.PRUNE_EVERY == 0:
+            self.prune(namespace, max_bytes)
+
+    def prune(self, namespace, max_bytes):
+        """Drop expired entries, then the least recently used until under max_bytes"""
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM entries WHERE namespace = ? AND expires <= ?', (namespace, time.time()))
+            total = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?', (namespace,)
+            ).fetchone()[0]
+            if total > max_bytes:
+                excess = total - max_bytes
+                cutoff = None
+                for accessed, size in connection.execute(
+                        'SELECT accessed, size FROM entries WHERE namespace = ? ORDER BY accessed', (namespace,)):
+                    excess -= size
+                    cutoff = accessed
+                    if excess <= 0:
+                        break
+                connection.execute('DELETE FROM entries WHERE namespace = ? AND accessed <= ?', (namespace, cutoff))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def delete(self, namespace, key):
+        self._connect().execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+
+    def clear(self, namespace):
+        self._connect().execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+
+    def usage(self, namespace):
+        entries, size = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?', (namespace,)
+        ).fetchone()
+        return {'entries': entries, 'bytes': size}
+
+
+class RedisBackend:
+    """Entries as Redis string keys '<prefix><namespace>:<key>' with a server-side TTL."""
+
+    name = 'redis'
+
+    def __init__(self, client, prefix='devicepricepro:'):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}{namespace}:{key}"
+
+    def get(self, namespace, key):
+        return self.client.get(self._key(namespace, key))
+
+    def set(self, namespace, key, data, ttl, max_bytes):
+        self.client.set(self._key(namespace, key), data, ex=max(1, int(ttl)))
+
+    def delete(self, namespace, key):
+        self.client.delete(self._key(namespace, key))
+
+    def clear(self, namespace):
+        keys = list(self.client.scan_iter(match=self._key(namespace, '*')))
+        if keys:
+            self.client.delete(*keys)
+
+    def usage(self, namespace):
+        # Counting a namespace's keys means a SCAN of the whole keyspace, too
+        # slow for a health check; report the server's key count instead
+        return {'server_keys': self.client.dbsize()}
+
+
+class CacheNamespace:
+    """One namespace of a ResultCache: its TTL, size limit and hit counters."""
+
+    def __init__(self, backend, name, ttl, max_bytes):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None and self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key):
+        """The cached value, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            data = self.backend.get(self.name, key)
+            value = None if data is None else decode_value(data)
+        except Exception as e:
+            logging.warning(f"Result cache read failed ({self.name}): {str(e)}")
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return False
+        try:
+            data = encode_value(value)
+            # One entry may not take more than a quarter of the namespace
+            if len(data) > self.max_bytes // 4:
+                return False
+            self.backend.set(self.name, key, data, self.ttl, self.max_bytes)
+        except Exception as e:
+            logging.warning(f"Result cache write failed ({self.name}): {str(e)}")
+            self.errors += 1
+            return False
+        self.stores += 1
+        return True
+
+    def get_or_set(self, key, compute):
+        """The cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        if self.backend is not None:
+            try:
+                self.backend.clear(self.name)
+            except Exception as e:
+                logging.warning(f"Result cache clear failed ({self.name}): {str(e)}")
+
+    def describe(self):
+        info = {
+            'ttl_seconds': self.ttl,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'errors': self.errors
+        }
+        if self.enabled:
+            try:
+                info.update(self.backend.usage(self.name))
+            except Exception as e:
+                info['usage_error'] = str(e)
+        return info
+
+
+class ResultCache:
+    """A cache backend and the namespaces registered on it."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.namespaces = {}
+
+    def namespace(self, name, ttl, max_bytes):
+        if name not in self.namespaces:
+            self.namespaces[name] = CacheNamespace(self.backend, name, ttl, max_bytes)
+        return self.namespaces[name]
+
+    def describe(self):
+        return {
+            'backend': self.backend.name if self.backend is not None else 'none',
+            'namespaces': {name: namespace.describe() for name, namespace in self.namespaces.items()}
+        }
+
+
+def create_result_cache(backend, path=None, url=None, client=None):
+    """
+    ResultCache for backend 'memory', 'sqlite', 'redis' or 'none'. A Redis
+    backend uses `client` when given, otherwise redis.Redis.from_url(url).
+    Backends that cannot start fall back to memory.
+    """
+    try:
+        if backend == 'none':
+            return ResultCache(None)
+        if backend == 'sqlite':
+            return ResultCache(SQLiteBackend(path))
+        if backend == 'redis':
+            if client is None:
+                import redis
+                client = redis.Redis.from_url(url)
+            return ResultCache(RedisBackend(client))
+    except Exception as e:
+        logging.error(f"Result cache backend {backend} unavailable, using memory: {str(e)}")
+    return ResultCache(MemoryBackend())
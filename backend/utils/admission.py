@@ -0,0 +1,164 @@
+"""
+Adaptive admission control for the inference routes.
+
+Each request class (single, batch) has an AIMD concurrency limit: every
+request that finishes under the class's latency target nudges the limit up
+by 1/limit, and a slow or failed request multiplies it by the backoff, at
+most once per target interval so one burst of slow requests counts once.
+Requests arriving while the class is at its limit are rejected straight
+away with 503 and a Retry-After estimated from recent latency, instead of
+queueing behind slow inference until the client times out. Classes are
+ordered by priority; a lower one is also shed while a higher one is.
+"""
+import math
+import threading
+import time
+
+from flask import g, jsonify
+
+LATENCY_SMOOTHING = 0.2  # weight of the newest sample in the latency EWMA
+MAX_RETRY_AFTER = 30
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit, in-flight count and counters for one request class."""
+
+    def __init__(self, name, initial, min_limit=1, max_limit=64, target_ms=500.0, backoff=0.7):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.target_ms = target_ms
+        self.backoff = backoff
+        self.in_flight = 0
+        self.admitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.slow = 0
+        self.rejected = {'limit': 0, 'yield': 0}
+        self.increases = 0
+        self.decreases = 0
+        self.latency_ms = None
+        self.last_rejected = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.rejected['limit'] += 1
+                self.last_rejected = time.monotonic()
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def reject(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
+            self.last_rejected = time.monotonic()
+
+    def release(self, ms, failed=False):
+        """Record a finished request and adapt the limit"""
+        now = time.monotonic()
+        with self._lock:
+            saturated = self.in_flight >= self.limit / 2
+            self.in_flight -= 1
+            self.completed += 1
+            self.failed += int(failed)
+            self.latency_ms = ms if self.latency_ms is None else (
+                LATENCY_SMOOTHING * ms + (1 - LATENCY_SMOOTHING) * self.latency_ms
+            )
+            if failed or ms > self.target_ms:
+                self.slow += int(not failed)
+                if now - self._last_decrease >= self.target_ms / 1000:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.decreases += 1
+                    self._last_decrease = now
+            elif saturated and self.limit < self.max_limit:
+                # Only grow a limit that is actually being used
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+
+    def retry_after(self):
+        """Seconds a rejected client should wait: about one recent request duration"""
+        latency_s = (self.latency_ms or self.target_ms) / 1000
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(latency_s)))
+
+    def describe(self):
+        with self._lock:
+            return {
+                'limit': int(self.limit),
+                'limit_exact': round(self.limit, 3),
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'target_ms': self.target_ms,
+                'in_flight': self.in_flight,
+                'admitted': self.admitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'slow': self.slow,
+                'rejected': dict(self.rejected),
+                'rejected_total': sum(self.rejected.values()),
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'latency_ewma_ms': round(self.latency_ms, 3) if self.latency_ms is not None else None
+            }
+
+
+class AdmissionController:
+    """Per-class adaptive limits; classes are given highest priority first."""
+
+    def __init__(self, limits, yield_seconds=1.0, enabled=True):
+        self.limits = {limit.name: limit for limit in limits}
+        self.priority = [limit.name for limit in limits]
+        self.yield_seconds = yield_seconds
+        self.enabled = enabled
+
+    def try_acquire(self, name):
+        """(admitted?, reason) for one request of class `name`"""
+        limit = self.limits[name]
+        now = time.monotonic()
+        # A lower-priority class yields while any higher one is shedding load
+        for higher in self.priority[:self.priority.index(name)]:
+            if now - self.limits[higher].last_rejected < self.yield_seconds:
+                limit.reject('yield')
+                return False, 'yield'
+        if not limit.try_acquire():
+            return False, 'limit'
+        return True, None
+
+    def describe(self):
+        return {
+            'enabled': self.enabled,
+            'yield_seconds': self.yield_seconds,
+            'classes': {name: self.limits[name].describe() for name in self.priority}
+        }
+
+
+def admit_request(controller, name):
+    """
+    Admit the current request as class `name`. Returns None when admitted,
+    otherwise the 503 response to send.
+    """
+    if not controller.enabled:
+        return None
+    admitted, reason = controller.try_acquire(name)
+    if admitted:
+        g.admission = (controller.limits[name], time.perf_counter())
+        return None
+    limit = controller.limits[name]
+    details = (f"{name} predictions yield while higher-priority requests are being shed"
+               if reason == 'yield' else f"{name} prediction concurrency limit of {int(limit.limit)} reached")
+    response = jsonify({'error': 'Server busy, please retry later', 'details': details})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(limit.retry_after())
+    return response
+
+
+def release_request(failed=False):
+    """Release the current request's admission slot, if it holds one"""
+    admission = g.pop('admission', None)
+    if admission is not None:
+        limit, started = admission
+        limit.release((time.perf_counter() - started) * 1000, failed)
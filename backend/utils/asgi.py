@@ -0,0 +1,364 @@
+"""
+ASGI front end for the Flask app.
+
+The event loop owns the connections: request bodies are received and
+responses sent asynchronously, so slow uploads, slow readers and idle
+keep-alive connections never hold a thread. Each complete request is then
+handed to the Flask app on one of two thread pools:
+
+- a small one for the CPU-bound inference routes, sized like the sync
+  deployment's threads so the admission limits and the inference executor
+  see the same concurrency. A request takes a slot only once its body has
+  arrived, so slow uploads do not count against it; requests beyond the
+  queue bound get 503 on the loop, without taking a thread;
+- a larger one for the remaining Flask routes.
+
+Handlers registered with `route` run as coroutines on the loop itself,
+moving their file and database work off it with asyncio.to_thread, and
+AsyncFileHandler lets a coroutine do a logger's file appends. Responses
+with a Content-Length are built on the worker thread and sent from the
+loop; streamed responses are forwarded chunk by chunk as the app produces
+them.
+"""
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BODY_SPOOL_BYTES = 1024 * 1024  # request bodies above this are spooled to a temp file
+
+
+def json_response_parts(status, payload, extra_headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('latin-1'))]
+    headers.extend((name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in extra_headers)
+    return {'type': 'http.response.start', 'status': status, 'headers': headers}, body
+
+
+async def send_json(send, status, payload, extra_headers=()):
+    start, body = json_response_parts(status, payload, extra_headers)
+    await send(start)
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_empty(send, status, extra_headers=()):
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in extra_headers]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def request_headers(scope):
+    """The scope's headers as a dict of lowercased names (repeated headers joined with ',')"""
+    headers = {}
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').lower()
+        value = raw_value.decode('latin-1')
+        headers[name] = f"{headers[name]},{value}" if name in headers else value
+    return headers
+
+
+def build_environ(scope, body, content_length):
+    """WSGI environ for an ASGI http scope and its received body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue  # the body has been received; its real size is set above
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class AsyncFileHandler(logging.Handler):
+    """
+    Logging handler whose appends are done by a coroutine on the event loop.
+    Records from any thread are queued on the loop; the drain task writes
+    whatever has accumulated in one asyncio.to_thread call, so neither the
+    loop nor the logging thread waits on the disk. Before start() and after
+    stop() records are written synchronously.
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        super().__init__()
+        self.path = path
+        self.encoding = encoding
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._drain())
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        lines = []
+        while self._queue is not None and not self._queue.empty():
+            lines.append(self._queue.get_nowait())
+        if lines:
+            await asyncio.to_thread(self._write, lines)
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + '\n'
+        except Exception:
+            self.handleError(record)
+            return
+        loop = self._loop
+        if loop is None:
+            self._write([line])
+            return
+        try:
+            loop.call_soon_threadsafe(self._queue.put_nowait, line)
+        except RuntimeError:
+            self._write([line])  # the loop has closed
+
+    async def _drain(self):
+        while True:
+            lines = [await self._queue.get()]
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+            await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines):
+        try:
+            with open(self.path, 'a', encoding=self.encoding) as file:
+                file.writelines(lines)
+        except Exception as e:
+            logging.error(f"Writing to {self.path} failed: {str(e)}")
+
+
+class AsgiApp:
+    """ASGI application serving a WSGI app from bounded thread pools, plus native coroutine routes."""
+
+    def __init__(self, wsgi_app, cpu_paths=(), cpu_threads=4, cpu_queue=16, io_threads=32, max_body=None):
+        self.wsgi_app = wsgi_app
+        self.cpu_paths = frozenset(cpu_paths)
+        self.cpu_threads = max(1, cpu_threads)
+        self.cpu_queue = cpu_queue
+        self.io_threads = max(1, io_threads)
+        self.max_body = max_body
+        self.routes = {}
+        self.on_startup = []  # coroutine functions awaited at lifespan startup
+        self.on_shutdown = []  # ... and at shutdown
+        self.cpu_pending = 0
+        self.cpu_rejected = 0
+        self._cpu_pool = None
+        self._io_pool = None
+        self._lock = threading.Lock()
+
+    def route(self, path, methods=('GET',)):
+        """Register `async def handler(scope, receive, send)` to run on the event loop"""
+        def register(handler):
+            for method in methods:
+                self.routes[(method, path)] = handler
+            return handler
+        return register
+
+    def _pools(self):
+        # Created lazily so they start in the serving process, after any fork
+        if self._cpu_pool is None:
+            with self._lock:
+                if self._cpu_pool is None:
+                    self._io_pool = ThreadPoolExecutor(self.io_threads, thread_name_prefix='asgi-io')
+                    self._cpu_pool = ThreadPoolExecutor(self.cpu_threads, thread_name_prefix='asgi-cpu')
+        return self._cpu_pool, self._io_pool
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._pools()
+                for hook in self.on_startup:
+                    await hook()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in self.on_shutdown:
+                    await hook()
+                for pool in (self._cpu_pool, self._io_pool):
+                    if pool is not None:
+                        pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is not None:
+            await handler(scope, receive, send)
+            return
+
+        try:
+            body, size = await self._receive_body(receive)
+        except ClientDisconnected:
+            return
+        if body is None:
+            await send_json(send, 413, {
+                'error': f'Upload too large; the limit is {self.max_body / (1024 * 1024):.0f} MB',
+                'max_content_length': self.max_body
+            })
+            return
+
+        # Slots are taken after the body has arrived: an upload still being
+        # received must not hold one a ready request could use
+        cpu_bound = scope['method'] == 'POST' and scope['path'] in self.cpu_paths
+        if cpu_bound:
+            with self._lock:
+                if self.cpu_queue and self.cpu_pending >= self.cpu_threads + self.cpu_queue:
+                    self.cpu_rejected += 1
+                    busy = True
+                else:
+                    self.cpu_pending += 1
+                    busy = False
+            if busy:
+                body.close()
+                await send_json(send, 503, {
+                    'error': 'Server busy, please retry later',
+                    'details': 'Too many inference requests are waiting for a worker thread'
+                }, [('Retry-After', '1')])
+                return
+        try:
+            await self._serve_wsgi(scope, body, size, send, self._pools()[0 if cpu_bound else 1])
+        finally:
+            if cpu_bound:
+                with self._lock:
+                    self.cpu_pending -= 1
+
+    async def _receive_body(self, receive):
+        """(spooled body file, size), or (None, size) once it passes max_body"""
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                raise ClientDisconnected()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                body.close()
+                return None, size
+            if chunk:
+                body.write(chunk)
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body, size
+
+    async def receive_json(self, receive):
+        """Body of a native route parsed as JSON; None when it is oversized or not JSON"""
+        body, _ = await self._receive_body(receive)
+        if body is None:
+            return None
+        try:
+            return json.loads(body.read() or b'null')
+        except ValueError:
+            return None
+        finally:
+            body.close()
+
+    async def _serve_wsgi(self, scope, body, size, send, pool):
+        """Run the WSGI app on `pool` for a received body; closes the body"""
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, body, size)
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def call_app():
+            state = {}
+
+            def start_response(status, headers, exc_info=None):
+                state['status'] = int(status.split(' ', 1)[0])
+                state['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+                return lambda data: None  # the legacy write() callable is not supported
+
+            result = self.wsgi_app(environ, start_response)
+            try:
+                if any(name == b'content-length' for name, _ in state.get('headers', [])):
+                    return state, b''.join(result)
+                # No length: forward chunks as the app yields them (e.g. event streams)
+                started = False
+                for chunk in result:
+                    if not started:
+                        send_from_thread({'type': 'http.response.start', 'status': state['status'],
+                                          'headers': state['headers']})
+                        started = True
+                    if chunk:
+                        send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                if not started:
+                    send_from_thread({'type': 'http.response.start', 'status': state['status'],
+                                      'headers': state['headers']})
+                send_from_thread({'type': 'http.response.body', 'body': b''})
+                return state, None
+            finally:
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    close()
+
+        try:
+            state, payload = await loop.run_in_executor(pool, call_app)
+        except Exception as e:
+            logging.error(f"ASGI request {scope['method']} {scope['path']} failed: {str(e)}")
+            try:
+                await send_json(send, 500, {'error': 'Internal server error', 'details': str(e)})
+            except Exception:
+                pass  # the response had already started
+            return
+        finally:
+            body.close()
+        if payload is not None:
+            await send({'type': 'http.response.start', 'status': state['status'], 'headers': state['headers']})
+            await send({'type': 'http.response.body', 'body': payload})
+
+    def describe(self):
+        return {
+            'cpu_threads': self.cpu_threads,
+            'cpu_queue': self.cpu_queue,
+            'cpu_pending': self.cpu_pending,
+            'cpu_rejected': self.cpu_rejected,
+            'io_threads': self.io_threads,
+            'native_routes': sorted(f"{method} {path}" for method, path in self.routes)
+        }
@@ -0,0 +1,316 @@
+"""
+Input and output formats for /predict/batch.
+
+Uploads may be CSV, Parquet, Arrow IPC (file or stream) or NDJSON. The
+format is sniffed from magic bytes, then the part's content type, then the
+file extension, and every format is read into a DataFrame for the same
+validation and scoring path. Arrow IPC columns are wrapped around the
+upload buffer without copying; Parquet only decodes the FEATURES columns.
+
+Any of them may be gzip or zstd compressed (part Content-Encoding header,
+.gz/.zst extension or magic bytes). Compressed uploads are decompressed as
+a stream: CSV is parsed straight from the decompressor, chunk by chunk.
+Uncompressed uploads that were spooled to disk are memory-mapped.
+
+Results travel as columns (one list per field) and are only turned into the
+requested representation at the end: the classic list of per-row objects,
+a columnar JSON object, or a CSV/Parquet download.
+"""
+import csv
+import gzip
+import io
+import os
+from importlib.util import find_spec
+
+from flask import current_app, jsonify
+
+from config import FEATURES
+from utils.lazy import lazy_import
+from utils.uploads import spooled_path
+
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+pa_json = lazy_import('pyarrow.json')
+zstandard = lazy_import('zstandard')
+
+UPLOAD_FORMAT_LABELS = {
+    'csv': 'CSV',
+    'parquet': 'Parquet',
+    'arrow': 'Arrow IPC',
+    'ndjson': 'NDJSON'
+}
+
+UPLOAD_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/vnd.ms-excel': 'csv',  # what Windows browsers send for .csv
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/vnd.apache.arrow.file': 'arrow',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson'
+}
+
+UPLOAD_EXTENSIONS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.arrows': 'arrow',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson'
+}
+
+PARQUET_MAGIC = b'PAR1'
+ARROW_FILE_MAGIC = b'ARROW1'
+ARROW_STREAM_MAGIC = b'\xff\xff\xff\xff'  # IPC continuation marker
+
+COMPRESSION_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'\x28\xb5\x2f\xfd': 'zstd'
+}
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.zst': 'zstd',
+    '.zstd': 'zstd'
+}
+
+CONTENT_ENCODINGS = {
+    'identity': None,
+    'gzip': 'gzip',
+    'x-gzip': 'gzip',
+    'zstd': 'zstd'
+}
+
+BATCH_OUTPUT_FORMATS = ('json', 'columnar', 'csv', 'parquet')
+
+DOWNLOAD_MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+class UploadTooLarge(ValueError):
+    """A compressed upload inflated past the configured limit"""
+
+
+class _LimitedReader(io.RawIOBase):
+    """Binary reader that fails once more than max_bytes have been read"""
+
+    def __init__(self, raw, max_bytes):
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.total = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        self.total += len(data)
+        if self.max_bytes and self.total > self.max_bytes:
+            raise UploadTooLarge(f"Decompressed upload is larger than {self.max_bytes} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def detect_compression(filename, content_encoding, head):
+    """
+    Returns (compression, filename without the compression extension).
+    compression is None, 'gzip' or 'zstd'; raises ValueError for an
+    unsupported Content-Encoding.
+    """
+    stem, extension = os.path.splitext(filename or '')
+    if extension.lower() in COMPRESSION_EXTENSIONS:
+        filename = stem
+    if content_encoding:
+        encoding = content_encoding.strip().lower()
+        if encoding not in CONTENT_ENCODINGS:
+            raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+        if CONTENT_ENCODINGS[encoding]:
+            return CONTENT_ENCODINGS[encoding], filename
+    for magic, compression in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return compression, filename
+    if extension.lower() in COMPRESSION_EXTENSIONS:
+        return COMPRESSION_EXTENSIONS[extension.lower()], filename
+    return None, filename
+
+
+def open_upload(stream, compression, max_bytes=0):
+    """Readable binary stream over the upload, decompressing on the fly"""
+    if compression is None:
+        return stream
+    if compression == 'gzip':
+        raw = gzip.GzipFile(fileobj=stream, mode='rb')
+    else:
+        raw = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    return io.BufferedReader(_LimitedReader(raw, max_bytes), buffer_size=1024 * 1024)
+
+
+def peek_upload(stream, compression, size=8):
+    """First bytes of the (decompressed) upload; rewinds the underlying stream"""
+    try:
+        return open_upload(stream, compression).read(size)
+    finally:
+        stream.seek(0)
+
+
+def detect_upload_format(filename, mimetype, head):
+    """Upload format from magic bytes, content type or extension; None if unknown"""
+    if head.startswith(PARQUET_MAGIC):
+        return 'parquet'
+    if head.startswith((ARROW_FILE_MAGIC, ARROW_STREAM_MAGIC)):
+        return 'arrow'
+    if mimetype in UPLOAD_MIMETYPES:
+        return UPLOAD_MIMETYPES[mimetype]
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in UPLOAD_EXTENSIONS:
+        return UPLOAD_EXTENSIONS[extension]
+    if head.lstrip().startswith(b'{'):
+        return 'ndjson'
+    return None
+
+
+def inspect_upload(file):
+    """(compression, upload format) of an uploaded FileStorage; leaves its stream rewound"""
+    head = file.stream.read(8)
+    file.stream.seek(0)
+    compression, filename = detect_compression(file.filename, file.headers.get('Content-Encoding'), head)
+    if compression is not None:
+        head = peek_upload(file.stream, compression)
+    return compression, detect_upload_format(filename, file.mimetype, head)
+
+
+def _feature_projection(names):
+    """Read only FEATURES when all are present; otherwise everything, for the missing-column report"""
+    return FEATURES if all(field in names for field in FEATURES) else None
+
+
+def _arrow_input(source):
+    """Memory-map a spooled upload by path, or wrap in-memory bytes; neither copies"""
+    if isinstance(source, str):
+        return pa.memory_map(source, 'r')
+    return pa.BufferReader(pa.py_buffer(source))
+
+
+def _read_parquet(source):
+    parquet_file = pq.ParquetFile(_arrow_input(source))
+    columns = _feature_projection(parquet_file.schema_arrow.names)
+    return parquet_file.read(columns=columns).to_pandas(split_blocks=True)
+
+
+def _read_arrow(source):
+    arrow_input = _arrow_input(source)
+    is_file_format = arrow_input.read(len(ARROW_FILE_MAGIC)) == ARROW_FILE_MAGIC
+    arrow_input.seek(0)
+    if is_file_format:
+        table = pa.ipc.open_file(arrow_input).read_all()
+    else:
+        table = pa.ipc.open_stream(arrow_input).read_all()
+    columns = _feature_projection(table.column_names)
+    if columns is not None:
+        table = table.select(columns)
+    # split_blocks keeps one block per column so null-free numeric columns
+    # stay views over the upload buffer or mapping
+    return table.to_pandas(split_blocks=True)
+
+
+def _keep_json_nulls(df):
+    """
+    Turn nulls in numeric FEATURES columns back into None. Both readers load
+    a JSON null in a number column as NaN, which the engine accepts like an
+    empty CSV cell (NaN for numbers, true for booleans); the JSON routes
+    reject null, and so must NDJSON rows.
+    """
+    for field in FEATURES:
+        if field in df.columns and pd.api.types.is_numeric_dtype(df[field].dtype):
+            missing = df[field].isna()
+            if missing.any():
+                df[field] = df[field].astype(object).mask(missing, None)
+    return df
+
+
+def _read_ndjson(source):
+    # pyarrow's multi-threaded reader is several times faster than pandas',
+    # but it rejects columns whose JSON type changes between rows; pandas
+    # keeps those as object columns so bad values get per-row errors
+    if find_spec('pyarrow') is not None:
+        try:
+            table = pa_json.read_json(_arrow_input(source))
+            return _keep_json_nulls(table.to_pandas(split_blocks=True))
+        except pa.ArrowInvalid:
+            pass
+    if not isinstance(source, str):
+        source = io.BytesIO(source)
+    return _keep_json_nulls(pd.read_json(source, lines=True, dtype=False, convert_dates=False))
+
+
+def read_batch_upload(stream, upload_format):
+    """
+    Parse an upload stream in the given format into a DataFrame. Uploads
+    spooled to disk are parsed through a memory map of the temp file;
+    anything else (small or decompressed uploads) is read from the stream.
+    """
+    path = spooled_path(stream)
+    if upload_format == 'csv':
+        if path is not None:
+            return pd.read_csv(path, encoding='utf-8', memory_map=True)
+        # The C parser pulls the stream in chunks, so the decoded text is
+        # never held in memory as a whole
+        return pd.read_csv(stream, encoding='utf-8')
+    source = path if path is not None else stream.read()
+    if upload_format == 'parquet':
+        return _read_parquet(source)
+    if upload_format == 'arrow':
+        return _read_arrow(source)
+    return _read_ndjson(source)
+
+
+def parquet_available():
+    return find_spec('pyarrow') is not None or find_spec('fastparquet') is not None
+
+
+def columns_to_records(columns):
+    """{'row': [1, 2], ...} -> [{'row': 1, ...}, {'row': 2, ...}]"""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def render_batch_output(summary, columns, output_format, filename):
+    """
+    Build the response for a scored batch. JSON formats carry the summary in
+    the body; downloads carry it in X-Total-Processed, X-Successful-Predictions
+    and X-Errors-Count headers.
+    """
+    if output_format == 'json':
+        return jsonify({**summary, 'predictions': columns_to_records(columns)})
+    if output_format == 'columnar':
+        return jsonify({**summary, 'format': 'columnar', 'predictions': columns})
+
+    if output_format == 'csv':
+        # The csv module writes plain lists about twice as fast as DataFrame.to_csv
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*columns.values()))
+        body = buffer.getvalue()
+    else:
+        buffer = io.BytesIO()
+        pd.DataFrame(columns).to_parquet(buffer, index=False)
+        body = buffer.getvalue()
+
+    stem = os.path.splitext(filename)[0] or 'batch'
+    response = current_app.response_class(body, mimetype=DOWNLOAD_MIMETYPES[output_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{stem}_predictions.{output_format}"'
+    response.headers['X-Total-Processed'] = str(summary['total_processed'])
+    response.headers['X-Successful-Predictions'] = str(summary['successful_predictions'])
+    response.headers['X-Errors-Count'] = str(summary['errors_count'])
+    return response
@@ -0,0 +1,65 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from flask import current_app, request
+from werkzeug.http import http_date, quote_etag
+
+
+def file_validator(path):
+    """
+    Cheap change validator for a file: (size, mtime_ns, mtime as UTC datetime).
+    Missing files return (0, 0, None) so callers can still build an ETag.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0, 0, None
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    return stat.st_size, stat.st_mtime_ns, last_modified
+
+
+def make_etag(*parts) -> str:
+    """Build an opaque ETag value from the given validator parts."""
+    raw = "|".join(str(part) for part in parts)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def add_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and force clients to revalidate before reuse."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def validator_headers(etag, last_modified=None):
+    """add_validators as (name, value) pairs, for responses built outside Flask."""
+    headers = [("ETag", quote_etag(etag))]
+    if last_modified is not None:
+        headers.append(("Last-Modified", http_date(last_modified)))
+    headers.append(("Cache-Control", "no-cache"))
+    return headers
+
+
+def conditions_match(etag, last_modified, if_none_match, if_modified_since):
+    """
+    Whether parsed conditional headers (werkzeug ETags, datetime or None)
+    match the validators. If-None-Match takes precedence over
+    If-Modified-Since.
+    """
+    if if_none_match:
+        return if_none_match.contains_weak(etag)
+    if last_modified is not None and if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= if_modified_since
+    return False
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Return a 304 response when the request's conditional headers match,
+    otherwise None.
+    """
+    if not conditions_match(etag, last_modified, request.if_none_match, request.if_modified_since):
+        return None
+    return add_validators(current_app.response_class(status=304), etag, last_modified)
@@ -0,0 +1,75 @@
+import json
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+import config
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, the stdlib provider is used without it
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson. It keeps the default provider's
+    sorted keys, HTTP dates and default() hook; anything orjson cannot
+    encode, such as integers wider than 64 bits, falls back to the stdlib
+    encoder. One difference: NaN and Infinity are written as null (valid
+    JSON), where the default provider writes the bare NaN/Infinity tokens
+    that strict parsers, JSON.parse included, reject.
+    """
+
+    def _options(self, sort_keys=None, indent=None):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys if sort_keys is None else sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dumps_bytes(self, obj, **kwargs):
+        unsupported = set(kwargs) - {'sort_keys', 'indent', 'default'}
+        if unsupported:
+            return None
+        try:
+            return orjson.dumps(
+                obj,
+                default=kwargs.get('default', self.default),
+                option=self._options(kwargs.get('sort_keys'), kwargs.get('indent'))
+            )
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        data = self._dumps_bytes(obj, **kwargs)
+        if data is None:
+            return super().dumps(obj, **kwargs)
+        return data.decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # NaN/Infinity and other stdlib extensions
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = self._dumps_bytes(obj, indent=indent)
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Use the orjson provider when JSON_PROVIDER is "orjson" and it is installed."""
+    if config.JSON_PROVIDER != 'orjson':
+        return
+    if orjson is None:
+        logging.warning("JSON_PROVIDER is orjson but orjson is not installed; using the default provider")
+        return
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,39 @@
+"""
+Thread pools that belong to the process using them.
+
+gunicorn forks its workers from a preloaded master, and a ThreadPoolExecutor
+inherited through fork has no live threads: work submitted to it would wait
+forever. ProcessLocalPool starts its executor lazily and starts a fresh one
+whenever it is used from a new process.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ProcessLocalPool:
+    """
+    ThreadPoolExecutor created on first use in each process. on_start, if
+    given, runs under `lock` whenever a new executor starts, so the owner can
+    reset per-process counters guarded by the same lock.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix, lock=None, on_start=None):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.on_start = on_start
+        self._lock = lock if lock is not None else threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def get(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix
+                    )
+                    self._pid = os.getpid()
+                    if self.on_start is not None:
+                        self.on_start()
+        return self._executor
@@ -0,0 +1,161 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import config
+
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+
+
+class StackSampler:
+    """
+    Samples the request thread's Python stack at a fixed interval and counts
+    collapsed stacks ("outer;inner;leaf count"), the input format of
+    flamegraph.pl and speedscope. Busy inference executor threads are
+    sampled too, under an "inference" root, since model calls run there.
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            frame = frames.get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+            for thread in threading.enumerate():
+                if not thread.name.startswith('inference'):
+                    continue
+                frame = frames.get(thread.ident)
+                # Idle pool threads sit in the work queue; skip them
+                if frame is not None and frame.f_code.co_name != 'wait':
+                    self.stacks[f"inference;{self._collapse(frame)}"] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles selected requests into PROFILING_DIR."""
+
+    def __init__(self, wsgi_app, directory, mode, admin_token, sample_rate, max_files):
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.mode = mode
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._prune_lock = threading.Lock()
+
+    def _should_profile(self, environ):
+        token = environ.get(PROFILE_HEADER)
+        if token and self.admin_token and hmac.compare_digest(token, self.admin_token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        start = time.perf_counter()
+        if self.mode == 'stack':
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            try:
+                return self.wsgi_app(environ, start_response)
+            finally:
+                sampler.stop()
+                self._save(environ, start, sampler.dump, 'folded')
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this process (Python 3.12+)
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            profiler.disable()
+            self._save(environ, start, profiler.dump_stats, 'prof')
+
+    def _save(self, environ, start, dump, extension):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path_part = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+            name = (
+                f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{environ.get('REQUEST_METHOD', 'GET')}"
+                f"_{path_part}_{elapsed_ms:.0f}ms.{extension}"
+            )
+            path = os.path.join(self.directory, name)
+            dump(path)
+            logging.info(f"Request profile written to {path}")
+            self._prune()
+        except Exception as e:
+            logging.error(f"Error writing request profile: {str(e)}")
+
+    def _prune(self):
+        """Keep only the newest max_files profiles"""
+        with self._prune_lock:
+            files = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith(('.prof', '.folded'))
+            ]
+            if len(files) <= self.max_files:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_files]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def init_profiling(app):
+    """Install the profiling middleware; a no-op unless PROFILING_ENABLED is set."""
+    if not config.PROFILING_ENABLED:
+        return
+    app.wsgi_app = ProfilingMiddleware(
+        app.wsgi_app,
+        directory=config.PROFILING_DIR,
+        mode=config.PROFILING_MODE,
+        admin_token=config.PROFILING_ADMIN_TOKEN,
+        sample_rate=config.PROFILING_SAMPLE_RATE,
+        max_files=config.PROFILING_MAX_FILES
+    )
+    logging.info(
+        f"Request profiling enabled (mode={config.PROFILING_MODE}, "
+        f"sample_rate={config.PROFILING_SAMPLE_RATE}, dir={config.PROFILING_DIR})"
+    )
@@ -0,0 +1,249 @@
+"""
+Per-identity token buckets for prediction work, charged per predicted row.
+
+A request is let in while its bucket holds any tokens; once rows have been
+predicted their count is charged, which may take the bucket negative so a
+large upload is paid for with a proportionally long wait afterwards. The
+bucket refills at RATE_LIMIT_ROWS_PER_SECOND up to RATE_LIMIT_BURST_ROWS.
+
+Identities are the user_id of a Bearer token issued by
+utils.security.create_jwt, or the client IP for anonymous calls. Buckets
+live in process memory (an LRU with idle eviction) or, so that the limit
+holds across gunicorn workers, in a shared SQLite file.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from flask import jsonify, request
+
+from utils.security import decode_jwt
+
+
+def request_identity():
+    """'user:<id>' for a valid Bearer token, otherwise 'ip:<client address>'"""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        payload, _ = decode_jwt(header[7:].strip())
+        if payload and payload.get('user_id') is not None:
+            return f"user:{payload['user_id']}"
+    return f"ip:{request.remote_addr or 'unknown'}"
+
+
+class MemoryBuckets:
+    """
+    Token buckets in an LRU dict. A bucket idle long enough to be full again
+    is indistinguishable from a new one, so refilled buckets are dropped from
+    the LRU end as they are found. max_keys caps memory under key churn by
+    dropping the oldest buckets that are not in debt; buckets still paying
+    off a batch are kept, as dropping them would forgive the debt.
+    """
+
+    EVICT_SCAN = 32  # oldest buckets looked at per update
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def refill_seconds(self, tokens):
+        """Seconds until a bucket at `tokens` is full again"""
+        deficit = self.burst - tokens
+        if deficit <= 0:
+            return 0.0
+        return deficit / self.rate if self.rate > 0 else math.inf
+
+    def _refilled(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[key] = bucket
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        self._evict(now, key)
+        return bucket
+
+    def _evict(self, now, current):
+        excess = len(self._buckets) - self.max_keys
+        for key in list(islice(self._buckets, self.EVICT_SCAN)):
+            if key == current:
+                break
+            tokens, updated = self._buckets[key]
+            if now - updated > self.refill_seconds(tokens) or (excess > 0 and tokens >= 0):
+                del self._buckets[key]
+                excess -= 1
+            elif excess <= 0 and tokens >= 0:
+                break  # newer buckets have had less time to refill; skip past debt only
+
+    def available(self, key):
+        """Tokens in the bucket right now (negative while paying off a large batch)"""
+        with self._lock:
+            return self._refilled(key, time.monotonic())[0]
+
+    def charge(self, key, rows):
+        with self._lock:
+            bucket = self._refilled(key, time.monotonic())
+            bucket[0] -= rows
+            return bucket[0]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    """
+    Token buckets in a SQLite table shared by every worker on the host. Each
+    update is one short IMMEDIATE transaction; rows that have refilled to
+    the burst are purged periodically.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, rate, burst, path):
+        self.rate = rate
+        self.burst = burst
+        self.path = path
+        self._local = threading.local()
+        self._operations = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        # One connection per thread (and per process, after a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _update(self, key, rows):
+        # Wall clock: the monotonic clock is not comparable across processes
+        now = time.time()
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = float(self.burst) if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            tokens -= rows
+            connection.execute(
+                'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now)
+            )
+            self._operations += 1
+            if self._operations % self.PURGE_EVERY == 0:
+                connection.execute(
+                    'DELETE FROM buckets WHERE tokens + (? - updated) * ? >= ?', (now, self.rate, self.burst)
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return tokens
+
+    def available(self, key):
+        # Read-only; the refill is written back on the next charge
+        row = self._connect().execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return float(self.burst)
+        return min(self.burst, row[0] + max(0.0, time.time() - row[1]) * self.rate)
+
+    def charge(self, key, rows):
+        return self._update(key, rows)
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+
+class RowRateLimiter:
+    """Admits requests while the caller's bucket is positive and charges predicted rows."""
+
+    def __init__(self, buckets, enabled=True):
+        self.buckets = buckets
+        self.enabled = enabled
+        self.allowed = 0
+        self.rejected = 0
+        self.charged_rows = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self, tokens):
+        """Seconds until a bucket at `tokens` is positive again"""
+        return max(1, math.ceil((1 - tokens) / self.buckets.rate)) if self.buckets.rate > 0 else 60
+
+    def check(self, identity):
+        """None when the request may proceed, otherwise the 429 response"""
+        if not self.enabled:
+            return None
+        try:
+            tokens = self.buckets.available(identity)
+        except Exception as e:
+            # Fail open: a broken limiter store must not take predictions down
+            logging.error(f"Rate limit check failed: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return None
+        if tokens > 0:
+            with self._lock:
+                self.allowed += 1
+            return None
+        with self._lock:
+            self.rejected += 1
+        response = jsonify({
+            'error': 'Rate limit exceeded',
+            'details': f'Prediction row quota of {self.buckets.rate:g} rows/s used up; {-tokens:.0f} rows of debt remain'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(self.retry_after(tokens))
+        return response
+
+    def charge(self, identity, rows):
+        """Charge predicted rows to the identity's bucket; returns the tokens left"""
+        if not self.enabled or rows <= 0:
+            return None
+        try:
+            tokens = self.buckets.charge(identity, rows)
+        except Exception as e:
+            logging.error(f"Rate limit charge failed: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return None
+        with self._lock:
+            self.charged_rows += rows
+        return tokens
+
+    def describe(self):
+        return {
+            'enabled': self.enabled,
+            'backend': 'sqlite' if isinstance(self.buckets, SQLiteBuckets) else 'memory',
+            'rows_per_second': self.buckets.rate,
+            'burst_rows': self.buckets.burst,
+            'tracked_identities': len(self.buckets),
+            'allowed': self.allowed,
+            'rejected': self.rejected,
+            'charged_rows': self.charged_rows,
+            'errors': self.errors
+        }
+
+
+def create_rate_limiter(enabled, backend, rate, burst, max_keys, db_path):
+    if enabled and backend == 'sqlite':
+        buckets = SQLiteBuckets(rate, burst, db_path)
+    else:
+        buckets = MemoryBuckets(rate, burst, max_keys)
+    return RowRateLimiter(buckets, enabled)
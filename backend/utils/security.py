@@ -1,7 +1,17 @@
+import asyncio
 import jwt
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from typing import Tuple, Optional
 
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import JWT_CACHE_SIZE, AUTH_HASH_THREADS, AUTH_HASH_QUEUE
+from utils.pools import ProcessLocalPool
+
 SECRET_KEY = "your_super_secret_key_here"
 
 def create_jwt(payload: dict, expires_minutes: int = 60) -> str:
@@ -12,19 +22,134 @@ def create_jwt(payload: dict, expires_minutes: int = 60) -> str:
     payload_copy = payload.copy()
     payload_copy["exp"] = datetime.utcnow() + timedelta(minutes=expires_minutes)
     token = jwt.encode(payload_copy, SECRET_KEY, algorithm="HS256")
-    
+
     # PyJWT >= 2 returns a string, so just return it
     return token
 
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature has already been verified, with
+    their payload. An entry is only served until the token's exp, so a
+    cached token expires exactly when a fresh verification would reject it.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (payload, exp timestamp or None)
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Tuple[Optional[dict], bool]:
+        """(payload, expired): payload is None on a miss or when expired"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            payload, exp = entry
+            if exp is not None and time.time() >= exp:
+                del self._entries[token]
+                return None, True
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return dict(payload), False
+
+    def put(self, token: str, payload: dict):
+        if self.max_size <= 0:
+            return
+        exp = payload.get("exp")
+        with self._lock:
+            self._entries[token] = (dict(payload), float(exp) if isinstance(exp, (int, float)) else None)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def describe(self) -> dict:
+        return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+
+token_cache = VerifiedTokenCache(JWT_CACHE_SIZE)
+
 def decode_jwt(token: str) -> Tuple[Optional[dict], Optional[str]]:
     """
-    Decode a JWT token.
+    Decode a JWT token, reusing an earlier verification of the same token.
     Returns a tuple: (payload dict or None, error message or None)
     """
+    payload, expired = token_cache.get(token)
+    if payload is not None:
+        return payload, None
+    if expired:
+        return None, "Token expired"
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        token_cache.put(token, payload)
         return payload, None
     except jwt.ExpiredSignatureError:
         return None, "Token expired"
     except jwt.InvalidTokenError:
         return None, "Invalid token"
+
+
+class HashingBusy(RuntimeError):
+    """Too many password hashing jobs are already waiting"""
+
+
+class PasswordHasher:
+    """
+    Small dedicated pool for password hashing and checking. The request
+    thread (or coroutine) waits for the result, but at most `threads` hashes
+    run at once and at most `max_pending` are running or waiting, so a burst
+    of logins cannot take over the CPUs the prediction routes need.
+    """
+
+    def __init__(self, threads: int = AUTH_HASH_THREADS, max_pending: int = AUTH_HASH_QUEUE):
+        self.threads = max(1, threads)
+        self.max_pending = max_pending
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = ProcessLocalPool(self.threads, 'password-hash', self._lock, self._reset)
+
+    def _reset(self):
+        self._pending = 0
+
+    def _submit(self, fn, *args) -> Future:
+        pool = self._pool.get()
+        with self._lock:
+            if self.max_pending and self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingBusy("Too many authentication requests in progress")
+            self._pending += 1
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password: str) -> str:
+        return self._submit(generate_password_hash, password).result()
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._submit(check_password_hash, password_hash, password).result()
+
+    # Coroutine versions for the ASGI entrypoint: the event loop awaits the
+    # pool directly instead of parking a thread on the result
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(generate_password_hash, password))
+
+    async def verify_async(self, password_hash: str, password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(check_password_hash, password_hash, password))
+
+    def describe(self) -> dict:
+        return {'threads': self.threads, 'pending': self._pending, 'max_pending': self.max_pending, 'rejected': self.rejected}
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,39 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Records how long each start-up phase took, for /health/startup."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases.append({
+                'phase': name,
+                'ms': round(seconds * 1000, 1),
+                'at_ms': round((time.perf_counter() - self.started) * 1000, 1)
+            })
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self):
+        with self._lock:
+            phases = list(self.phases)
+        return {
+            'since_start_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'phases': phases
+        }
+
+
+startup_timer = StartupTimer()
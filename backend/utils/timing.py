@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_app_context, request
+
+
+class StageTimer:
+    """Per-request stage durations, rendered as a Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """Stage durations in milliseconds, in the order they first ran"""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+    def header(self, total=None):
+        total = self.total() if total is None else total
+        metrics = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items()]
+        metrics.append(f"total;dur={total * 1000:.3f}")
+        return ', '.join(metrics)
+
+
+def start_request_timer():
+    g.stage_timer = StageTimer()
+    return g.stage_timer
+
+
+def current_timer():
+    return g.get('stage_timer') if has_app_context() else None
+
+
+@contextmanager
+def timed(name):
+    """Time a block as stage `name` of the current request; a no-op outside a timed request"""
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def setup_request_logging(path):
+    """JSON-lines logger for per-request timings, kept out of app.log"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    request_logger = logging.getLogger('requests')
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
+    if not request_logger.handlers:
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        request_logger.addHandler(handler)
+    return request_logger
+
+
+def finish_request_timer(response, add_header=True, allow_origin=None, request_logger=None):
+    """Attach Server-Timing to the response and/or write the structured request log line"""
+    timer = current_timer()
+    if timer is None:
+        return response
+    total = timer.total()
+    if add_header:
+        response.headers['Server-Timing'] = timer.header(total)
+        if allow_origin:
+            response.headers['Timing-Allow-Origin'] = allow_origin
+    if request_logger is not None:
+        try:
+            request_logger.info(json.dumps({
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 3),
+                'stages_ms': timer.as_dict()
+            }))
+        except Exception as e:
+            logging.error(f"Error writing request log: {str(e)}")
+    return response
@@ -0,0 +1,58 @@
+import io
+import logging
+import os
+import tempfile
+
+from flask import Request, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import config
+
+
+class SpoolingRequest(Request):
+    """
+    Request whose file parts above UPLOAD_SPOOL_THRESHOLD go to a named temp
+    file, which readers can memory-map by path. Werkzeug closes the file,
+    and the temp file is deleted, when the request ends.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= config.UPLOAD_SPOOL_THRESHOLD:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile(
+            'wb+', prefix='upload-', suffix='.spool', dir=config.UPLOAD_SPOOL_DIR or None)
+
+
+def spooled_path(stream):
+    """Path of an upload spooled to a named temp file, else None"""
+    name = getattr(stream, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        stream.flush()
+        return name
+    return None
+
+
+def upload_too_large(e=None):
+    limit_mb = config.MAX_CONTENT_LENGTH / (1024 * 1024)
+    return jsonify({
+        'error': f'Upload too large; the limit is {limit_mb:.0f} MB',
+        'max_content_length': config.MAX_CONTENT_LENGTH
+    }), 413
+
+
+def init_uploads(app):
+    """Upload size limit, disk spooling for large files and a JSON 413 response"""
+    app.request_class = SpoolingRequest
+    app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
+    if config.UPLOAD_SPOOL_DIR:
+        os.makedirs(config.UPLOAD_SPOOL_DIR, exist_ok=True)
+
+    @app.before_request
+    def reject_oversized_upload():
+        # Declared lengths are refused before any of the body is read;
+        # chunked bodies are cut off by Werkzeug at the same limit
+        if request.content_length is not None and request.content_length > config.MAX_CONTENT_LENGTH:
+            logging.warning(f"Rejected {request.content_length} byte request to {request.path}")
+            return upload_too_large()
+
+    app.register_error_handler(RequestEntityTooLarge, upload_too_large)
@@ -0,0 +1,18 @@
+"""
+Production WSGI entrypoint.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app (set in gunicorn.conf.py) this module is imported once in
+the gunicorn master: the app is created and the model is loaded and warmed
+up before the workers are forked, so every worker shares the same model
+pages copy-on-write instead of loading its own copy.
+"""
+from app import create_app
+from routes import predict
+
+app = create_app()
+# The master must finish loading before it forks, even in fast-start mode
+predict.model_store.wait()
+if not predict.model_store.warmed_up:
+    predict.model_store.warm_up()
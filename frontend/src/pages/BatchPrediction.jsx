@@ -8,6 +8,8 @@ const BatchPrediction = () => {
   const [selectedFile, setSelectedFile] = useState(null);
   const [uploadProgress, setUploadProgress] = useState(0);
   const [processing, setProcessing] = useState(false);
+  const [serverProgress, setServerProgress] = useState(null);
+  const [progressNotice, setProgressNotice] = useState(null);
   const [results, setResults] = useState(null);
   const [error, setError] = useState(null);
   const fileInputRef = useRef(null);
@@ -55,11 +57,33 @@ const BatchPrediction = () => {
     setProcessing(true);
     setError(null);
     setUploadProgress(0);
+    setServerProgress(null);
+    setProgressNotice(null);
+
+    // Follow the server side of the batch (parsing, validation, prediction)
+    // from the start, so no stage is missed on a fast upload
+    const progressId = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    let progressSource = null;
+    let uploaded = false;
+    const followProgress = () => {
+      progressSource = api.predictions.batchProgress(progressId, (type, state) => {
+        if (type === 'timeout' && !uploaded) {
+          // The upload is outlasting the server's wait for the batch; listen again
+          followProgress();
+        } else if (type === 'timeout' || type === 'unavailable') {
+          setProgressNotice(`${state.error}; results will appear when the batch finishes.`);
+        } else {
+          setServerProgress(state);
+        }
+      });
+    };
+    followProgress();
 
     try {
       const result = await api.predictions.batch(selectedFile, (progress) => {
         setUploadProgress(progress);
-      });
+        uploaded = progress >= 100;
+      }, progressId);
 
       setResults(result);
       setUploadProgress(100);
@@ -67,10 +91,42 @@ const BatchPrediction = () => {
       setError(err.message || 'Failed to process file');
       setUploadProgress(0);
     } finally {
+      uploaded = true;
+      progressSource.close();
+      setServerProgress(null);
+      setProgressNotice(null);
       setProcessing(false);
     }
   };
 
+  const formatEta = (ms) => {
+    if (ms === null || ms === undefined) return '';
+    const seconds = Math.ceil(ms / 1000);
+    return seconds < 60 ? `${seconds}s left` : `${Math.floor(seconds / 60)}m ${seconds % 60}s left`;
+  };
+
+  const serverStageLabel = (state) => {
+    switch (state.stage) {
+      case 'parsing':
+        return 'Reading file...';
+      case 'validating':
+        return `Validating ${formatNumber(state.rows_parsed)} rows...`;
+      case 'predicting':
+        return `Predicting ${formatNumber(state.rows_predicted)} of ${formatNumber(state.rows_total)} rows`;
+      case 'serializing':
+      case 'done':
+        return 'Preparing results...';
+      default:
+        return 'Processing...';
+    }
+  };
+
+  // Upload progress until the file is sent, then the server's row progress
+  const showServerProgress = processing && serverProgress && uploadProgress >= 100;
+  const displayedProgress = showServerProgress && serverProgress.rows_total
+    ? Math.round((serverProgress.rows_predicted * 100) / serverProgress.rows_total)
+    : uploadProgress;
+
   const downloadResults = () => {
     if (!results || !results.predictions) return;
 
@@ -220,20 +276,28 @@ const BatchPrediction = () => {
           <div style={{ marginBottom: '20px' }}>
             <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '8px' }}>
               <span style={{ fontSize: '14px', color: '#374151' }}>
-                {processing ? 'Processing...' : 'Upload Complete'}
+                {showServerProgress ? serverStageLabel(serverProgress) : processing ? 'Processing...' : 'Upload Complete'}
               </span>
               <span style={{ fontSize: '14px', color: '#6b7280' }}>
-                {uploadProgress}%
+                {displayedProgress}%
+                {showServerProgress && serverProgress.stage === 'predicting' && serverProgress.eta_ms !== null
+                  ? ` · ${formatEta(serverProgress.eta_ms)}`
+                  : ''}
               </span>
             </div>
             <div style={progressBarStyles.container}>
               <div 
                 style={{
                   ...progressBarStyles.bar,
-                  width: `${uploadProgress}%`
+                  width: `${displayedProgress}%`
                 }}
               />
             </div>
+            {processing && progressNotice && (
+              <div style={{ fontSize: '12px', color: '#6b7280', marginTop: '6px' }}>
+                {progressNotice}
+              </div>
+            )}
           </div>
         )}
 
@@ -153,12 +153,13 @@ export const api = {
       return apiClient.post('/predict/', backendData);
     },
     
-    // Batch CSV upload prediction
-    batch: (csvFile, onProgress) => {
+    // Batch CSV upload prediction; pass a progressId to follow it with batchProgress
+    batch: (csvFile, onProgress, progressId) => {
       const formData = new FormData();
       formData.append('file', csvFile);
       
       return apiClient.post('/predict/batch', formData, {
+        params: progressId ? { progress_id: progressId } : undefined,
         headers: {
           'Content-Type': 'multipart/form-data'
         },
@@ -171,6 +172,22 @@ export const api = {
       });
     },
     
+    // Server-Sent Events with the stage, row counts and ETA of a batch upload.
+    // Reports 'unavailable' when the server refuses the stream (e.g. 501).
+    // Returns the EventSource; call close() on it when the upload finishes.
+    batchProgress: (progressId, onEvent) => {
+      const source = new EventSource(`${API_BASE_URL}/predict/batch/progress/${encodeURIComponent(progressId)}`);
+      const handle = (event) => onEvent(event.type, JSON.parse(event.data));
+      ['progress', 'done', 'failed', 'timeout'].forEach(type => source.addEventListener(type, handle));
+      ['done', 'failed', 'timeout'].forEach(type => source.addEventListener(type, () => source.close()));
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          onEvent('unavailable', { error: 'Live progress is not available on this server' });
+        }
+      };
+      return source;
+    },
+    
     // Get prediction explanation (feature importance)
     explain: (deviceData) => {
       const backendData = transformToBackendFormat(deviceData);